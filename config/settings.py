@@ -12,8 +12,23 @@ TESTNET = os.getenv("USE_TESTNET", "False").lower() in ("true", "1", "t")
 
 # WebSocket Configuration
 WS_PRIVATE = os.getenv("WS_PRIVATE", "False").lower() in ("true", "1", "t")
+# Private topics captured when WS_PRIVATE is set: any of order, execution, position, wallet
+PRIVATE_TOPICS = os.getenv("PRIVATE_TOPICS", "order,execution,position,wallet").split(",")
+PRIVATE_BATCH_SIZE = int(os.getenv("PRIVATE_BATCH_SIZE", "50"))  # Events per private table batch
+PRIVATE_BATCH_MAX_AGE = float(os.getenv("PRIVATE_BATCH_MAX_AGE", "1"))  # Seconds before a partial batch is saved
 SYMBOLS = os.getenv("SYMBOLS", "BTCUSDT,ETHUSDT,LTCUSDT,SOLUSDT").split(",")
 CHANNELS = os.getenv("CHANNELS", "orderbook.50,trade,kline.1m").split(",")
+# Dynamic symbol universe: "bybit" for the exchange's linear instrument list, a file path, or empty for SYMBOLS
+SYMBOL_SOURCE = os.getenv("SYMBOL_SOURCE", "")
+SYMBOL_REFRESH_INTERVAL = int(os.getenv("SYMBOL_REFRESH_INTERVAL", "300"))  # Seconds between universe refreshes
+MAX_SYMBOLS_PER_CONNECTION = int(os.getenv("MAX_SYMBOLS_PER_CONNECTION", "100"))
+SUBSCRIBE_RATE = float(os.getenv("SUBSCRIBE_RATE", "5"))  # Subscribe/unsubscribe requests per second, 0 for no limit
+# Feed stall watchdog: a symbol silent for FEED_STALL_FACTOR times its learned mean message interval, clamped to
+# [FEED_STALL_MIN, FEED_STALL_MAX] seconds, is resubscribed, then its connection reconnected; gaps go to feed_gaps
+FEED_WATCHDOG = os.getenv("FEED_WATCHDOG", "False").lower() in ("true", "1", "t")
+FEED_STALL_FACTOR = float(os.getenv("FEED_STALL_FACTOR", "20"))
+FEED_STALL_MIN = float(os.getenv("FEED_STALL_MIN", "30"))
+FEED_STALL_MAX = float(os.getenv("FEED_STALL_MAX", "600"))
 
 # Database Configuration
 DB_TYPE = os.getenv("DB_TYPE", "sqlite").lower()  # Default to sqlite for testing
@@ -37,10 +52,74 @@ elif DB_TYPE == "mysql":
 else:
     raise ValueError(f"Unsupported database type: {DB_TYPE}")
 
+# "asyncpg" writes PostgreSQL batches with asyncpg COPY, several at a time ("pip install .[asyncpg]")
+DB_WRITER = os.getenv("DB_WRITER", "sqlalchemy").lower()
+ASYNC_WRITER_POOL_SIZE = int(os.getenv("ASYNC_WRITER_POOL_SIZE", "4"))  # Connections, i.e. batches in flight
+
 ECHO_SQL = os.getenv("ECHO_SQL", "False").lower() in ("true", "1", "t")
 
 # Application Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", "30"))
+LOG_FILE = os.getenv("LOG_FILE", "bybit_collector.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # Rotate the log file at this size
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_JSON = os.getenv("LOG_JSON", "False").lower() in ("true", "1", "t")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records beyond this are dropped, never block
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "5"))  # Records per message per interval, 0 disables
+LOG_RATE_INTERVAL = float(os.getenv("LOG_RATE_INTERVAL", "10"))
+DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", "30"))  # 0 keeps data forever
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # Seconds between retention passes
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "5000"))  # Rows deleted per transaction
+RETENTION_PAUSE = float(os.getenv("RETENTION_PAUSE", "0.5"))  # Seconds between delete chunks
+# Downsample aging ticker_data: ticks older than COMPACT_1S_DAYS become 1-second bars, history older than
+# COMPACT_1M_DAYS 1-minute bars; compacted rows are deleted (0 disables a tier)
+COMPACT_1S_DAYS = int(os.getenv("COMPACT_1S_DAYS", "0"))
+COMPACT_1M_DAYS = int(os.getenv("COMPACT_1M_DAYS", "0"))
+COMPACTION_INTERVAL = float(os.getenv("COMPACTION_INTERVAL", "3600"))  # Seconds between compaction passes
+COMPACTION_CHUNK_SIZE = int(os.getenv("COMPACTION_CHUNK_SIZE", "5000"))  # Source rows per transaction
+COMPACTION_PAUSE = float(os.getenv("COMPACTION_PAUSE", "0.5"))  # Seconds between chunks
 TICKER_BATCH_SIZE = int(os.getenv("TICKER_BATCH_SIZE", "100"))  # Number of ticker records to batch 
-DB_SIZE_CHECK_INTERVAL = int(os.getenv("DB_SIZE_CHECK_INTERVAL", "30"))
\ No newline at end of file
+# Per-symbol batch sizes from arrival rate and commit load instead of the fixed TICKER_BATCH_SIZE
+ADAPTIVE_BATCHING = os.getenv("ADAPTIVE_BATCHING", "False").lower() in ("true", "1", "t")
+BATCH_TARGET_ROWS = int(os.getenv("BATCH_TARGET_ROWS", "500"))  # Rows per commit aimed for on busy symbols
+BATCH_MAX_AGE = float(os.getenv("BATCH_MAX_AGE", "5"))  # Seconds a buffered row may wait before it is flushed
+BATCH_MIN_SIZE = int(os.getenv("BATCH_MIN_SIZE", "10"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "5000"))
+DB_SIZE_CHECK_INTERVAL = int(os.getenv("DB_SIZE_CHECK_INTERVAL", "30"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))  # Seconds allowed for the final flush on exit
+SPILL_DIR = os.getenv("SPILL_DIR", "data/spill")  # Batches not committed by the deadline are written here
+# Overload mode: conflate ticks per symbol while the save queue or commit latency is past these limits (0 disables)
+OVERLOAD_QUEUE_DEPTH = int(os.getenv("OVERLOAD_QUEUE_DEPTH", "200"))  # Batches waiting in the save queue
+OVERLOAD_LATENCY_MS = float(os.getenv("OVERLOAD_LATENCY_MS", "10000"))  # Enqueue-to-commit latency
+OVERLOAD_RESUME_DEPTH = int(os.getenv("OVERLOAD_RESUME_DEPTH", "0"))  # Queue depth at which full capture resumes
+CONFLATION_INTERVAL = float(os.getenv("CONFLATION_INTERVAL", "1"))  # Seconds summarised by one conflated row
+# "v2" writes ticker history to the compact ticker_data_v2 table instead of ticker_data
+TICKER_SCHEMA = os.getenv("TICKER_SCHEMA", "v1").lower()
+# Store v2 prices and sizes as integer multiples of each instrument's tick size and qty step
+TICKER_V2_SCALED = os.getenv("TICKER_V2_SCALED", "False").lower() in ("true", "1", "t")
+# Write slowly changing ticker fields to ticker_cold_fields only when they change, leaving them NULL in history rows
+TICKER_COLD_SPLIT = os.getenv("TICKER_COLD_SPLIT", "False").lower() in ("true", "1", "t")
+# Optional ticker_data indexes: a BRIN index on timestamp (PostgreSQL only) next to the B-tree one, and a
+# covering timestamp index for check_db --recent instead of the B-tree one; existing databases get them from
+# "python -m utils.indexes --apply"
+TICKER_BRIN_INDEX = os.getenv("TICKER_BRIN_INDEX", "False").lower() in ("true", "1", "t")
+TICKER_RECENT_INDEX = os.getenv("TICKER_RECENT_INDEX", "False").lower() in ("true", "1", "t")
+# Shared-memory latest-ticker snapshot for local readers, e.g. /dev/shm/bybit_tickers; empty disables it
+TICKER_SNAPSHOT_PATH = os.getenv("TICKER_SNAPSHOT_PATH", "")
+TICKER_SNAPSHOT_CAPACITY = int(os.getenv("TICKER_SNAPSHOT_CAPACITY", "1024"))  # Maximum number of symbols
+# Additional sinks fed with every saved batch, e.g. "parquet,database"
+EXTRA_SINKS = os.getenv("EXTRA_SINKS", "")
+SINK_QUEUE_SIZE = int(os.getenv("SINK_QUEUE_SIZE", "1000"))  # Batches per sink before it starts dropping
+SINK_DATABASE_URL = os.getenv("SINK_DATABASE_URL", "")
+PARQUET_SINK_DIR = os.getenv("PARQUET_SINK_DIR", "data/parquet")
+PARQUET_ROLL_ROWS = int(os.getenv("PARQUET_ROLL_ROWS", "100000"))
+PARQUET_ROLL_SECONDS = float(os.getenv("PARQUET_ROLL_SECONDS", "300"))
+LATENCY_REPORT_INTERVAL = int(os.getenv("LATENCY_REPORT_INTERVAL", "60"))  # Seconds between latency log summaries
+# On-demand profiling: SIGUSR1 = CPU, SIGUSR2 = memory; PROFILE_PORT also serves them on 127.0.0.1 (0 disables)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))  # Default profile duration
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between stack samples
+PROFILE_PORT = int(os.getenv("PROFILE_PORT", "0"))
+# Rolling tick metrics (spread, mid volatility, basis, open interest change) saved to ticker_metrics
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "0"))  # Seconds between metric snapshots; 0 disables
+METRICS_WINDOWS = [int(n) for n in os.getenv("METRICS_WINDOWS", "100,1000").split(",") if n.strip()]  # In ticks
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Table, func, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+
+def insert_ignore(session, table: Table, rows: List[Dict[str, Any]]) -> int:
+    """Bulk insert rows, skipping rows that violate a unique key.
+
+    Uses ``ON CONFLICT DO NOTHING`` on PostgreSQL, ``INSERT IGNORE`` on MySQL and
+    ``INSERT OR IGNORE`` on SQLite, executed as one executemany call so the drivers
+    send multi-row batches (psycopg2 through SQLAlchemy's insertmanyvalues,
+    mysql-connector through its own INSERT rewriting; SQLite reuses one prepared
+    statement). Returns the number of rows actually inserted.
+    """
+    if not rows:
+        return 0
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # executemany rowcount is not reliable here, so count the rows that come back
+        stmt = postgresql.insert(table).on_conflict_do_nothing().returning(*table.primary_key.columns)
+        return len(session.execute(stmt, rows).all())
+    if dialect == 'mysql':
+        stmt = insert(table).prefix_with('IGNORE')
+    elif dialect == 'sqlite':
+        stmt = insert(table).prefix_with('OR IGNORE')
+    else:
+        raise ValueError(f"Unsupported database dialect: {dialect}")
+    return session.execute(stmt, rows).rowcount
+
+
+def upsert(session, table: Table, rows: List[Dict[str, Any]], newer_column: Optional[str] = None) -> None:
+    """Insert rows or update the existing row with the same primary key.
+
+    With ``newer_column`` an existing row is only overwritten when the incoming
+    value of that column is at least as large, so late or replayed rows never
+    move a row backwards. Columns named ``updated_at`` are set to the current time.
+    """
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    key = [column.name for column in table.primary_key.columns]
+    columns = [name for name in rows[0] if name not in key]
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+        values = {name: stmt.excluded[name] for name in columns}
+        if 'updated_at' in table.c:
+            values['updated_at'] = func.now()
+        where = table.c[newer_column] <= stmt.excluded[newer_column] if newer_column else None
+        stmt = stmt.on_conflict_do_update(index_elements=key, set_=values, where=where)
+    elif dialect == 'mysql':
+        stmt = mysql.insert(table)
+        newer = stmt.inserted[newer_column] >= table.c[newer_column] if newer_column else None
+        # MySQL applies assignments left to right, so the comparison column goes last
+        ordered = [name for name in columns if name != newer_column] + ([newer_column] if newer_column else [])
+        values = [
+            (name, func.if_(newer, stmt.inserted[name], table.c[name]) if newer_column else stmt.inserted[name])
+            for name in ordered
+        ]
+        if 'updated_at' in table.c:
+            values.insert(0, ('updated_at', func.if_(newer, func.now(), table.c.updated_at) if newer_column
+                              else func.now()))
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        raise ValueError(f"Unsupported database dialect: {dialect}")
+    session.execute(stmt, rows)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from sqlalchemy.pool import QueuePool
 
@@ -15,6 +15,13 @@ engine = create_engine(
     pool_recycle=1800,  # Recycle connections after 30 minutes
 )
 
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, "connect")
+    def _enable_incremental_vacuum(dbapi_connection, connection_record):
+        # Only takes effect on a new database file; lets the retention pruner shrink the file in steps
+        dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
 # Create sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,109 @@
+"""Bring the tables of an existing database up to date with the models.
+
+create_all only creates missing tables, so columns and unique constraints added
+to a table that an older version already created are added here. Every step
+checks the live schema first, which makes upgrade_schema safe to run on every
+start.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import Index, Table, delete, exists, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from db.database import Base
+
+logger = logging.getLogger("bybit_collector.upgrade")
+
+# Columns added to tables that older versions already created, by table
+ADDED_COLUMNS = {
+    'ticker_data': (
+        'exchange_ts', 'receive_ts', 'cross_seq',
+        # Conflated interval summaries
+        'conflated_count', 'interval_high', 'interval_low',
+    ),
+}
+# Unique constraints added to tables that older versions already created, by table
+ADDED_UNIQUE_CONSTRAINTS = {
+    'ticker_data': ('uq_ticker_data_natural_key',),
+}
+
+
+def _add_column(conn, table_name: str, column_name: str) -> None:
+    column = Base.metadata.tables[table_name].c[column_name]
+    quote = conn.dialect.identifier_preparer.quote
+    conn.execute(text(
+        f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column_name)} {column.type.compile(dialect=conn.dialect)}"
+    ))
+
+
+def _has_unique_key(inspector, table_name: str, columns: List[str]) -> bool:
+    keys = [constraint['column_names'] for constraint in inspector.get_unique_constraints(table_name)]
+    keys += [index['column_names'] for index in inspector.get_indexes(table_name) if index['unique']]
+    return columns in keys
+
+
+def _remove_duplicates(conn, table: Table, columns: List[str]) -> int:
+    """Delete every row whose key an earlier row (lower primary key) already has; rows with NULLs never clash."""
+    (key,) = table.primary_key.columns
+    earlier = table.alias('earlier')
+    duplicates = select(key).where(
+        exists().where(earlier.c[key.name] < key, *(earlier.c[column] == table.c[column] for column in columns))
+    ).subquery()
+    # Selecting from the subquery lets MySQL delete from the table it reads
+    return conn.execute(delete(table).where(key.in_(select(duplicates.c[key.name])))).rowcount
+
+
+def _add_unique_constraint(conn, table: Table, name: str, columns: List[str]) -> None:
+    conn.execute(CreateIndex(Index(name, *(table.c[column] for column in columns), unique=True)))
+    if conn.dialect.name == 'postgresql':
+        quote = conn.dialect.identifier_preparer.quote
+        conn.execute(text(
+            f"ALTER TABLE {quote(table.name)} ADD CONSTRAINT {quote(name)} UNIQUE USING INDEX {quote(name)}"
+        ))
+
+
+def _add_columns(engine, inspector) -> List[str]:
+    changes = []
+    for table_name, column_names in ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table_name)}
+        for column_name in column_names:
+            if column_name in existing:
+                continue
+            with engine.begin() as conn:
+                _add_column(conn, table_name, column_name)
+            logger.info(f"Added column {column_name} to {table_name}")
+            changes.append(f"{table_name}.{column_name}")
+    return changes
+
+
+def _add_unique_constraints(engine, inspector) -> List[str]:
+    changes = []
+    for table_name, names in ADDED_UNIQUE_CONSTRAINTS.items():
+        if not inspector.has_table(table_name):
+            continue
+        table = Base.metadata.tables[table_name]
+        for constraint in table.constraints:
+            columns = [column.name for column in constraint.columns]
+            if constraint.name not in names or _has_unique_key(inspector, table_name, columns):
+                continue
+            with engine.begin() as conn:
+                removed = _remove_duplicates(conn, table, columns)
+                _add_unique_constraint(conn, table, constraint.name, columns)
+            logger.info(f"Added {constraint.name} to {table_name} after removing {removed} duplicate rows")
+            changes.append(f"{table_name}.{constraint.name}")
+    return changes
+
+
+def upgrade_schema(engine) -> List[str]:
+    """Add the ADDED_COLUMNS and ADDED_UNIQUE_CONSTRAINTS an existing database is missing.
+
+    Rows that would violate a new unique constraint are deleted first, keeping
+    the earliest. Returns what was changed.
+    """
+    inspector = inspect(engine)
+    changes = _add_columns(engine, inspector)
+    # The constraints may cover columns that were only just added
+    return changes + _add_unique_constraints(engine, inspect(engine))
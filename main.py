@@ -1,31 +1,72 @@
 import signal
 import sys
-import time
+import threading
 
+from config.settings import (
+    COMPACT_1M_DAYS,
+    COMPACT_1S_DAYS,
+    DATA_RETENTION_DAYS,
+    PROFILE_PORT,
+    SHUTDOWN_TIMEOUT,
+    SYMBOL_SOURCE,
+    WS_PRIVATE,
+)
 from db.database import Base, engine
+from db.upgrade import upgrade_schema
+from services.compaction import Compactor
+from services.data_processor import SHUTDOWN_FAILED, SHUTDOWN_FLUSHED, SHUTDOWN_SPILLED
+from services.db_size_checker import DBSizeChecker
+from services.retention import RetentionPruner
+from services.symbol_manager import SymbolManager, create_symbol_source
 from services.websocket_client import BybitWebSocketClient
-from utils.logging_config import setup_logging
+from utils.logging_config import setup_logging, stop_logging
+from utils.profiling import Profiler
 
 # Setup logging
 logger = setup_logging()
 
+# Process exit status for each shutdown outcome
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_SPILLED = 3
+EXIT_CODES = {
+    SHUTDOWN_FLUSHED: EXIT_OK,
+    SHUTDOWN_SPILLED: EXIT_SPILLED,
+    SHUTDOWN_FAILED: EXIT_ERROR,
+}
 
-def cleanup(ws_client):
-    """Clean up resources before exiting."""
+
+def cleanup(ws_client, symbol_manager=None, pruner=None, compactor=None):
+    """Clean up resources before exiting and return the process exit status."""
     logger.info("Shutting down...")
+    if symbol_manager:
+        symbol_manager.stop()
+    if pruner:
+        pruner.stop()
+    if compactor:
+        compactor.stop()
+    status = SHUTDOWN_FLUSHED
     if ws_client:
-        ws_client.disconnect()
-    logger.info("Application stopped")
+        status = ws_client.disconnect(SHUTDOWN_TIMEOUT)
+    logger.info(f"Application stopped ({status})")
+    return EXIT_CODES[status]
 
 
 def main():
     """Main application entry point."""
     ws_client = None
+    symbol_manager = None
+    pruner = None
+    compactor = None
+    profiler = Profiler()
+    exit_code = EXIT_OK
+    stop_event = threading.Event()
 
     try:
         # Create database tables if they don't exist
         logger.info("Initializing database...")
         Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
 
         # Initialize WebSocket client
         logger.info("Initializing WebSocket client...")
@@ -34,26 +75,60 @@ def main():
         # Set up signal handlers for graceful shutdown
         def signal_handler(sig, frame):
             logger.info(f"Received signal {sig}, shutting down...")
-            cleanup(ws_client)
-            sys.exit(0)
+            stop_event.set()
 
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
+        profiler.install_signal_handlers()
+        if PROFILE_PORT:
+            profiler.start_server(PROFILE_PORT)
 
         # Connect to WebSocket
         logger.info("Connecting to Bybit WebSocket API...")
-        ws_client.connect_public()
+        if SYMBOL_SOURCE:
+            symbol_manager = SymbolManager(
+                ws_client, create_symbol_source(SYMBOL_SOURCE), instruments=ws_client.data_processor.instruments
+            )
+            symbol_manager.start()
+        else:
+            ws_client.connect_public()
+        if WS_PRIVATE:
+            ws_client.connect_private()
+
+        if DATA_RETENTION_DAYS > 0:
+            processor = ws_client.data_processor
+            pruner = RetentionPruner(
+                size_checker=DBSizeChecker(),
+                writer_busy=lambda: processor.queue_depth() > 0,
+                writer_overloaded=lambda: processor.overloaded,
+            )
+            pruner.start()
+
+        if COMPACT_1S_DAYS or COMPACT_1M_DAYS:
+            if DATA_RETENTION_DAYS and max(COMPACT_1S_DAYS, COMPACT_1M_DAYS) >= DATA_RETENTION_DAYS:
+                logger.warning("Ticks are deleted by DATA_RETENTION_DAYS before they are old enough to compact")
+            processor = ws_client.data_processor
+            compactor = Compactor(
+                writer_busy=lambda: processor.queue_depth() > 0,
+                writer_overloaded=lambda: processor.overloaded,
+            )
+            compactor.start()
 
         # Keep the process running
         logger.info("Application started successfully. Press Ctrl+C to exit.")
-        while True:
-            time.sleep(1)
+        while not stop_event.wait(1):
+            ws_client.flush_stale()
 
     except Exception as e:
         logger.exception(f"Application error: {e}")
+        exit_code = EXIT_ERROR
     finally:
-        cleanup(ws_client)
+        profiler.stop()
+        exit_code = max(exit_code, cleanup(ws_client, symbol_manager, pruner, compactor))
+        stop_logging()
+
+    return exit_code
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
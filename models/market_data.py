@@ -1,15 +1,111 @@
-from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.sql import func
 
+from config.settings import TICKER_BRIN_INDEX, TICKER_RECENT_INDEX, TICKER_V2_SCALED
 from db.database import Base
 
+# Columns check_db --follow and --recent --brief print (utils.check_db.FOLLOW_COLUMNS), covered by ix_ticker_data_recent
+RECENT_COLUMNS = ('id', 'timestamp', 'symbol', 'last_price', 'bid1_price', 'bid1_size', 'ask1_price', 'ask1_size')
+
+
+def _not_postgresql(ddl, target, bind, dialect, **kw):
+    return dialect.name != 'postgresql'
+
+
+def ticker_indexes(prefix: str, brin: bool = TICKER_BRIN_INDEX, recent: bool = TICKER_RECENT_INDEX):
+    """The non-unique indexes of a ticker_data-shaped table, named ``<prefix>_...``.
+
+    Readers filter by symbol and a time range, and retention, compaction and
+    check_db --recent by time alone, so there is always a B-tree timestamp
+    index; ``recent`` replaces it with one covering check_db --recent --brief.
+    ``brin`` adds a BRIN timestamp index on PostgreSQL.
+    """
+    indexes = [Index(f'{prefix}_symbol_timestamp', 'symbol', 'timestamp')]
+    if brin:
+        indexes.append(
+            Index(f'{prefix}_timestamp_brin', 'timestamp', postgresql_using='brin').ddl_if(dialect='postgresql')
+        )
+    if not recent:
+        return indexes + [Index(f'{prefix}_timestamp', 'timestamp')]
+    included = [column for column in RECENT_COLUMNS if column != 'timestamp']
+    return indexes + [
+        Index(f'{prefix}_recent', 'timestamp', postgresql_include=included).ddl_if(dialect='postgresql'),
+        # Without INCLUDE the covered columns become trailing key columns (the id is the SQLite rowid anyway)
+        Index(f'{prefix}_recent', 'timestamp', *(column for column in included if column != 'id'))
+        .ddl_if(callable_=_not_postgresql),
+    ]
+
 
 class TickerData(Base):
     __tablename__ = 'ticker_data'
+    __table_args__ = (
+        # Natural key so replayed or retried batches are skipped instead of duplicated
+        UniqueConstraint('symbol', 'exchange_ts', 'cross_seq', name='uq_ticker_data_natural_key'),
+        # (symbol, timestamp) replaces the single-column symbol index; see ticker_indexes
+        *ticker_indexes('ix_ticker_data'),
+    )
 
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, index=True)
-    symbol = Column(String(20), index=True)
+    timestamp = Column(DateTime)
+    exchange_ts = Column(BigInteger, index=True)  # Bybit message ts, epoch ms
+    receive_ts = Column(BigInteger)  # local receive time, epoch ms
+    cross_seq = Column(BigInteger)  # Bybit cross sequence (cs)
+    symbol = Column(String(20))
+    tick_direction = Column(String(20))
+    price_24h_pcnt = Column(Float)
+    last_price = Column(Float)
+    prev_price_24h = Column(Float)
+    high_price_24h = Column(Float)
+    low_price_24h = Column(Float)
+    prev_price_1h = Column(Float)
+    mark_price = Column(Float)
+    index_price = Column(Float)
+    open_interest = Column(Float)
+    open_interest_value = Column(Float)
+    turnover_24h = Column(Float)
+    volume_24h = Column(Float)
+    next_funding_time = Column(BigInteger)
+    funding_rate = Column(Float)
+    bid1_price = Column(Float)
+    bid1_size = Column(Float)
+    ask1_price = Column(Float)
+    ask1_size = Column(Float)
+    pre_open_price = Column(String(50), nullable=True)
+    pre_qty = Column(String(50), nullable=True)
+    cur_pre_listing_phase = Column(String(50), nullable=True)
+    # Set on rows that summarise a conflated interval during overload: messages, high and low last price
+    conflated_count = Column(Integer, nullable=True)
+    interval_high = Column(Float, nullable=True)
+    interval_low = Column(Float, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<TickerData(symbol='{self.symbol}', last_price={self.last_price})>"
+
+
+class TickerLatest(Base):
+    """Newest ticker per symbol, upserted once per saved batch for current-state queries."""
+
+    __tablename__ = 'ticker_latest'
+
+    symbol = Column(String(20), primary_key=True)
+    timestamp = Column(DateTime)
+    exchange_ts = Column(BigInteger)
+    receive_ts = Column(BigInteger)
+    cross_seq = Column(BigInteger)
     tick_direction = Column(String(20))
     price_24h_pcnt = Column(Float)
     last_price = Column(Float)
@@ -31,8 +127,329 @@ class TickerData(Base):
     ask1_size = Column(Float)
     pre_open_price = Column(String(50), nullable=True)
     pre_qty = Column(String(50), nullable=True)
-    cur_pre_listing_phase = Column(String(50), nullable=True) 
+    cur_pre_listing_phase = Column(String(50), nullable=True)
+    conflated_count = Column(Integer, nullable=True)
+    interval_high = Column(Float, nullable=True)
+    interval_low = Column(Float, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<TickerLatest(symbol='{self.symbol}', last_price={self.last_price})>"
+
+
+class TickerColdFields(Base):
+    """Slowly changing ticker fields, one row per change, when TICKER_COLD_SPLIT is on.
+
+    A row holds the values in effect for its symbol from ``effective_from`` until the
+    next row; the ticker history rows written meanwhile leave these columns NULL.
+    """
+
+    __tablename__ = 'ticker_cold_fields'
+
+    symbol = Column(String(20), primary_key=True)
+    effective_from = Column(BigInteger, primary_key=True)  # receive_ts of the first row with these values
+    next_funding_time = Column(BigInteger)
+    funding_rate = Column(Float)
+    prev_price_24h = Column(Float)
+    prev_price_1h = Column(Float)
+    high_price_24h = Column(Float)
+    low_price_24h = Column(Float)
+    pre_open_price = Column(String(50), nullable=True)
+    pre_qty = Column(String(50), nullable=True)
+    cur_pre_listing_phase = Column(String(50), nullable=True)
+
+    def __repr__(self):
+        return f"<TickerColdFields(symbol='{self.symbol}', effective_from={self.effective_from})>"
+
+
+# SQLite only auto-increments columns declared exactly as INTEGER PRIMARY KEY
+_SMALL_ID = SmallInteger().with_variant(Integer, 'sqlite')
+_BIG_ID = BigInteger().with_variant(Integer, 'sqlite')
+# With TICKER_V2_SCALED, prices are stored in ticks and sizes in qty steps of the symbol
+_PRICE = BigInteger if TICKER_V2_SCALED else Float
+_SIZE = BigInteger if TICKER_V2_SCALED else Float
+
+
+class Symbol(Base):
+    """Symbol dictionary for the compact v2 ticker schema."""
+
+    __tablename__ = 'symbols'
+
+    id = Column(_SMALL_ID, primary_key=True)
+    name = Column(String(20), unique=True, nullable=False)
+    tick_size = Column(Float)  # price unit of scaled v2 rows
+    qty_step = Column(Float)  # size unit of scaled v2 rows
+
+    def __repr__(self):
+        return f"<Symbol(id={self.id}, name='{self.name}')>"
+
+
+class TickerDataV2(Base):
+    """Compact ticker history: dictionary symbols, smallint tick directions and epoch-ms times."""
+
+    __tablename__ = 'ticker_data_v2'
+    __table_args__ = (
+        UniqueConstraint('symbol_id', 'exchange_ts', 'cross_seq', name='uq_ticker_data_v2_natural_key'),
+        Index('ix_ticker_data_v2_receive_ts', 'receive_ts'),  # retention finds expired rows through it
+    )
+
+    id = Column(_BIG_ID, primary_key=True)
+    symbol_id = Column(_SMALL_ID, ForeignKey('symbols.id'), nullable=False)
+    exchange_ts = Column(BigInteger)  # Bybit message ts, epoch ms
+    receive_ts = Column(BigInteger, nullable=False)  # local receive time, epoch ms
+    cross_seq = Column(BigInteger)
+    tick_direction = Column(SmallInteger)  # index into services.ticker_buffer.TICK_DIRECTIONS
+    price_24h_pcnt = Column(Float)
+    last_price = Column(_PRICE)
+    prev_price_24h = Column(_PRICE)
+    high_price_24h = Column(_PRICE)
+    low_price_24h = Column(_PRICE)
+    prev_price_1h = Column(_PRICE)
+    mark_price = Column(Float)
+    index_price = Column(Float)
+    open_interest = Column(Float)
+    open_interest_value = Column(Float)
+    turnover_24h = Column(Float)
+    volume_24h = Column(Float)
+    next_funding_time = Column(BigInteger)
+    funding_rate = Column(Float)
+    bid1_price = Column(_PRICE)
+    bid1_size = Column(_SIZE)
+    ask1_price = Column(_PRICE)
+    ask1_size = Column(_SIZE)
+    # Only set for newly listed contracts; kept last so the usual all-NULL tail stays cheap
+    pre_open_price = Column(Float)
+    pre_qty = Column(Float)
+    cur_pre_listing_phase = Column(String(20))
+    conflated_count = Column(Integer)
+    interval_high = Column(_PRICE)
+    interval_low = Column(_PRICE)
+
+    def __repr__(self):
+        return f"<TickerDataV2(symbol_id={self.symbol_id}, last_price={self.last_price})>"
+
+
+class MigrationCheckpoint(Base):
+    """Resume point of a chunked backfill, keyed by migration name."""
+
+    __tablename__ = 'migration_checkpoints'
+
+    name = Column(String(50), primary_key=True)
+    last_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class _TickerBar:
+    """Columns shared by the downsampled ticker tiers."""
+
+    symbol = Column(String(20), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)  # bar start, same clock as ticker_data.timestamp
+    open_price = Column(Float)  # last_price of the first tick
+    high_price = Column(Float)  # includes the interval high/low of conflated rows
+    low_price = Column(Float)
+    close_price = Column(Float)
+    bid1_price = Column(Float)  # book of the last tick
+    bid1_size = Column(Float)
+    ask1_price = Column(Float)
+    ask1_size = Column(Float)
+    tick_count = Column(Integer)  # ticker messages summarised, counting every message of a conflated row
+
+
+class TickerBar1s(_TickerBar, Base):
+    """One-second bars of ticks older than COMPACT_1S_DAYS."""
+
+    __tablename__ = 'ticker_bars_1s'
+
+
+class TickerBar1m(_TickerBar, Base):
+    """One-minute bars of history older than COMPACT_1M_DAYS."""
+
+    __tablename__ = 'ticker_bars_1m'
+
+
+class CompactionCheckpoint(Base):
+    """Progress of compacting one symbol's day into one tier; ``completed`` once nothing is left."""
+
+    __tablename__ = 'compaction_checkpoints'
+
+    tier = Column(String(4), primary_key=True)
+    symbol = Column(String(20), primary_key=True)
+    day = Column(Date, primary_key=True)
+    source_rows = Column(BigInteger, nullable=False)  # rows compacted so far
+    completed = Column(Boolean, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class TickerMetrics(Base):
+    """Rolling metrics of one symbol over its last ``window_ticks`` ticks, persisted every METRICS_INTERVAL."""
+
+    __tablename__ = 'ticker_metrics'
+    __table_args__ = (
+        UniqueConstraint('symbol', 'window_ticks', 'timestamp', name='uq_ticker_metrics_natural_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, index=True)
+    symbol = Column(String(20), index=True)
+    window_ticks = Column(Integer)  # window length; WINDOW is reserved in PostgreSQL and MySQL
+    ticks = Column(Integer)  # ticks in the window so far
+    mid_price = Column(Float)
+    spread_bps = Column(Float)  # mean bid/ask spread relative to mid
+    mid_volatility = Column(Float)  # standard deviation of tick-to-tick mid log returns
+    basis_bps = Column(Float)  # mean of mark_price vs index_price
+    open_interest_change = Column(Float)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<TickerMetrics(symbol='{self.symbol}', window_ticks={self.window_ticks})>"
+
+
+class FeedGap(Base):
+    """A stretch in which a symbol's ticker stream was silent for longer than its adaptive timeout."""
+
+    __tablename__ = 'feed_gaps'
+    __table_args__ = (
+        UniqueConstraint('symbol', 'start_ts', name='uq_feed_gaps_natural_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(20), index=True)
+    start_ts = Column(BigInteger)  # receive time of the last message before the gap, epoch ms
+    end_ts = Column(BigInteger)  # receive time of the first message after it (or of shutdown), epoch ms
+    expected_interval_ms = Column(Float)  # learned mean time between messages
+    timeout_ms = Column(Float)
+    action = Column(String(20))  # none, resubscribe or reconnect: the last recovery step taken
+    recovered = Column(Boolean)  # False if the stream was still silent at shutdown
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<FeedGap(symbol='{self.symbol}', start_ts={self.start_ts}, end_ts={self.end_ts})>"
+
+
+# Private account streams. Every row keeps the message creation time (exchange_ts) and the
+# local receive time (receive_ts); with created_at they give the end-to-end latency of an event.
+
+
+class OrderUpdate(Base):
+    """One state change of one of our orders, from the private ``order`` topic."""
+
+    __tablename__ = 'order_updates'
+    __table_args__ = (
+        UniqueConstraint('order_id', 'updated_time', 'order_status', name='uq_order_updates_natural_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_ts = Column(BigInteger)  # message creationTime, epoch ms
+    receive_ts = Column(BigInteger)  # local receive time, epoch ms
+    category = Column(String(10))
+    symbol = Column(String(20), index=True)
+    order_id = Column(String(64), nullable=False)
+    order_link_id = Column(String(64))
+    side = Column(String(4))
+    order_type = Column(String(10))
+    order_status = Column(String(30))
+    time_in_force = Column(String(10))
+    price = Column(Float)
+    qty = Column(Float)
+    avg_price = Column(Float)
+    leaves_qty = Column(Float)
+    cum_exec_qty = Column(Float)
+    cum_exec_value = Column(Float)
+    cum_exec_fee = Column(Float)
+    reduce_only = Column(Boolean)
+    created_time = Column(BigInteger)  # epoch ms
+    updated_time = Column(BigInteger, index=True)  # epoch ms
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<OrderUpdate(order_id='{self.order_id}', order_status='{self.order_status}')>"
+
+
+class Execution(Base):
+    """One of our fills, from the private ``execution`` topic."""
+
+    __tablename__ = 'executions'
+
+    id = Column(Integer, primary_key=True)
+    exchange_ts = Column(BigInteger)
+    receive_ts = Column(BigInteger)
+    category = Column(String(10))
+    symbol = Column(String(20), index=True)
+    exec_id = Column(String(64), unique=True, nullable=False)
+    order_id = Column(String(64), index=True)
+    order_link_id = Column(String(64))
+    side = Column(String(4))
+    exec_type = Column(String(20))
+    exec_price = Column(Float)
+    exec_qty = Column(Float)
+    exec_value = Column(Float)
+    exec_fee = Column(Float)
+    fee_rate = Column(Float)
+    order_price = Column(Float)
+    order_qty = Column(Float)
+    closed_size = Column(Float)
+    is_maker = Column(Boolean)
+    exec_time = Column(BigInteger, index=True)  # epoch ms
+    seq = Column(BigInteger)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Execution(exec_id='{self.exec_id}', exec_price={self.exec_price})>"
+
+
+class PositionUpdate(Base):
+    """One change of one of our positions, from the private ``position`` topic."""
+
+    __tablename__ = 'position_updates'
+    __table_args__ = (
+        UniqueConstraint('symbol', 'position_idx', 'updated_time', 'seq', name='uq_position_updates_natural_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_ts = Column(BigInteger)
+    receive_ts = Column(BigInteger)
+    category = Column(String(10))
+    symbol = Column(String(20), index=True)
+    side = Column(String(4))
+    position_idx = Column(Integer)
+    size = Column(Float)
+    entry_price = Column(Float)
+    position_value = Column(Float)
+    mark_price = Column(Float)
+    leverage = Column(Float)
+    liq_price = Column(Float)
+    unrealised_pnl = Column(Float)
+    cum_realised_pnl = Column(Float)
+    position_status = Column(String(20))
+    updated_time = Column(BigInteger)  # epoch ms
+    seq = Column(BigInteger)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<PositionUpdate(symbol='{self.symbol}', size={self.size})>"
+
+
+class WalletUpdate(Base):
+    """Balance of one coin after a change, from the private ``wallet`` topic."""
+
+    __tablename__ = 'wallet_updates'
+    __table_args__ = (
+        UniqueConstraint('account_type', 'coin', 'exchange_ts', name='uq_wallet_updates_natural_key'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_ts = Column(BigInteger)
+    receive_ts = Column(BigInteger)
+    account_type = Column(String(20))
+    coin = Column(String(20))
+    equity = Column(Float)
+    wallet_balance = Column(Float)
+    available_to_withdraw = Column(Float)
+    unrealised_pnl = Column(Float)
+    cum_realised_pnl = Column(Float)
+    total_equity = Column(Float)  # account totals in USD
+    total_available_balance = Column(Float)
     created_at = Column(DateTime, server_default=func.now())
 
     def __repr__(self):
-        return f"<TickerData(symbol='{self.symbol}', last_price={self.last_price})>"
\ No newline at end of file
+        return f"<WalletUpdate(coin='{self.coin}', wallet_balance={self.wallet_balance})>"
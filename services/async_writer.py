@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from config.settings import ASYNC_WRITER_POOL_SIZE, DATABASE_URL
+from models.market_data import TickerData, TickerDataV2, TickerLatest
+
+logger = logging.getLogger("bybit_collector.async_writer")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def asyncpg_dsn(url: str) -> str:
+    """Turn a SQLAlchemy PostgreSQL URL (optionally with a ``+driver``) into a DSN asyncpg accepts."""
+    return re.sub(r'^postgresql\+\w+://', 'postgresql://', url)
+
+
+def _latest_sql(columns: Sequence[str]) -> str:
+    names = ', '.join(_quote(column) for column in columns)
+    params = ', '.join(f'${i}' for i in range(1, len(columns) + 1))
+    updates = ', '.join(f'{_quote(column)} = EXCLUDED.{_quote(column)}' for column in columns if column != 'symbol')
+    return (
+        f'INSERT INTO ticker_latest ({names}) VALUES ({params}) ON CONFLICT (symbol) DO UPDATE SET {updates}, '
+        f'updated_at = now() WHERE ticker_latest.receive_ts <= EXCLUDED.receive_ts'
+    )
+
+
+class AsyncPostgresWriter:
+    """Write batches to PostgreSQL with asyncpg, several at a time.
+
+    An asyncio loop runs on its own thread with a pool of ``pool_size``
+    connections. Every batch is copied with the binary COPY protocol into a
+    temporary table of its connection and moved into its table with
+    ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``, so duplicates are skipped as
+    with insert_ignore; ticker batches also refresh ticker_latest in the same
+    transaction. Batches on different connections run concurrently, but a batch
+    waits for every earlier batch that shares one of its symbols, so each
+    symbol's rows are committed in order.
+    """
+
+    def __init__(self, dsn: str = DATABASE_URL, pool_size: int = ASYNC_WRITER_POOL_SIZE, encoder=None) -> None:
+        try:
+            import asyncpg
+        except ImportError as e:
+            raise ImportError("AsyncPostgresWriter requires asyncpg (install the 'asyncpg' extra)") from e
+        self._asyncpg = asyncpg
+        self.dsn = asyncpg_dsn(dsn)
+        self.pool_size = pool_size
+        self.encoder = encoder  # CompactTickerEncoder when ticker history goes to ticker_data_v2
+        self._pool = None
+        self._tails: Dict[str, asyncio.Future] = {}  # symbol -> completion of its newest submitted batch
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-writer", daemon=True)
+        self._thread.start()
+
+    def start(self) -> None:
+        """Open the connection pool."""
+        self._pool = asyncio.run_coroutine_threadsafe(self._create_pool(), self._loop).result()
+
+    async def _create_pool(self):
+        # The pool binds to the loop it is created on
+        return await self._asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+
+    def submit(self, batch) -> Future:
+        """Queue a batch for writing; the future resolves to the number of rows inserted.
+
+        Rows are built (and encoded for ticker_data_v2) in the calling thread, so
+        the event loop only does I/O.
+        """
+        rows = list(batch.rows())
+        table_name = batch.table_name
+        latest = None
+        if table_name == TickerData.__tablename__:
+            # Rows are in arrival order, so the last one per symbol is the newest
+            latest = list({row['symbol']: row for row in rows}.values())
+            if self.encoder is not None:
+                rows = self.encoder.encode(rows)
+                table_name = TickerDataV2.__tablename__
+        return asyncio.run_coroutine_threadsafe(
+            self._write_in_order(set(batch.symbols), table_name, rows, latest), self._loop
+        )
+
+    def write(self, batch) -> int:
+        """Write a batch and wait for it to commit."""
+        return self.submit(batch).result()
+
+    async def _write_in_order(self, symbols: Set[str], table_name: str, rows, latest) -> int:
+        # Runs on the loop thread, so claiming the tails needs no lock
+        previous = {self._tails[symbol] for symbol in symbols if symbol in self._tails}
+        done = self._loop.create_future()
+        for symbol in symbols:
+            self._tails[symbol] = done
+        try:
+            if previous:
+                await asyncio.wait(previous)
+            return await self._write(table_name, rows, latest)
+        finally:
+            done.set_result(None)
+            for symbol in symbols:
+                if self._tails.get(symbol) is done:
+                    del self._tails[symbol]
+
+    async def _write(self, table_name: str, rows: List[Dict[str, Any]],
+                     latest: Optional[List[Dict[str, Any]]]) -> int:
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        names = ', '.join(_quote(column) for column in columns)
+        staging = _quote(f'_copy_{table_name}')
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                # Emptied by every commit and kept for the life of the connection
+                await connection.execute(
+                    f'CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS '
+                    f'SELECT {names} FROM {_quote(table_name)} WITH NO DATA'
+                )
+                await connection.copy_records_to_table(
+                    f'_copy_{table_name}', records=[tuple(row[column] for column in columns) for row in rows],
+                    columns=columns,
+                )
+                status = await connection.execute(
+                    f'INSERT INTO {_quote(table_name)} ({names}) SELECT {names} FROM {staging} '
+                    f'ON CONFLICT DO NOTHING'
+                )
+                if latest:
+                    latest_columns = [column for column in latest[0] if column in TickerLatest.__table__.c]
+                    await connection.executemany(
+                        _latest_sql(latest_columns), [tuple(row[column] for column in latest_columns) for row in latest]
+                    )
+        return int(status.rsplit(' ', 1)[-1])
+
+    def close(self, timeout: float = 10) -> None:
+        """Close the pool, waiting up to ``timeout`` seconds for running writes, and stop the loop."""
+        if self._pool is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    asyncio.wait_for(self._pool.close(), timeout), self._loop
+                ).result()
+            except Exception as e:
+                logger.warning(f"Closing the asyncpg pool failed, terminating it: {e}")
+                self._loop.call_soon_threadsafe(self._pool.terminate)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings import BATCH_MAX_AGE, BATCH_MAX_SIZE, BATCH_MIN_SIZE, BATCH_TARGET_ROWS, TICKER_BATCH_SIZE
+
+# Fraction of wall time the writer may spend committing before batches are grown to amortize commits
+TARGET_UTILIZATION = 0.5
+# Weight of the newest observation in the per-symbol arrival rate average
+RATE_SMOOTHING = 0.3
+# Seconds over which writer utilization is measured
+UTILIZATION_WINDOW = 10.0
+
+
+class AdaptiveBatchController:
+    """Per-symbol flush thresholds derived from arrival rate and writer load.
+
+    A symbol's threshold is the number of rows it accumulates within ``max_age``
+    seconds, capped at ``target_rows`` so busy symbols commit in target-sized
+    batches. While the writer spends more than TARGET_UTILIZATION of its time
+    committing, the target grows proportionally so fewer, larger commits are made.
+    Thresholds stay within ``[min_size, max_size]``; buffers older than ``max_age``
+    are flushed by age regardless of their threshold.
+    """
+
+    def __init__(
+        self,
+        target_rows: int = BATCH_TARGET_ROWS,
+        max_age: float = BATCH_MAX_AGE,
+        min_size: int = BATCH_MIN_SIZE,
+        max_size: int = BATCH_MAX_SIZE,
+        initial_size: int = TICKER_BATCH_SIZE,
+    ) -> None:
+        self.target_rows = target_rows
+        self.max_age = max_age
+        self.min_size = min_size
+        self.max_size = max_size
+        self.initial_size = min(max(initial_size, min_size), max_size)
+        self.load_factor = 1.0
+        self._thresholds: Dict[str, int] = {}
+        self._rates: Dict[str, float] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._busy = 0.0
+        self._window_start = time.monotonic()
+
+    def threshold(self, symbol: str) -> int:
+        """Rows at which the symbol's buffer is handed to the writer."""
+        return self._thresholds.get(symbol, self.initial_size)
+
+    def thresholds(self) -> Dict[str, int]:
+        """Current threshold of every symbol seen so far."""
+        return dict(self._thresholds)
+
+    def rate(self, symbol: str) -> Optional[float]:
+        """Smoothed arrival rate of buffered rows in rows/second, once known."""
+        return self._rates.get(symbol)
+
+    def _compute(self, rate: float) -> int:
+        size = min(self.target_rows * self.load_factor, rate * self.max_age)
+        return int(min(max(size, self.min_size), self.max_size))
+
+    def observe_batch(self, symbol: str, rows: int, first_received: float, now: Optional[float] = None) -> None:
+        """Update a symbol's rate and threshold after one of its buffers was flushed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            # Measure from the previous flush so idle gaps count, but not from before the buffer started
+            start = min(self._last_flush.get(symbol, first_received), first_received)
+            self._last_flush[symbol] = now
+            if now <= start:
+                return
+            rate = rows / (now - start)
+            previous = self._rates.get(symbol)
+            rate = rate if previous is None else previous + RATE_SMOOTHING * (rate - previous)
+            self._rates[symbol] = rate
+            self._thresholds[symbol] = self._compute(rate)
+
+    def observe_commit(self, seconds: float, now: Optional[float] = None) -> None:
+        """Account one writer commit that took ``seconds``; updates the load factor once per window."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._busy += seconds
+            elapsed = now - self._window_start
+            if elapsed < UTILIZATION_WINDOW:
+                return
+            utilization = self._busy / elapsed
+            self._busy = 0.0
+            self._window_start = now
+            self.load_factor = max(1.0, utilization / TARGET_UTILIZATION)
+            self._thresholds = {symbol: self._compute(rate) for symbol, rate in self._rates.items()}
+
+    def forget(self, symbol: str) -> None:
+        """Drop the state of a symbol that is no longer subscribed."""
+        with self._lock:
+            self._thresholds.pop(symbol, None)
+            self._rates.pop(symbol, None)
+            self._last_flush.pop(symbol, None)
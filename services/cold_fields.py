@@ -0,0 +1,91 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, cast, func, select
+
+from db.bulk import upsert
+from models.market_data import TickerColdFields, TickerData
+
+logger = logging.getLogger("bybit_collector.cold_fields")
+
+# Ticker columns that change far less often than prices and book, stored once per change
+COLD_COLUMNS = (
+    'next_funding_time', 'funding_rate', 'prev_price_24h', 'prev_price_1h', 'high_price_24h', 'low_price_24h',
+    'pre_open_price', 'pre_qty', 'cur_pre_listing_phase',
+)
+_TEXT_COLUMNS = ('pre_open_price', 'pre_qty', 'cur_pre_listing_phase')
+_NULL_COLD = dict.fromkeys(COLD_COLUMNS)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+class ColdFieldSplitter:
+    """Split ticker rows into hot rows and change-only ticker_cold_fields rows.
+
+    The last stored cold values of every symbol are cached (and loaded from the
+    table the first time a symbol is seen), so a cold row is only written when one
+    of the values differs. Call :meth:`reset` when a transaction that went through
+    :meth:`split` is rolled back, so the cache is reloaded from what was committed.
+    """
+
+    def __init__(self) -> None:
+        self._current: Dict[str, Tuple[Any, ...]] = {}
+        self.rows_written = 0
+
+    def _load(self, session, symbols) -> None:
+        table = TickerColdFields.__table__
+        for symbol in symbols:
+            row = session.execute(
+                select(*(table.c[name] for name in COLD_COLUMNS)).where(table.c.symbol == symbol)
+                .order_by(table.c.effective_from.desc()).limit(1)
+            ).first()
+            self._current[symbol] = tuple(row) if row is not None else None
+
+    def split(self, session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write the cold value changes found in ``rows`` and return the rows with cold columns cleared."""
+        self._load(session, {row['symbol'] for row in rows} - self._current.keys())
+        changes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for row in rows:
+            values = tuple(_text(row[name]) if name in _TEXT_COLUMNS else row[name] for name in COLD_COLUMNS)
+            if values != self._current[row['symbol']]:
+                self._current[row['symbol']] = values
+                # The last change wins if two land on the same millisecond
+                changes[(row['symbol'], row['receive_ts'])] = {
+                    'symbol': row['symbol'], 'effective_from': row['receive_ts'], **dict(zip(COLD_COLUMNS, values)),
+                }
+        upsert(session, TickerColdFields.__table__, list(changes.values()))
+        self.rows_written += len(changes)
+        return [{**row, **_NULL_COLD} for row in rows]
+
+    def reset(self) -> None:
+        self._current.clear()
+
+
+def with_cold_fields(query=None):
+    """Rebuild full ticker records from a query over hot rows.
+
+    ``query`` must select ``symbol``, ``receive_ts`` and the cold columns, e.g.
+    ``select(TickerData)`` or ``compact_schema.wide_query()``; it defaults to all of
+    ticker_data. Filter inside ``query`` so its indexes are used. Each row is joined
+    to the newest ticker_cold_fields row effective at its receive time; values
+    stored on the row itself, as on rows written before the split, take precedence.
+    """
+    hot = (query if query is not None else select(TickerData.__table__)).subquery()
+    cold = TickerColdFields.__table__
+    changes = cold.alias('changes')
+    effective = (
+        select(func.max(changes.c.effective_from))
+        .where(changes.c.symbol == hot.c.symbol, changes.c.effective_from <= hot.c.receive_ts)
+        .correlate(hot)
+        .scalar_subquery()
+    )
+    columns = [
+        func.coalesce(column, cast(cold.c[column.name], column.type)).label(column.name)
+        if column.name in COLD_COLUMNS else column
+        for column in hot.c
+    ]
+    return select(*columns).select_from(
+        hot.outerjoin(cold, and_(cold.c.symbol == hot.c.symbol, cold.c.effective_from == effective))
+    )
@@ -0,0 +1,179 @@
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from config.settings import TICKER_V2_SCALED
+from db.bulk import insert_ignore
+from models.market_data import Symbol, TickerDataV2
+from services.ticker_buffer import TICK_DIRECTIONS
+
+logger = logging.getLogger("bybit_collector.compact_schema")
+
+# Columns scaled by the symbol's tick size / qty step when TICKER_V2_SCALED is on. Mark and
+# index prices are quoted with more precision than the tick size, so they stay floats.
+PRICE_COLUMNS = (
+    'last_price', 'prev_price_24h', 'high_price_24h', 'low_price_24h', 'prev_price_1h', 'bid1_price', 'ask1_price',
+    'interval_high', 'interval_low',
+)
+SIZE_COLUMNS = ('bid1_size', 'ask1_size')
+# Seconds before looking up the instrument info of a symbol that could not be scaled again
+REFETCH_INTERVAL = 60.0
+
+_COPIED_COLUMNS = (
+    'exchange_ts', 'cross_seq', 'price_24h_pcnt', 'mark_price', 'index_price', 'open_interest',
+    'open_interest_value', 'turnover_24h', 'volume_24h', 'next_funding_time', 'funding_rate',
+    'cur_pre_listing_phase', 'conflated_count',
+)
+_TICK_DIRECTION_CODES = {name: code for code, name in enumerate(TICK_DIRECTIONS)}
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    return float(value) if value not in (None, '') else None
+
+
+class SymbolDictionary:
+    """Map symbol names to their ``symbols`` row, creating rows on first use.
+
+    New rows are committed in their own transaction so a rolled back batch never
+    leaves cached ids that do not exist. Tick sizes and qty steps come from
+    ``instruments`` (as loaded by SymbolManager) when the symbol is first seen, or
+    from ``fetch`` for symbols it does not know. A symbol whose scales are unknown
+    is stored with NULL ones, and refused while scales are required.
+    """
+
+    def __init__(self, session_factory: Callable, instruments: Optional[Dict[str, Dict[str, Any]]] = None,
+                 fetch: Optional[Callable[[List[str]], List[Dict[str, Any]]]] = None) -> None:
+        self.session_factory = session_factory
+        self.instruments = instruments if instruments is not None else {}
+        self.fetch = fetch
+        self._entries: Dict[str, Tuple[int, Optional[float], Optional[float]]] = {}
+        self._refused: Dict[str, float] = {}  # name -> when it was last refused
+
+    def resolve(self, names: Iterable[str], require_scales: bool = False) -> Dict[str, Tuple[int, float, float]]:
+        """Return ``{name: (id, tick_size, qty_step)}`` for every name.
+
+        With ``require_scales``, names without a known tick size and qty step are left out.
+        """
+        names = set(names)
+        missing = names - self._entries.keys()
+        if missing:
+            session = self.session_factory()
+            try:
+                self._load(session, missing, require_scales)
+                new = missing - self._entries.keys()
+                if require_scales:
+                    new = self._with_scales(new)
+                if new:
+                    insert_ignore(session, Symbol.__table__, [
+                        {
+                            'name': name,
+                            'tick_size': self.instruments.get(name, {}).get('tick_size'),
+                            'qty_step': self.instruments.get(name, {}).get('qty_step'),
+                        }
+                        for name in sorted(new)
+                    ])
+                    session.commit()
+                    self._load(session, new, require_scales)
+            finally:
+                session.close()
+        return {
+            name: self._entries[name] for name in names
+            if name in self._entries and (not require_scales or self._scaled(self._entries[name]))
+        }
+
+    def _load(self, session, names, require_scales: bool) -> None:
+        for symbol in session.execute(select(Symbol).where(Symbol.name.in_(names))).scalars():
+            self._entries[symbol.name] = entry = (symbol.id, symbol.tick_size, symbol.qty_step)
+            if require_scales and not self._scaled(entry):
+                logger.error(f"{symbol.name} has no tick size or qty step, not storing its scaled rows")
+
+    @staticmethod
+    def _scaled(entry) -> bool:
+        return bool(entry[1] and entry[2])
+
+    def _known(self, name: str) -> bool:
+        instrument = self.instruments.get(name, {})
+        return bool(instrument.get('tick_size') and instrument.get('qty_step'))
+
+    def _with_scales(self, names) -> set:
+        """The names whose tick size and qty step are known, fetching them where needed and allowed."""
+        now = time.monotonic()
+        unknown = sorted(
+            name for name in names
+            if not self._known(name) and (name not in self._refused or now - self._refused[name] >= REFETCH_INTERVAL)
+        )
+        if unknown and self.fetch is not None:
+            try:
+                self.instruments.update((instrument['symbol'], instrument) for instrument in self.fetch(unknown))
+            except Exception as e:
+                logger.error(f"Failed to fetch instrument info for {', '.join(unknown)}: {e}")
+        refused = [name for name in unknown if not self._known(name)]
+        if refused:
+            logger.error(f"Unknown tick size or qty step for {', '.join(refused)}, not storing their scaled rows")
+            self._refused.update((name, now) for name in refused)
+        return {name for name in names if self._known(name)}
+
+
+class CompactTickerEncoder:
+    """Convert ticker_data rows into ticker_data_v2 rows.
+
+    When scaled, rows of symbols without a known tick size and qty step are
+    skipped, or refused with ValueError if ``strict``.
+    """
+
+    def __init__(self, symbols: SymbolDictionary, scaled: bool = TICKER_V2_SCALED, strict: bool = False) -> None:
+        self.symbols = symbols
+        self.scaled = scaled
+        self.strict = strict
+
+    def encode(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        names = {row['symbol'] for row in rows}
+        symbols = self.symbols.resolve(names, require_scales=self.scaled)
+        if self.strict and len(symbols) < len(names):
+            raise ValueError(f"Unknown tick size or qty step for {', '.join(sorted(names - symbols.keys()))}")
+        encoded = []
+        for row in rows:
+            if row['symbol'] not in symbols:
+                continue
+            symbol_id, tick_size, qty_step = symbols[row['symbol']]
+            receive_ts = row.get('receive_ts')
+            if receive_ts is None:
+                # Rows written before receive_ts existed only carry the DateTime timestamp
+                timestamp = row['timestamp']
+                receive_ts = int(timestamp.timestamp() * 1000) if isinstance(timestamp, datetime) else 0
+            compact = {name: row.get(name) for name in _COPIED_COLUMNS}
+            compact['symbol_id'] = symbol_id
+            compact['receive_ts'] = receive_ts
+            compact['tick_direction'] = _TICK_DIRECTION_CODES.get(row['tick_direction'])
+            compact['pre_open_price'] = _optional_float(row.get('pre_open_price'))
+            compact['pre_qty'] = _optional_float(row.get('pre_qty'))
+            # Missing prices and sizes are stored as NULL, like every other copied column
+            for columns, step in ((PRICE_COLUMNS, tick_size), (SIZE_COLUMNS, qty_step)):
+                for name in columns:
+                    value = row.get(name)
+                    compact[name] = round(value / step) if self.scaled and value is not None else value
+            encoded.append(compact)
+        return encoded
+
+    def insert(self, session, rows: List[Dict[str, Any]]) -> int:
+        """Encode and insert rows, skipping duplicates; returns the number inserted."""
+        return insert_ignore(session, TickerDataV2.__table__, self.encode(rows))
+
+
+def wide_query(scaled: bool = TICKER_V2_SCALED):
+    """Select ticker_data_v2 joined with its symbols, with prices and sizes in natural units."""
+    table = TickerDataV2.__table__
+    columns = []
+    for column in table.columns:
+        if column.name == 'symbol_id':
+            columns.append(Symbol.name.label('symbol'))
+        elif scaled and column.name in PRICE_COLUMNS:
+            columns.append((column * Symbol.tick_size).label(column.name))
+        elif scaled and column.name in SIZE_COLUMNS:
+            columns.append((column * Symbol.qty_step).label(column.name))
+        else:
+            columns.append(column)
+    return select(*columns).join(Symbol, Symbol.id == table.c.symbol_id)
@@ -0,0 +1,292 @@
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from config.settings import (
+    COMPACT_1M_DAYS,
+    COMPACT_1S_DAYS,
+    COMPACTION_CHUNK_SIZE,
+    COMPACTION_INTERVAL,
+    COMPACTION_PAUSE,
+)
+from db.bulk import upsert
+from db.database import SessionLocal
+from models.market_data import CompactionCheckpoint, TickerBar1m, TickerBar1s, TickerData
+
+logger = logging.getLogger("bybit_collector.compaction")
+
+# Longest the compactor waits for the save queue to empty before the next chunk anyway
+MAX_YIELD_SECONDS = 5.0
+
+# Bar tiers, finest first: (name, table, bar width)
+TIERS = (
+    ('1s', TickerBar1s.__table__, timedelta(seconds=1)),
+    ('1m', TickerBar1m.__table__, timedelta(minutes=1)),
+)
+TICKS = 'tick'
+
+_BOOK = ('bid1_price', 'bid1_size', 'ask1_price', 'ask1_size')
+_TICK_COLUMNS = ('id', 'symbol', 'timestamp', 'last_price', 'interval_high', 'interval_low', 'conflated_count') + _BOOK
+
+
+def bar_start(timestamp: datetime, width: timedelta) -> datetime:
+    return datetime.min + (timestamp - datetime.min) // width * width
+
+
+def _max(a, b):
+    return a if b is None else b if a is None else max(a, b)
+
+
+def _min(a, b):
+    return a if b is None else b if a is None else min(a, b)
+
+
+def _tick_bar(row) -> Dict[str, Any]:
+    """A ticker_data row as a bar of its own; conflated rows bring their interval high, low and message count."""
+    return {
+        'symbol': row.symbol,
+        'timestamp': row.timestamp,
+        'open_price': row.last_price,
+        'high_price': _max(row.last_price, row.interval_high),
+        'low_price': _min(row.last_price, row.interval_low),
+        'close_price': row.last_price,
+        **{name: getattr(row, name) for name in _BOOK},
+        'tick_count': row.conflated_count or 1,
+    }
+
+
+def fold(bars: Dict[datetime, Dict[str, Any]], bar: Dict[str, Any], width: timedelta) -> None:
+    """Merge ``bar`` into the ``width`` bar it falls in; it must not be older than what that bar holds."""
+    start = bar_start(bar['timestamp'], width)
+    current = bars.get(start)
+    if current is None:
+        bars[start] = {**bar, 'timestamp': start}
+        return
+    current['high_price'] = _max(current['high_price'], bar['high_price'])
+    current['low_price'] = _min(current['low_price'], bar['low_price'])
+    current['close_price'] = bar['close_price']
+    for name in _BOOK:
+        current[name] = bar[name]
+    current['tick_count'] += bar['tick_count']
+
+
+def _as_bar(source_name: str, row) -> Dict[str, Any]:
+    return _tick_bar(row) if source_name == TICKS else dict(row._mapping)
+
+
+def history(session, symbol: str, start: datetime, end: datetime) -> Tuple[str, List[Dict[str, Any]]]:
+    """History of ``symbol`` in [start, end) at the finest resolution that reaches back to ``start``.
+
+    Returns ``('tick', ticker_data rows)`` while raw ticks still cover ``start``,
+    otherwise ``('1s', bars)`` or ``('1m', bars)``. Newer data held at a finer
+    resolution is rolled up into the chosen bars, so the whole range is covered.
+    If no tier reaches back to ``start``, the coarsest one holding data is used.
+    """
+    sources = [(TICKS, TickerData.__table__, None), *TIERS]
+    chosen = None
+    for i, (_, table, _) in enumerate(sources):
+        oldest = session.execute(select(func.min(table.c.timestamp)).where(table.c.symbol == symbol)).scalar()
+        if oldest is not None:
+            chosen = i
+            if oldest <= start:
+                break
+    if chosen is None:
+        return TICKS, []
+
+    name, table, width = sources[chosen]
+    if width is None:
+        query = (
+            select(table).where(table.c.symbol == symbol, table.c.timestamp >= start, table.c.timestamp < end)
+            .order_by(table.c.timestamp, table.c.id)
+        )
+        return TICKS, [dict(row._mapping) for row in session.execute(query)]
+
+    lower = bar_start(start, width)
+    bars: Dict[datetime, Dict[str, Any]] = {}
+    # Coarser tiers hold the older data, so fold from the chosen tier down to raw ticks
+    for source_name, source, _ in reversed(sources[:chosen + 1]):
+        columns = [source.c[column] for column in _TICK_COLUMNS] if source_name == TICKS else [source]
+        query = (
+            select(*columns).where(source.c.symbol == symbol, source.c.timestamp >= lower, source.c.timestamp < end)
+            .order_by(source.c.timestamp)
+        )
+        for row in session.execute(query):
+            fold(bars, _as_bar(source_name, row), width)
+    return name, sorted(bars.values(), key=itemgetter('timestamp'))
+
+
+class Compactor:
+    """Downsample aging ticker_data into the 1-second and 1-minute bar tiers.
+
+    Ticks older than ``seconds_after_days`` are rolled into ticker_bars_1s and
+    history older than ``minutes_after_days`` into ticker_bars_1m (from the 1s
+    bars, or straight from ticks when the 1s tier is off). Work goes one
+    (symbol, day) at a time in chunks: every chunk merges its bars with the ones
+    already stored, deletes the rows it compacted and advances that day's
+    checkpoint in a single transaction, so an interrupted pass resumes where it
+    stopped without counting anything twice. Between chunks the compactor yields
+    to the collector's writer like RetentionPruner.
+    """
+
+    def __init__(
+        self,
+        seconds_after_days: int = COMPACT_1S_DAYS,
+        minutes_after_days: int = COMPACT_1M_DAYS,
+        session_factory: Callable = SessionLocal,
+        writer_busy: Optional[Callable[[], bool]] = None,
+        writer_overloaded: Optional[Callable[[], bool]] = None,
+        chunk_size: int = COMPACTION_CHUNK_SIZE,
+        pause: float = COMPACTION_PAUSE,
+        interval: float = COMPACTION_INTERVAL,
+    ) -> None:
+        if seconds_after_days and minutes_after_days and minutes_after_days <= seconds_after_days:
+            raise ValueError("COMPACT_1M_DAYS must be larger than COMPACT_1S_DAYS")
+        days = {'1s': seconds_after_days, '1m': minutes_after_days}
+        self.tiers = [(name, table, width, days[name]) for name, table, width in TIERS if days[name] > 0]
+        self.session_factory = session_factory
+        self.writer_busy = writer_busy
+        self.writer_overloaded = writer_overloaded
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.interval = interval
+        self.rows_compacted = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _yield_to_writer(self) -> None:
+        self._stop_event.wait(self.pause)
+        while self.writer_overloaded and self.writer_overloaded() and not self._stop_event.is_set():
+            self._stop_event.wait(1.0)
+        deadline = time.monotonic() + MAX_YIELD_SECONDS
+        while self.writer_busy and self.writer_busy() and time.monotonic() < deadline:
+            if self._stop_event.wait(0.05):
+                return
+
+    def _pending_days(self, tier: str, source, cutoff: date) -> List[Tuple[str, date]]:
+        """(symbol, day) pairs before ``cutoff`` that still have source rows and are not completed."""
+        checkpoints = CompactionCheckpoint.__table__
+        with self.session_factory() as session:
+            oldest = session.execute(
+                select(source.c.symbol, func.min(source.c.timestamp))
+                .where(source.c.timestamp < datetime.combine(cutoff, datetime.min.time()))
+                .group_by(source.c.symbol)
+            ).all()
+            if not oldest:
+                return []
+            completed = set(session.execute(
+                select(checkpoints.c.symbol, checkpoints.c.day).where(
+                    checkpoints.c.tier == tier,
+                    checkpoints.c.completed.is_(True),
+                    checkpoints.c.day >= min(first for _, first in oldest).date(),
+                )
+            ).all())
+        pending = []
+        for symbol, first in oldest:
+            day = first.date()
+            while day < cutoff:
+                if (symbol, day) not in completed:
+                    pending.append((symbol, day))
+                day += timedelta(days=1)
+        return pending
+
+    def _compact_chunk(self, session, source_name: str, source, target, width: timedelta, symbol: str, rows) -> None:
+        first, last = rows[0].timestamp, rows[-1].timestamp
+        # Bars already started by the previous chunk come first
+        bars = {
+            row.timestamp: dict(row._mapping)
+            for row in session.execute(
+                select(target).where(
+                    target.c.symbol == symbol,
+                    target.c.timestamp >= bar_start(first, width),
+                    target.c.timestamp <= bar_start(last, width),
+                )
+            )
+        }
+        for row in rows:
+            fold(bars, _as_bar(source_name, row), width)
+        upsert(session, target, list(bars.values()))
+        if source_name == TICKS:
+            session.execute(delete(source).where(source.c.id.in_([row.id for row in rows])))
+        else:
+            # (symbol, timestamp) is the key of a bar table, so the range holds exactly these rows
+            session.execute(delete(source).where(
+                source.c.symbol == symbol, source.c.timestamp >= first, source.c.timestamp <= last
+            ))
+
+    def _compact_day(self, tier: str, source_name: str, source, target, width: timedelta, symbol: str,
+                     day: date) -> int:
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        if source_name == TICKS:
+            columns, order = [source.c[column] for column in _TICK_COLUMNS], [source.c.timestamp, source.c.id]
+        else:
+            columns, order = [source], [source.c.timestamp]
+        compacted = 0
+        while not self._stop_event.is_set():
+            with self.session_factory() as session:
+                rows = session.execute(
+                    select(*columns)
+                    .where(source.c.symbol == symbol, source.c.timestamp >= start, source.c.timestamp < end)
+                    .order_by(*order).limit(self.chunk_size)
+                ).all()
+                if rows:
+                    self._compact_chunk(session, source_name, source, target, width, symbol, rows)
+                checkpoint = session.get(CompactionCheckpoint, (tier, symbol, day))
+                upsert(session, CompactionCheckpoint.__table__, [{
+                    'tier': tier,
+                    'symbol': symbol,
+                    'day': day,
+                    'source_rows': (checkpoint.source_rows if checkpoint else 0) + len(rows),
+                    'completed': len(rows) < self.chunk_size,
+                }])
+                session.commit()
+            compacted += len(rows)
+            if len(rows) < self.chunk_size:
+                break
+            self._yield_to_writer()
+        return compacted
+
+    def compact(self, now: Optional[datetime] = None) -> int:
+        """Run one compaction pass over every enabled tier and return the number of source rows compacted."""
+        now = now or datetime.now()
+        started = time.monotonic()
+        source_name, source = TICKS, TickerData.__table__
+        total = 0
+        for tier, target, width, days in self.tiers:
+            cutoff = (now - timedelta(days=days)).date()
+            for symbol, day in self._pending_days(tier, source, cutoff):
+                if self._stop_event.is_set():
+                    break
+                compacted = self._compact_day(tier, source_name, source, target, width, symbol, day)
+                if compacted:
+                    logger.info("Compacted %d %s rows of %s on %s into %s bars", compacted, source.name, symbol,
+                                day, tier)
+                total += compacted
+            source_name, source = tier, target
+        self.rows_compacted += total
+        logger.info(f"Compaction pass compacted {total} rows in {time.monotonic() - started:.1f}s")
+        return total
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting ticker history: {e}", exc_info=True)
+            self._stop_event.wait(self.interval)
+
+    def start(self) -> None:
+        """Compact now and then every ``interval`` seconds in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current chunk."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
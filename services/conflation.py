@@ -0,0 +1,80 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from config.settings import CONFLATION_INTERVAL
+
+# (symbol, data, received, exchange_ts, cross_seq, (count, high, low)) for one finished interval
+ConflatedRow = Tuple[str, Dict[str, Any], float, int, int, Tuple[int, float, float]]
+
+
+class _Interval:
+    __slots__ = ('start', 'data', 'received', 'exchange_ts', 'cross_seq', 'count', 'high', 'low')
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.data: Optional[Dict[str, Any]] = None
+        self.received = 0.0
+        self.exchange_ts = 0
+        self.cross_seq = 0
+        self.count = 0
+        self.high = float('-inf')
+        self.low = float('inf')
+
+
+class Conflator:
+    """Reduce each symbol's ticks to one row per interval while the writer is overloaded.
+
+    A finished interval is emitted as its last message, together with how many
+    messages it replaced and the high and low last price seen within it.
+    """
+
+    def __init__(self, interval: float = CONFLATION_INTERVAL) -> None:
+        self.interval = interval
+        self._open: Dict[str, _Interval] = {}
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def add(
+        self, symbol: str, data: Dict[str, Any], received: float, exchange_ts: int, cross_seq: int
+    ) -> Optional[ConflatedRow]:
+        """Fold one message into its symbol's interval; returns the previous interval if this one closed it."""
+        price = float(data['lastPrice'])
+        interval = self._open.get(symbol)
+        finished = None
+        if interval is not None and received - interval.start >= self.interval:
+            finished = self._emit(symbol, self._open.pop(symbol))
+            interval = None
+        if interval is None:
+            interval = self._open[symbol] = _Interval(received)
+        # pybit updates one dict per topic in place, so keep a copy of the state at this message
+        interval.data = dict(data)
+        interval.received = received
+        interval.exchange_ts = exchange_ts
+        interval.cross_seq = cross_seq
+        interval.count += 1
+        interval.high = max(interval.high, price)
+        interval.low = min(interval.low, price)
+        return finished
+
+    def expired(self, now: float) -> Iterator[ConflatedRow]:
+        """Emit intervals that ended before ``now`` without a later message to close them."""
+        for symbol in [symbol for symbol, interval in self._open.items() if now - interval.start >= self.interval]:
+            yield self._emit(symbol, self._open.pop(symbol))
+
+    def drain(self) -> Iterator[ConflatedRow]:
+        """Emit every open interval, e.g. when leaving overload mode."""
+        while self._open:
+            symbol, interval = self._open.popitem()
+            yield self._emit(symbol, interval)
+
+    def pop(self, symbol: str) -> Optional[ConflatedRow]:
+        """Emit one symbol's open interval, if any, and stop tracking it."""
+        interval = self._open.pop(symbol, None)
+        return self._emit(symbol, interval) if interval is not None else None
+
+    @staticmethod
+    def _emit(symbol: str, interval: _Interval) -> ConflatedRow:
+        return (
+            symbol, interval.data, interval.received, interval.exchange_ts, interval.cross_seq,
+            (interval.count, interval.high, interval.low),
+        )
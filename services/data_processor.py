@@ -1,30 +1,115 @@
 import logging
+import os
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
+from collections import Counter
+from concurrent.futures import wait
+from queue import Empty, Queue
 
-from db.database import get_db
-from models.market_data import TickerData
+from config.settings import (
+    ASYNC_WRITER_POOL_SIZE,
+    DB_TYPE,
+    DB_WRITER,
+    EXTRA_SINKS,
+    LATENCY_REPORT_INTERVAL,
+    OVERLOAD_LATENCY_MS,
+    OVERLOAD_QUEUE_DEPTH,
+    OVERLOAD_RESUME_DEPTH,
+    SHUTDOWN_TIMEOUT,
+    SPILL_DIR,
+    TICKER_COLD_SPLIT,
+    TICKER_SCHEMA,
+)
+from db.bulk import insert_ignore, upsert
+from db.database import Base, get_db
+from models.market_data import TickerData, TickerLatest
+from services.async_writer import AsyncPostgresWriter
+from services.cold_fields import ColdFieldSplitter
+from services.compact_schema import CompactTickerEncoder, SymbolDictionary
 from services.db_size_checker import DBSizeChecker
+from services.latency import ENQUEUE_TO_COMMIT, RECEIVE_TO_ENQUEUE, LatencyTracker
+from services.sinks import SinkWorker, create_sinks
+from services.spill import load_spilled, spill_batches
+from services.symbol_manager import fetch_instruments
+from services.ticker_buffer import TickerBuffer
 
 logger = logging.getLogger("bybit_collector.processor")
 
+# Outcomes of DataProcessor.stop()
+SHUTDOWN_FLUSHED = 'flushed'  # everything committed
+SHUTDOWN_SPILLED = 'spilled'  # some batches written to SPILL_DIR instead of the database
+SHUTDOWN_FAILED = 'failed'  # some batches could neither be committed nor spilled
+
+
+class CommitCancelled(Exception):
+    """Raised instead of committing a batch that shutdown has already spilled."""
+
 
 class DataProcessor:
     def __init__(self):
         self._save_thread = None
         self._save_queue = Queue()
         self._db_size_checker = DBSizeChecker()
-        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.latency = LatencyTracker()
+        self.duplicates_skipped = 0
+        self._last_latency_report = time.time()
+        self._in_flight = None
+        self._commit_lock = threading.Lock()
+        self._commits_closed = False  # set by stop() once it gives up on the batches still being written
+        self._last_commit = None  # the last batch allowed to commit
+        self._sinks = [SinkWorker(sink) for sink in create_sinks(EXTRA_SINKS)]
+        self.instruments = {}  # symbol -> instrument info, filled by SymbolManager
+        self.batch_controller = None  # AdaptiveBatchController fed with commit durations, if enabled
+        self.overloaded = False  # producers conflate ticks while this is set
+        self.overload_episodes = 0
+        self._last_commit_latency_ms = 0.0
+        self._encoder = None
+        if TICKER_SCHEMA == 'v2':
+            symbols = SymbolDictionary(lambda: next(get_db()), self.instruments, fetch=fetch_instruments)
+            self._encoder = CompactTickerEncoder(symbols)
+        self._cold_splitter = ColdFieldSplitter() if TICKER_COLD_SPLIT else None
+        self._async_writer = self._create_async_writer() if DB_WRITER == 'asyncpg' else None
+        self._async_slots = threading.Semaphore(ASYNC_WRITER_POOL_SIZE)
+        self._async_in_flight = {}  # future -> batch being written by the asyncpg writer
+        self._replay_spilled()
         self._start_save_thread()
         logger.info("DataProcessor initialized with save thread and queue")
 
+    def _create_async_writer(self):
+        if DB_TYPE != 'postgresql':
+            raise ValueError("DB_WRITER=asyncpg requires DB_TYPE=postgresql")
+        if self._cold_splitter is not None:
+            raise ValueError("DB_WRITER=asyncpg does not support TICKER_COLD_SPLIT")
+        writer = AsyncPostgresWriter(encoder=self._encoder)
+        writer.start()
+        logger.info("Writing batches with asyncpg, up to %d in flight", ASYNC_WRITER_POOL_SIZE)
+        return writer
+
+    def add_sink(self, sink):
+        """Feed every saved batch to an additional sink running on its own worker."""
+        self._sinks.append(SinkWorker(sink))
+
+    def sink_stats(self):
+        """Return ``{sink name: stats}`` for the additional sinks."""
+        return {worker.sink.name: worker.stats() for worker in self._sinks}
+
+    def queue_depth(self):
+        """Number of batches waiting to be written."""
+        return self._save_queue.qsize()
+
     def add_to_save_queue(self, data_to_save):
         """Add data to the save queue."""
-        logger.info(f"Adding {len(data_to_save)} records to save queue")
+        if isinstance(data_to_save, list):
+            data_to_save = TickerBuffer.from_messages(data_to_save)
+        logger.info("Adding %d records to save queue", len(data_to_save))
+        data_to_save.enqueued_at = time.time()
+        for symbol, received in zip(data_to_save.symbols, data_to_save.timestamps):
+            self.latency.record(symbol, RECEIVE_TO_ENQUEUE, (data_to_save.enqueued_at - received) * 1000)
         self._save_queue.put(data_to_save)
-        logger.debug(f"Current queue size: {self._save_queue.qsize()}")
+        self._check_overload()
+        for worker in self._sinks:
+            worker.put(data_to_save)
+        logger.debug("Current queue size: %d", self._save_queue.qsize())
 
     def _start_save_thread(self):
         """Start the save thread."""
@@ -42,71 +127,310 @@ class DataProcessor:
             if data_to_save is None:  # Shutdown signal
                 logger.info("Received shutdown signal in save worker")
                 break
+            self._in_flight = data_to_save
+            if self._async_writer is not None:
+                self._submit_async(data_to_save)
+                continue
             try:
-                logger.info(f"Processing batch of {len(data_to_save)} records")
+                logger.info("Processing batch of %d records", len(data_to_save))
                 self._save_to_database(data_to_save)
-                logger.info(f"Successfully processed batch of {len(data_to_save)} records")
+                logger.info("Successfully processed batch of %d records", len(data_to_save))
+                self._report_latency()
             except Exception as e:
                 logger.error(f"Error in save thread: {e}", exc_info=True)
             finally:
+                self._in_flight = None
+                self._check_overload()
                 self._save_queue.task_done()
                 logger.debug("Task marked as done in save queue")
 
-    def stop(self):
-        """Stop the data processor and cleanup resources."""
+    def _submit_async(self, data_to_save):
+        """Hand a batch to the asyncpg writer, blocking while ASYNC_WRITER_POOL_SIZE batches are in flight."""
+        self._async_slots.acquire()
+        started = time.time()
+        try:
+            future = self._async_writer.submit(data_to_save)
+        except Exception as e:
+            logger.error(f"Error in save thread: {e}", exc_info=True)
+            self._async_slots.release()
+            self._save_queue.task_done()
+            return
+        finally:
+            self._in_flight = None
+        self._async_in_flight[future] = data_to_save
+        future.add_done_callback(lambda done: self._finish_async(done, data_to_save, started))
+        self._db_size_checker.check_db_size()
+
+    def _finish_async(self, future, data_to_save, started):
+        """Account a batch written by the asyncpg writer; runs on the writer's loop thread."""
+        try:
+            self._count_duplicates(len(data_to_save), future.result())
+            self._record_commit_latency(data_to_save)
+            logger.info("Successfully processed batch of %d records", len(data_to_save))
+            self._report_latency()
+        except Exception as e:
+            logger.error(f"Error in async writer: {e}", exc_info=True)
+        finally:
+            if self.batch_controller is not None:
+                # Writes overlap, so each one keeps only a share of the writer busy
+                self.batch_controller.observe_commit((time.time() - started) / ASYNC_WRITER_POOL_SIZE)
+            self._async_in_flight.pop(future, None)
+            self._async_slots.release()
+            self._check_overload()
+            self._save_queue.task_done()
+
+    def _unfinished_async_writes(self, deadline):
+        """Wait until ``deadline`` for batches in flight in the asyncpg writer; returns those still unfinished."""
+        if self._async_writer is None:
+            return []
+        wait(list(self._async_in_flight), timeout=max(deadline - time.monotonic(), 0))
+        return [batch for future, batch in list(self._async_in_flight.items()) if not future.done()]
+
+    def _check_overload(self):
+        """Enter overload mode when the writer falls behind and leave it once the backlog has cleared."""
+        depth = self._save_queue.qsize()
+        slow = bool(OVERLOAD_LATENCY_MS) and self._last_commit_latency_ms >= OVERLOAD_LATENCY_MS
+        if not self.overloaded:
+            if slow or (OVERLOAD_QUEUE_DEPTH and depth >= OVERLOAD_QUEUE_DEPTH):
+                self.overloaded = True
+                self.overload_episodes += 1
+                logger.warning(
+                    f"Writer overloaded (queue depth {depth}, commit latency "
+                    f"{self._last_commit_latency_ms:.0f}ms), conflating ticks"
+                )
+        elif depth <= OVERLOAD_RESUME_DEPTH and not slow:
+            self.overloaded = False
+            logger.warning("Writer backlog cleared, resuming full tick capture")
+
+    def stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """Stop the data processor, committing everything still queued within ``timeout`` seconds.
+
+        Queued batches are coalesced into one batch per table and committed once the
+        save thread has finished its current batch. Whatever cannot be committed before the deadline
+        is spilled to SPILL_DIR and replayed on the next start.
+
+        Returns SHUTDOWN_FLUSHED, SHUTDOWN_SPILLED or SHUTDOWN_FAILED.
+        """
         logger.info("Stopping DataProcessor...")
+        deadline = time.monotonic() + timeout
+        pending = self._drain_save_queue()
         # Signal save thread to stop
         self._save_queue.put(None)
         if self._save_thread:
             logger.info("Waiting for save thread to finish...")
-            self._save_thread.join()
-            logger.info("Save thread stopped")
-        self._executor.shutdown(wait=True)
-        logger.info("DataProcessor stopped successfully")
+            self._save_thread.join(max(deadline - time.monotonic(), 0))
+
+        late = self._unfinished_async_writes(deadline)
+        saving = self._save_thread is not None and self._save_thread.is_alive()
+        if saving:
+            logger.warning("Save thread still busy at the shutdown deadline")
+            late += self._abandon_in_flight()
+        if late or (saving and pending):
+            status = self._spill(late + pending)
+        elif pending:
+            status = self._commit_before_deadline(pending, deadline)
+        else:
+            status = SHUTDOWN_FLUSHED
+
+        for worker in self._sinks:
+            worker.stop(max(deadline - time.monotonic(), 0))
+        if self._async_writer is not None:
+            self._async_writer.close(max(deadline - time.monotonic(), 0))
+        logger.info("DataProcessor stopped: %s", status)
+        return status
+
+    def _drain_save_queue(self):
+        """Take every batch still waiting in the save queue."""
+        pending = []
+        while True:
+            try:
+                batch = self._save_queue.get_nowait()
+            except Empty:
+                return pending
+            self._save_queue.task_done()
+            if batch is not None:
+                pending.append(batch)
+
+    @staticmethod
+    def _merge_by_table(batches):
+        """Coalesce batches into one batch per table, keeping their order within each table."""
+        by_table = {}
+        for batch in batches:
+            by_table.setdefault(batch.table_name, []).append(batch)
+        return [type(group[0]).merge(group) for group in by_table.values()]
+
+    def _close_commits(self):
+        """Let no further batch commit; returns the last batch that was allowed to, whose outcome is unknown."""
+        with self._commit_lock:
+            self._commits_closed = True
+            return self._last_commit
+
+    def _abandon_in_flight(self):
+        """Close commits under the late save thread; returns its batch unless that was already committing."""
+        busy = self._in_flight
+        committing = self._close_commits()
+        if busy is None:
+            return []
+        if busy is committing:
+            logger.warning("Not spilling the batch whose commit was already under way")
+            return []
+        return [busy]
+
+    def _commit(self, db, data_to_save):
+        """Commit ``db`` unless shutdown has closed commits, in which case the batch is rolled back and spilled."""
+        with self._commit_lock:
+            if self._commits_closed:
+                raise CommitCancelled(f"shutdown deadline passed before committing {len(data_to_save)} records")
+            self._last_commit = data_to_save
+        db.commit()
+
+    def _commit_before_deadline(self, pending, deadline):
+        """Commit pending batches, one transaction per table, spilling those that miss the deadline.
+
+        The commit runs on a daemon thread so a slow database cannot keep the process alive.
+        A batch is only spilled once it can no longer commit: either the thread failed before
+        reaching it, or commits were closed before its COMMIT was sent.
+        """
+        merged = self._merge_by_table(pending)
+        logger.info("Committing %d pending records from %d batches", sum(len(b) for b in merged), len(pending))
+        committed = []
+
+        def save_all():
+            for batch in merged:
+                self._save_to_database(batch)
+                committed.append(batch)
+
+        thread = threading.Thread(target=self._final_commit, args=(save_all,), name="final-commit", daemon=True)
+        thread.start()
+        thread.join(max(deadline - time.monotonic(), 0))
+        if not thread.is_alive():
+            uncommitted = merged[len(committed):]
+            return self._spill(uncommitted) if uncommitted else SHUTDOWN_FLUSHED
+        logger.warning("Final commit did not finish before the shutdown deadline")
+        last = self._close_commits()
+        started = next((i + 1 for i, batch in enumerate(merged) if batch is last), 0)
+        if started > len(committed):
+            logger.warning("Not spilling the batch whose commit was already under way")
+        return self._spill(merged[started:])
+
+    @staticmethod
+    def _final_commit(save_all):
+        try:
+            save_all()
+        except Exception as e:
+            logger.error(f"Final commit failed: {e}")
+
+    def _spill(self, batches):
+        """Write batches to the spill directory."""
+        if not batches:
+            return SHUTDOWN_SPILLED
+        try:
+            spill_batches([(batch.table_name, list(batch.rows())) for batch in batches], SPILL_DIR)
+            return SHUTDOWN_SPILLED
+        except Exception as e:
+            logger.error(f"Failed to spill {sum(len(b) for b in batches)} records: {e}", exc_info=True)
+            return SHUTDOWN_FAILED
+
+    def _replay_spilled(self):
+        """Insert batches spilled by a previous shutdown and remove their files."""
+        try:
+            for path, batches in load_spilled(SPILL_DIR):
+                db = next(get_db())
+                try:
+                    for table_name, rows in batches:
+                        if table_name == TickerData.__tablename__:
+                            self._insert_ticker_rows(db, rows)
+                        else:
+                            insert_ignore(db, Base.metadata.tables[table_name], rows)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    self._reset_cold_fields()
+                    raise
+                finally:
+                    db.close()
+                os.remove(path)
+                logger.info("Replayed spilled batches from %s", path)
+        except Exception as e:
+            logger.error(f"Error replaying spilled batches, leaving them in {SPILL_DIR}: {e}", exc_info=True)
+
+    def _record_commit_latency(self, data_to_save):
+        """Record enqueue-to-commit latency for every symbol in a committed batch."""
+        if data_to_save.enqueued_at is None:
+            return
+        latency_ms = (time.time() - data_to_save.enqueued_at) * 1000
+        self._last_commit_latency_ms = latency_ms
+        for symbol, count in Counter(data_to_save.symbols).items():
+            self.latency.record(symbol, ENQUEUE_TO_COMMIT, latency_ms, count)
+
+    def _count_duplicates(self, rows, inserted):
+        if inserted < rows:
+            self.duplicates_skipped += rows - inserted
+            logger.warning("Skipped %d duplicate records (%d in total)", rows - inserted, self.duplicates_skipped)
+
+    def _report_latency(self):
+        """Log per-symbol pipeline latency and per-sink throughput if the report interval has passed."""
+        current_time = time.time()
+        if current_time - self._last_latency_report < LATENCY_REPORT_INTERVAL:
+            return
+        self._last_latency_report = current_time
+        for symbol, stages in self.latency.snapshot().items():
+            summary = " | ".join(
+                f"{stage}: p50={stats['p50']}ms p99={stats['p99']}ms n={stats['count']}"
+                for stage, stats in stages.items()
+            )
+            logger.info(f"Latency {symbol}: {summary}")
+        if self.batch_controller is not None:
+            thresholds = self.batch_controller.thresholds()
+            logger.info(
+                f"Batch thresholds (load x{self.batch_controller.load_factor:.2f}): "
+                + ", ".join(f"{symbol}={size}" for symbol, size in sorted(thresholds.items()))
+            )
+        for name, stats in self.sink_stats().items():
+            logger.info(
+                f"Sink {name}: {stats['rows']} rows, {stats['rows_per_sec']:.1f} rows/s, "
+                f"lag {stats['lag_seconds']:.2f}s, queue {stats['queue_depth']}, dropped {stats['rows_dropped']}"
+            )
+
+    def _reset_cold_fields(self):
+        if self._cold_splitter is not None:
+            self._cold_splitter.reset()
+
+    def _insert_ticker_rows(self, db, rows):
+        """Insert ticker_data rows into the configured history table; returns the number inserted."""
+        if self._cold_splitter is not None:
+            rows = self._cold_splitter.split(db, rows)
+        if self._encoder is not None:
+            return self._encoder.insert(db, rows)
+        return insert_ignore(db, TickerData.__table__, rows)
+
+    def _insert_batch(self, db, data_to_save, rows):
+        """Insert one batch's rows; ticker batches also refresh ticker_latest. Returns the number inserted."""
+        if data_to_save.table_name != TickerData.__tablename__:
+            return insert_ignore(db, Base.metadata.tables[data_to_save.table_name], rows)
+        inserted = self._insert_ticker_rows(db, rows)
+        # Rows are in arrival order, so the last one per symbol is the newest
+        latest = {row['symbol']: row for row in rows}
+        upsert(db, TickerLatest.__table__, list(latest.values()), newer_column='receive_ts')
+        return inserted
 
     def _save_to_database(self, data_to_save):
-        """Save ticker data to database synchronously."""
+        """Save a ticker or private event batch to database synchronously."""
         start_time = time.time()
-        logger.info(f"Starting database save operation for {len(data_to_save)} records")
+        logger.info("Starting database save operation for %d records", len(data_to_save))
         try:
             # Get a database session from the generator
             logger.debug("Getting database session")
             db = next(get_db())
             try:
-                ticker_objects = []
-                logger.debug("Creating ticker objects")
-                for data in data_to_save:
-                    ticker = TickerData(
-                        timestamp=data['timestamp'],
-                        symbol=data['symbol'],
-                        tick_direction=data['tickDirection'],
-                        price_24h_pcnt=float(data['price24hPcnt']),
-                        last_price=float(data['lastPrice']),
-                        prev_price_24h=float(data['prevPrice24h']),
-                        high_price_24h=float(data['highPrice24h']),
-                        low_price_24h=float(data['lowPrice24h']),
-                        prev_price_1h=float(data['prevPrice1h']),
-                        mark_price=float(data['markPrice']),
-                        index_price=float(data['indexPrice']),
-                        open_interest=float(data['openInterest']),
-                        open_interest_value=float(data['openInterestValue']),
-                        turnover_24h=float(data['turnover24h']),
-                        volume_24h=float(data['volume24h']),
-                        next_funding_time=int(data['nextFundingTime']),
-                        funding_rate=float(data['fundingRate']),
-                        bid1_price=float(data['bid1Price']),
-                        bid1_size=float(data['bid1Size']),
-                        ask1_price=float(data['ask1Price']),
-                        ask1_size=float(data['ask1Size'])
-                    )
-                    ticker_objects.append(ticker)
-                logger.debug(f"Created {len(ticker_objects)} ticker objects")
-
-                logger.info("Performing bulk save operation")
-                db.bulk_save_objects(ticker_objects)
+                logger.info("Performing bulk insert operation")
+                rows = list(data_to_save.rows())
+                inserted = self._insert_batch(db, data_to_save, rows)
                 logger.debug("Committing transaction")
-                db.commit()
+                self._commit(db, data_to_save)
                 logger.info("Successfully committed transaction")
+                self._record_commit_latency(data_to_save)
+                self._count_duplicates(len(rows), inserted)
 
                 # Check database size after saving
                 logger.debug("Checking database size")
@@ -116,6 +440,7 @@ class DataProcessor:
                 logger.error(f"Error saving ticker data: {e}", exc_info=True)
                 logger.info("Rolling back transaction")
                 db.rollback()
+                self._reset_cold_fields()
                 raise
             finally:
                 logger.debug("Closing database session")
@@ -127,5 +452,7 @@ class DataProcessor:
         finally:
             end_time = time.time()
             execution_time = end_time - start_time
-            logger.info(f"Database save operation completed in {execution_time:.4f} seconds "
-                        f"for {len(data_to_save)} records")
+            if self.batch_controller is not None:
+                self.batch_controller.observe_commit(execution_time)
+            logger.info("Database save operation completed in %.4f seconds for %d records",
+                        execution_time, len(data_to_save))
@@ -49,6 +49,10 @@ class DBSizeChecker:
             logger.error(f"Error getting database size: {e}")
             return 0.0
 
+    def size_bytes(self) -> float:
+        """Current size of the database in bytes (0 if it cannot be determined)."""
+        return self._get_db_size()
+
     def check_db_size(self) -> None:
         """Check and log database size if enough time has passed."""
         current_time = time.time()
@@ -0,0 +1,175 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, not_, select
+
+from config.settings import FEED_STALL_FACTOR, FEED_STALL_MAX, FEED_STALL_MIN
+from models.market_data import FeedGap
+
+logger = logging.getLogger("bybit_collector.feed_watchdog")
+
+# Recovery steps, in escalation order
+RESUBSCRIBE = 'resubscribe'
+RECONNECT = 'reconnect'
+
+# Weight of the newest interval in the running mean message interval
+INTERVAL_SMOOTHING = 0.05
+# Messages seen before the learned interval is trusted; until then the timeout is FEED_STALL_MAX
+WARMUP_MESSAGES = 20
+
+
+class _Feed:
+    __slots__ = ('last', 'interval', 'count', 'timeout', 'action', 'acted_at')
+
+    def __init__(self, now: float, timeout: float) -> None:
+        self.last = now
+        self.interval = 0.0
+        self.count = 0
+        self.timeout = timeout
+        self.action: Optional[str] = None  # set while stalled: the last recovery step suggested
+        self.acted_at = 0.0
+
+
+class FeedWatchdog:
+    """Detect symbols whose ticker stream has gone silent for longer than usual.
+
+    Every message costs a dict lookup, a subtraction and a comparison against the
+    symbol's current timeout, plus a running-mean update of its message interval.
+    The timeout is ``factor`` times that mean interval clamped to
+    [``min_timeout``, ``max_timeout``], so a busy symbol is flagged within
+    seconds and a quiet one only after minutes. :meth:`check`, called
+    periodically, suggests resubscribing a newly stalled symbol and reconnecting
+    when it stays silent for another timeout. Each silence is turned into a
+    feed_gaps row when the stream resumes (or at :meth:`close`), including
+    silences that ended between two checks.
+    """
+
+    def __init__(self, factor: float = FEED_STALL_FACTOR, min_timeout: float = FEED_STALL_MIN,
+                 max_timeout: float = FEED_STALL_MAX) -> None:
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._feeds: Dict[str, _Feed] = {}
+        self._gaps: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def watch(self, symbol: str, now: float) -> None:
+        """Start watching a newly subscribed symbol; silence is counted from ``now``."""
+        if symbol not in self._feeds:
+            self._feeds[symbol] = _Feed(now, self.max_timeout)
+
+    def forget(self, symbol: str) -> None:
+        self._feeds.pop(symbol, None)
+
+    def observe(self, symbol: str, now: float) -> None:
+        """Account one message of ``symbol`` received at ``now``."""
+        feed = self._feeds.get(symbol)
+        if feed is None:
+            return
+        elapsed = now - feed.last
+        if elapsed > feed.timeout or feed.action is not None:
+            self._record_gap(symbol, feed, now, recovered=True)
+        elif feed.count > 1:
+            feed.interval += INTERVAL_SMOOTHING * (elapsed - feed.interval)
+            if feed.count >= WARMUP_MESSAGES:
+                feed.timeout = min(max(self.factor * feed.interval, self.min_timeout), self.max_timeout)
+        elif feed.count:
+            feed.interval = elapsed  # the wait for the first message is subscription latency, not an interval
+        feed.count += 1
+        feed.last = now
+
+    def _record_gap(self, symbol: str, feed: _Feed, now: float, recovered: bool) -> None:
+        self._gaps.append({
+            'symbol': symbol,
+            'start_ts': int(feed.last * 1000),
+            'end_ts': int(now * 1000),
+            'expected_interval_ms': feed.interval * 1000,
+            'timeout_ms': feed.timeout * 1000,
+            'action': feed.action or 'none',
+            'recovered': recovered,
+        })
+        if recovered:
+            logger.info(f"Feed of {symbol} resumed after {now - feed.last:.1f}s ({feed.action or 'no action'})")
+        feed.action = None
+
+    def check(self, now: float) -> List[Tuple[str, str]]:
+        """Return ``(symbol, RESUBSCRIBE or RECONNECT)`` for every symbol that needs a recovery step now.
+
+        A symbol gets RESUBSCRIBE when its silence first exceeds its timeout and
+        RECONNECT each further timeout it stays silent.
+        """
+        actions = []
+        for symbol, feed in self._feeds.items():
+            silent = now - feed.last
+            if silent <= feed.timeout:
+                continue
+            if feed.action is None:
+                feed.action = RESUBSCRIBE
+            elif now - feed.acted_at > feed.timeout:
+                feed.action = RECONNECT
+            else:
+                continue
+            feed.acted_at = now
+            logger.warning(
+                f"No ticker for {symbol} in {silent:.0f}s (timeout {feed.timeout:.0f}s), trying {feed.action}"
+            )
+            actions.append((symbol, feed.action))
+        return actions
+
+    def acted(self, symbol: str, action: str, now: float) -> None:
+        """Record a recovery step taken for ``symbol`` other than the one suggested."""
+        feed = self._feeds.get(symbol)
+        if feed is not None and feed.action is not None:
+            feed.action = action
+            feed.acted_at = now
+
+    def stalled(self) -> List[str]:
+        """Symbols currently considered stalled."""
+        return [symbol for symbol, feed in self._feeds.items() if feed.action is not None]
+
+    def pop_gaps(self) -> List[Dict[str, Any]]:
+        """feed_gaps rows of the silences that ended since the last call."""
+        gaps, self._gaps = self._gaps, []
+        return gaps
+
+    def close(self, now: float) -> List[Dict[str, Any]]:
+        """Return every remaining gap row, recording silences still going on as unrecovered."""
+        for symbol, feed in self._feeds.items():
+            if feed.action is not None:
+                self._record_gap(symbol, feed, now, recovered=False)
+        return self.pop_gaps()
+
+
+def without_gaps(query, symbol_column, time_column, margin_ms: int = 0):
+    """Filter ``query`` to rows that are not inside or next to a recorded feed gap.
+
+    ``time_column`` must hold epoch milliseconds, such as ticker_data.receive_ts.
+    A gap spans its last message before the silence to the first one after it,
+    so with ``margin_ms=0`` exactly those two boundary rows are dropped, and with
+    them every change (return, spread move) measured across the gap. A margin also
+    drops the rows up to ``margin_ms`` either side.
+    """
+    gaps = FeedGap.__table__
+    return query.where(not_(exists(
+        select(gaps.c.id).where(and_(
+            gaps.c.symbol == symbol_column,
+            time_column >= gaps.c.start_ts - margin_ms,
+            time_column <= gaps.c.end_ts + margin_ms,
+        ))
+    )))
+
+
+def gap_windows(session, symbol: Optional[str] = None, start_ms: Optional[int] = None,
+                end_ms: Optional[int] = None) -> List[Tuple[str, int, int]]:
+    """``(symbol, start_ts, end_ts)`` of the recorded gaps overlapping [start_ms, end_ms], oldest first."""
+    gaps = FeedGap.__table__
+    query = select(gaps.c.symbol, gaps.c.start_ts, gaps.c.end_ts).order_by(gaps.c.start_ts)
+    if symbol is not None:
+        query = query.where(gaps.c.symbol == symbol)
+    if start_ms is not None:
+        query = query.where(gaps.c.end_ts >= start_ms)
+    if end_ms is not None:
+        query = query.where(gaps.c.start_ts <= end_ms)
+    return [tuple(row) for row in session.execute(query)]
@@ -0,0 +1,113 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+
+# Pipeline stages tracked per symbol
+EXCHANGE_TO_RECEIVE = 'exchange_to_receive'
+RECEIVE_TO_ENQUEUE = 'receive_to_enqueue'
+ENQUEUE_TO_COMMIT = 'enqueue_to_commit'
+STAGES = (EXCHANGE_TO_RECEIVE, RECEIVE_TO_ENQUEUE, ENQUEUE_TO_COMMIT)
+
+# Upper bucket bounds in milliseconds; the last bucket catches everything above
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, float('inf'))
+
+
+class LatencyHistogram:
+    """Rolling latency histogram with fixed log-spaced buckets.
+
+    Counts are kept for the current and the previous window, so a snapshot always
+    covers between one and two windows of recent observations.
+    """
+
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self._current = [0] * len(BUCKET_BOUNDS_MS)
+        self._previous = [0] * len(BUCKET_BOUNDS_MS)
+        self._window_start = time.monotonic()
+        self._max = 0.0
+        self._total = 0.0
+        self._count = 0
+
+    def _rotate(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        # Drop both windows if nothing was recorded for more than two windows
+        self._previous = self._current if elapsed < 2 * self.window else [0] * len(BUCKET_BOUNDS_MS)
+        self._current = [0] * len(BUCKET_BOUNDS_MS)
+        self._window_start = now
+        self._max = 0.0
+        self._total = 0.0
+        self._count = 0
+
+    def record(self, value_ms: float, count: int = 1) -> None:
+        """Record ``count`` observations of ``value_ms`` (negative values count as zero)."""
+        value_ms = max(value_ms, 0.0)
+        self._rotate(time.monotonic())
+        self._current[bisect_left(BUCKET_BOUNDS_MS, value_ms)] += count
+        self._max = max(self._max, value_ms)
+        self._total += value_ms * count
+        self._count += count
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the bucket upper bound containing the ``q`` quantile (0-1)."""
+        self._rotate(time.monotonic())
+        counts = [a + b for a, b in zip(self._current, self._previous)]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKET_BOUNDS_MS[-1]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Summarise the rolling window; mean and max cover the current window only."""
+        self._rotate(time.monotonic())
+        return {
+            'count': sum(self._current) + sum(self._previous),
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'mean': self._total / self._count if self._count else None,
+            'max': self._max if self._count else None,
+        }
+
+
+class LatencyTracker:
+    """Per-symbol latency histograms for each stage of the collection pipeline."""
+
+    def __init__(self, window: float = 60.0) -> None:
+        self.window = window
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, symbol: str, stage: str) -> LatencyHistogram:
+        stages = self._histograms.get(symbol)
+        if stages is None:
+            stages = self._histograms[symbol] = {name: LatencyHistogram(self.window) for name in STAGES}
+        return stages[stage]
+
+    def record(self, symbol: str, stage: str, value_ms: float, count: int = 1) -> None:
+        """Record a latency observation for a symbol and pipeline stage."""
+        with self._lock:
+            self._histogram(symbol, stage).record(value_ms, count)
+
+    def forget(self, symbol: str) -> None:
+        """Drop all histograms for a symbol that is no longer collected."""
+        with self._lock:
+            self._histograms.pop(symbol, None)
+
+    def snapshot(self, symbol: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Optional[float]]]]:
+        """Return ``{symbol: {stage: stats}}`` for one or all symbols."""
+        with self._lock:
+            symbols = [symbol] if symbol else list(self._histograms)
+            return {
+                name: {stage: hist.snapshot() for stage, hist in self._histograms[name].items()}
+                for name in symbols
+                if name in self._histograms
+            }
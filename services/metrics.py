@@ -0,0 +1,129 @@
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from config.settings import METRICS_WINDOWS
+
+# Per-tick series kept in each symbol's ring buffer
+SPREAD_BPS, MID_RETURN, BASIS_BPS, OPEN_INTEREST = range(4)
+_SERIES = 4
+
+
+class _SymbolWindows:
+    """Ring buffer of one symbol's per-tick series with running sums for every window."""
+
+    __slots__ = ('values', 'sums', 'sumsq', 'count', 'pos', 'last_mid')
+
+    def __init__(self, windows: np.ndarray) -> None:
+        self.values = np.zeros((int(windows.max()), _SERIES))
+        self.sums = np.zeros((len(windows), _SERIES))
+        self.sumsq = np.zeros((len(windows), _SERIES))
+        self.count = 0
+        self.pos = 0
+        self.last_mid = 0.0
+
+    def resync(self, windows: np.ndarray) -> None:
+        """Recompute the running sums from the buffer, discarding accumulated rounding error."""
+        capacity = len(self.values)
+        for i, window in enumerate(windows):
+            n = min(window, self.count)
+            rows = self.values[(self.pos - 1 - np.arange(n)) % capacity]
+            self.sums[i] = rows.sum(axis=0)
+            self.sumsq[i] = (rows * rows).sum(axis=0)
+
+
+class MetricsEngine:
+    """Rolling per-symbol metrics over the last N ticks, updated incrementally on every tick.
+
+    Each symbol keeps a fixed-size NumPy ring buffer of the per-tick series
+    (spread in bps of mid, mid log return, mark-vs-index basis in bps and open
+    interest) sized for the largest window. Every window keeps running sums and
+    sums of squares, so a tick costs the same handful of vector operations no
+    matter how many windows or how long they are. The sums are recomputed from
+    the buffer each time it wraps around to stop floating point drift.
+    """
+
+    def __init__(self, windows: Sequence[int] = METRICS_WINDOWS) -> None:
+        if not windows or min(windows) < 2:
+            raise ValueError("Metric windows must be at least 2 ticks")
+        self.windows = np.array(sorted(set(windows)), dtype=np.int64)
+        self._symbols: Dict[str, _SymbolWindows] = {}
+        self._row = np.zeros(_SERIES)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def update(self, symbol: str, data: Dict[str, Any]) -> bool:
+        """Fold one merged Bybit ticker dict into the symbol's windows.
+
+        A tick missing one of the fields, or holding an empty or invalid one, is
+        skipped; returns whether the tick was used.
+        """
+        try:
+            bid, ask = float(data['bid1Price']), float(data['ask1Price'])
+            mark, index = float(data['markPrice']), float(data['indexPrice'])
+            open_interest = float(data['openInterest'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        mid = (bid + ask) / 2
+
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _SymbolWindows(self.windows)
+        row = self._row
+        row[SPREAD_BPS] = (ask - bid) / mid * 1e4 if mid else 0.0
+        row[MID_RETURN] = math.log(mid / state.last_mid) if state.last_mid > 0 and mid > 0 else 0.0
+        row[BASIS_BPS] = (mark - index) / index * 1e4 if index else 0.0
+        row[OPEN_INTEREST] = open_interest
+        state.last_mid = mid
+
+        values = state.values
+        # Value leaving each window; zero while the window is not yet full
+        leaving = values[(state.pos - self.windows) % len(values)]
+        leaving[self.windows > state.count] = 0.0
+        state.sums += row - leaving
+        state.sumsq += row * row - leaving * leaving
+        values[state.pos] = row
+        state.count += 1
+        state.pos = (state.pos + 1) % len(values)
+        if state.pos == 0:
+            state.resync(self.windows)
+        return True
+
+    def forget(self, symbol: str) -> None:
+        self._symbols.pop(symbol, None)
+
+    def snapshot(self, symbol: str) -> List[Dict[str, Any]]:
+        """Current metrics of every window of one symbol, shortest window first."""
+        state = self._symbols.get(symbol)
+        if state is None:
+            return []
+        capacity = len(state.values)
+        latest = state.values[(state.pos - 1) % capacity]
+        results = []
+        for i, window in enumerate(self.windows):
+            n = min(int(window), state.count)
+            sums, sumsq = state.sums[i], state.sumsq[i]
+            variance = (sumsq[MID_RETURN] - sums[MID_RETURN] ** 2 / n) / (n - 1) if n > 1 else 0.0
+            # First tick still in the window
+            start = state.values[(state.pos - n) % capacity]
+            results.append({
+                'symbol': symbol,
+                'window_ticks': int(window),
+                'ticks': n,
+                'mid_price': state.last_mid,
+                'spread_bps': float(sums[SPREAD_BPS] / n),
+                'mid_volatility': math.sqrt(max(variance, 0.0)),
+                'basis_bps': float(sums[BASIS_BPS] / n),
+                'open_interest_change': float(latest[OPEN_INTEREST] - start[OPEN_INTEREST]),
+            })
+        return results
+
+    def rows(self, now: float) -> List[Dict[str, Any]]:
+        """ticker_metrics rows with the current metrics of every symbol and window."""
+        timestamp = datetime.fromtimestamp(now)
+        return [
+            {'timestamp': timestamp, **metrics} for symbol in list(self._symbols) for metrics in self.snapshot(symbol)
+        ]
@@ -0,0 +1,185 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value not in (None, '') else None
+
+
+def _int(value: Any) -> Optional[int]:
+    return int(value) if value not in (None, '') else None
+
+
+def _str(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, '') else None
+
+
+def _required(value: Any) -> str:
+    if value in (None, ''):
+        raise ValueError("missing identifier")
+    return str(value)
+
+
+def _bool(value: Any) -> Optional[bool]:
+    if value in (None, ''):
+        return None
+    return value if isinstance(value, bool) else str(value).lower() == 'true'
+
+
+Fields = Dict[str, Tuple[str, Callable[[Any], Any]]]  # column -> (Bybit field, converter)
+
+ORDER_FIELDS: Fields = {
+    'category': ('category', _str),
+    'symbol': ('symbol', _str),
+    'order_id': ('orderId', _required),
+    'order_link_id': ('orderLinkId', _str),
+    'side': ('side', _str),
+    'order_type': ('orderType', _str),
+    'order_status': ('orderStatus', _str),
+    'time_in_force': ('timeInForce', _str),
+    'price': ('price', _float),
+    'qty': ('qty', _float),
+    'avg_price': ('avgPrice', _float),
+    'leaves_qty': ('leavesQty', _float),
+    'cum_exec_qty': ('cumExecQty', _float),
+    'cum_exec_value': ('cumExecValue', _float),
+    'cum_exec_fee': ('cumExecFee', _float),
+    'reduce_only': ('reduceOnly', _bool),
+    'created_time': ('createdTime', _int),
+    'updated_time': ('updatedTime', _int),
+}
+
+EXECUTION_FIELDS: Fields = {
+    'category': ('category', _str),
+    'symbol': ('symbol', _str),
+    'exec_id': ('execId', _required),
+    'order_id': ('orderId', _str),
+    'order_link_id': ('orderLinkId', _str),
+    'side': ('side', _str),
+    'exec_type': ('execType', _str),
+    'exec_price': ('execPrice', _float),
+    'exec_qty': ('execQty', _float),
+    'exec_value': ('execValue', _float),
+    'exec_fee': ('execFee', _float),
+    'fee_rate': ('feeRate', _float),
+    'order_price': ('orderPrice', _float),
+    'order_qty': ('orderQty', _float),
+    'closed_size': ('closedSize', _float),
+    'is_maker': ('isMaker', _bool),
+    'exec_time': ('execTime', _int),
+    'seq': ('seq', _int),
+}
+
+POSITION_FIELDS: Fields = {
+    'category': ('category', _str),
+    'symbol': ('symbol', _str),
+    'side': ('side', _str),
+    'position_idx': ('positionIdx', _int),
+    'size': ('size', _float),
+    'entry_price': ('entryPrice', _float),
+    'position_value': ('positionValue', _float),
+    'mark_price': ('markPrice', _float),
+    'leverage': ('leverage', _float),
+    'liq_price': ('liqPrice', _float),
+    'unrealised_pnl': ('unrealisedPnl', _float),
+    'cum_realised_pnl': ('cumRealisedPnl', _float),
+    'position_status': ('positionStatus', _str),
+    'updated_time': ('updatedTime', _int),
+    'seq': ('seq', _int),
+}
+
+WALLET_ACCOUNT_FIELDS: Fields = {
+    'account_type': ('accountType', _str),
+    'total_equity': ('totalEquity', _float),
+    'total_available_balance': ('totalAvailableBalance', _float),
+}
+
+WALLET_COIN_FIELDS: Fields = {
+    'coin': ('coin', _required),
+    'equity': ('equity', _float),
+    'wallet_balance': ('walletBalance', _float),
+    'available_to_withdraw': ('availableToWithdraw', _float),
+    'unrealised_pnl': ('unrealisedPnl', _float),
+    'cum_realised_pnl': ('cumRealisedPnl', _float),
+}
+
+# Private topic -> table its events are stored in
+TOPIC_TABLES = {
+    'order': 'order_updates',
+    'execution': 'executions',
+    'position': 'position_updates',
+    'wallet': 'wallet_updates',
+}
+
+_TOPIC_FIELDS = {'order': ORDER_FIELDS, 'execution': EXECUTION_FIELDS, 'position': POSITION_FIELDS}
+
+
+def _convert(item: Dict[str, Any], fields: Fields) -> Dict[str, Any]:
+    return {column: convert(item.get(field)) for column, (field, convert) in fields.items()}
+
+
+def parse_private_message(message: Dict[str, Any], received: float) -> Tuple[str, List[Dict[str, Any]]]:
+    """Convert one private stream message into ``(table name, rows)``.
+
+    Order, execution and position messages carry a list of events; wallet messages
+    carry accounts and are stored as one row per coin. Raises KeyError for unknown
+    topics and ValueError for malformed numbers or missing identifiers.
+    """
+    topic = message['topic']
+    table_name = TOPIC_TABLES[topic]
+    stamps = {'exchange_ts': _int(message.get('creationTime')), 'receive_ts': int(received * 1000)}
+    rows = []
+    if topic == 'wallet':
+        for account in message['data']:
+            totals = _convert(account, WALLET_ACCOUNT_FIELDS)
+            for coin in account.get('coin') or ():
+                rows.append({**stamps, **totals, **_convert(coin, WALLET_COIN_FIELDS)})
+    else:
+        fields = _TOPIC_FIELDS[topic]
+        rows = [{**stamps, **_convert(item, fields)} for item in message['data']]
+    return table_name, rows
+
+
+class EventBatch:
+    """Rows of one private table waiting to be saved.
+
+    Offers the same interface as TickerBuffer (``table_name``, ``symbols``,
+    ``timestamps``, ``enqueued_at``, ``rows()`` and ``to_columns()``), so it goes
+    through the same save queue, sinks, latency tracking and shutdown spill.
+    """
+
+    __slots__ = ('table_name', 'symbols', 'timestamps', '_rows', 'enqueued_at')
+
+    def __init__(self, table_name: str) -> None:
+        self.table_name = table_name
+        self.symbols: List[str] = []  # symbol, or coin for wallet rows; keys latency stats
+        self.timestamps: List[float] = []  # local receive time, epoch seconds
+        self._rows: List[Dict[str, Any]] = []
+        self.enqueued_at: Optional[float] = None
+
+    @classmethod
+    def merge(cls, batches: List['EventBatch']) -> 'EventBatch':
+        """Concatenate batches of the same table, keeping the earliest enqueue time."""
+        merged = cls(batches[0].table_name)
+        for batch in batches:
+            merged.symbols.extend(batch.symbols)
+            merged.timestamps.extend(batch.timestamps)
+            merged._rows.extend(batch._rows)
+        enqueue_times = [batch.enqueued_at for batch in batches if batch.enqueued_at is not None]
+        merged.enqueued_at = min(enqueue_times) if enqueue_times else None
+        return merged
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def append(self, row: Dict[str, Any], received: float) -> None:
+        self.symbols.append(row.get('symbol') or row.get('coin') or '')
+        self.timestamps.append(received)
+        self._rows.append(row)
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._rows)
+
+    def to_columns(self) -> Dict[str, Sequence[Any]]:
+        if not self._rows:
+            return {}
+        return {column: [row[column] for row in self._rows] for column in self._rows[0]}
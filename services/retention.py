@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select, text
+
+from config.settings import DATA_RETENTION_DAYS, RETENTION_CHUNK_SIZE, RETENTION_INTERVAL, RETENTION_PAUSE
+from db.database import SessionLocal
+from models.market_data import TickerData, TickerDataV2
+
+logger = logging.getLogger("bybit_collector.retention")
+
+# Longest the pruner waits for the save queue to empty before deleting the next chunk anyway
+MAX_YIELD_SECONDS = 5.0
+# Free pages released per incremental_vacuum step on SQLite
+VACUUM_PAGES_PER_STEP = 2000
+
+
+class RetentionPruner:
+    """Delete ticker history older than ``retention_days`` in small chunks.
+
+    Every chunk is its own short transaction, so the writer is never locked
+    out for long. ticker_data chunks are the first expired rows a scan finds
+    (through the BRIN index where there is one) and ticker_data_v2 chunks the
+    oldest rows by receive_ts, through its index. Between chunks the pruner sleeps
+    ``pause`` seconds, waits while the data processor is overloaded and briefly
+    waits for its save queue to drain. On SQLite databases created with
+    ``auto_vacuum = INCREMENTAL`` freed pages are returned to the filesystem in
+    steps as well.
+    """
+
+    def __init__(
+        self,
+        retention_days: int = DATA_RETENTION_DAYS,
+        session_factory: Callable = SessionLocal,
+        size_checker=None,
+        writer_busy: Optional[Callable[[], bool]] = None,
+        writer_overloaded: Optional[Callable[[], bool]] = None,
+        chunk_size: int = RETENTION_CHUNK_SIZE,
+        pause: float = RETENTION_PAUSE,
+        interval: float = RETENTION_INTERVAL,
+    ) -> None:
+        self.retention_days = retention_days
+        self.session_factory = session_factory
+        self.size_checker = size_checker
+        self.writer_busy = writer_busy
+        self.writer_overloaded = writer_overloaded
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.interval = interval
+        self.rows_removed = 0
+        self.bytes_reclaimed = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warned_no_vacuum = False
+
+    def _yield_to_writer(self) -> None:
+        self._stop_event.wait(self.pause)
+        while self.writer_overloaded and self.writer_overloaded() and not self._stop_event.is_set():
+            self._stop_event.wait(1.0)
+        deadline = time.monotonic() + MAX_YIELD_SECONDS
+        while self.writer_busy and self.writer_busy() and time.monotonic() < deadline:
+            if self._stop_event.wait(0.05):
+                return
+
+    def _delete_chunk(self, session, table, ids) -> int:
+        result = session.execute(delete(table).where(table.c.id.in_(ids)))
+        session.commit()
+        return result.rowcount
+
+    def _prune_ticker_data(self, cutoff: datetime) -> int:
+        table = TickerData.__table__
+        removed = 0
+        while not self._stop_event.is_set():
+            with self.session_factory() as session:
+                ids = session.execute(
+                    # Served by the timestamp index, so the last, empty chunk does not scan the table
+                    select(table.c.id).where(table.c.timestamp < cutoff).limit(self.chunk_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                removed += self._delete_chunk(session, table, ids)
+            self._yield_to_writer()
+        return removed
+
+    def _prune_ticker_data_v2(self, cutoff: datetime) -> int:
+        table = TickerDataV2.__table__
+        cutoff_ms = int(cutoff.timestamp() * 1000)
+        removed = 0
+        while not self._stop_event.is_set():
+            with self.session_factory() as session:
+                # Oldest first through ix_ticker_data_v2_receive_ts, so backfilled rows with high ids expire too
+                ids = session.execute(
+                    select(table.c.id).where(table.c.receive_ts < cutoff_ms)
+                    .order_by(table.c.receive_ts).limit(self.chunk_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                removed += self._delete_chunk(session, table, ids)
+            self._yield_to_writer()
+        return removed
+
+    def _reclaim_sqlite_space(self) -> None:
+        with self.session_factory() as session:
+            if session.get_bind().dialect.name != 'sqlite':
+                return
+            if session.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+                if not self._warned_no_vacuum:
+                    logger.warning(
+                        "SQLite database was created without auto_vacuum=INCREMENTAL; deleted rows are reused "
+                        "but the file does not shrink until a full VACUUM"
+                    )
+                    self._warned_no_vacuum = True
+                return
+        while not self._stop_event.is_set():
+            with self.session_factory() as session:
+                if not session.execute(text("PRAGMA freelist_count")).scalar():
+                    return
+                # The pragma frees one page per step; sqlite3 only steps it fully while fetching
+                cursor = session.connection().connection.cursor()
+                try:
+                    cursor.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+                    cursor.fetchall()
+                finally:
+                    cursor.close()
+                session.commit()
+            self._yield_to_writer()
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Run one retention pass and return the number of rows removed."""
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        size_before = self.size_checker.size_bytes() if self.size_checker else 0.0
+        started = time.monotonic()
+
+        removed = self._prune_ticker_data(cutoff)
+        removed += self._prune_ticker_data_v2(cutoff)
+        if removed:
+            self._reclaim_sqlite_space()
+
+        reclaimed = size_before - self.size_checker.size_bytes() if self.size_checker else 0.0
+        self.rows_removed += removed
+        self.bytes_reclaimed += max(reclaimed, 0.0)
+        logger.info(
+            f"Retention pass removed {removed} rows older than {cutoff:%Y-%m-%d %H:%M}, "
+            f"reclaimed {reclaimed / (1024 * 1024):.2f} MB in {time.monotonic() - started:.1f}s"
+        )
+        return removed
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.prune()
+            except Exception as e:
+                logger.error(f"Error pruning old data: {e}", exc_info=True)
+            self._stop_event.wait(self.interval)
+
+    def start(self) -> None:
+        """Prune now and then every ``interval`` seconds in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current chunk."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import (
+    PARQUET_ROLL_ROWS,
+    PARQUET_ROLL_SECONDS,
+    PARQUET_SINK_DIR,
+    SINK_DATABASE_URL,
+    SINK_QUEUE_SIZE,
+)
+from db.bulk import insert_ignore
+from db.database import Base
+from db.upgrade import upgrade_schema
+
+logger = logging.getLogger("bybit_collector.sinks")
+
+# How long a sink worker waits for a batch before giving the sink an idle tick
+_IDLE_TICK_SECONDS = 1.0
+
+
+class Sink(ABC):
+    """Destination for saved batches.
+
+    Batches are shared between sinks and must be treated as read-only. Every batch
+    exposes ``table_name``, ``rows()`` and ``to_columns()``.
+    """
+
+    name = 'sink'
+
+    @abstractmethod
+    def write_batch(self, batch) -> None:
+        """Write one batch; called from the sink's own worker thread."""
+
+    def flush(self) -> None:
+        """Persist anything the sink is holding back."""
+
+    def tick(self) -> None:
+        """Called roughly once a second while no batches arrive."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class DatabaseSink(Sink):
+    """Write batches to an additional SQLAlchemy database."""
+
+    name = 'database'
+
+    def __init__(self, database_url: str = SINK_DATABASE_URL) -> None:
+        self.engine = create_engine(database_url)
+        Base.metadata.create_all(bind=self.engine)
+        upgrade_schema(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+
+    def write_batch(self, batch) -> None:
+        with self.session_factory() as session:
+            insert_ignore(session, Base.metadata.tables[batch.table_name], list(batch.rows()))
+            session.commit()
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+class ParquetFileSink(Sink):
+    """Accumulate batches and write them as rolling Parquet files.
+
+    Files are written to ``<directory>/<table>/date=YYYY-MM-DD/`` once ``roll_rows``
+    rows are pending or the oldest pending row is ``roll_seconds`` old.
+    """
+
+    name = 'parquet'
+
+    def __init__(
+        self,
+        directory: str = PARQUET_SINK_DIR,
+        roll_rows: int = PARQUET_ROLL_ROWS,
+        roll_seconds: float = PARQUET_ROLL_SECONDS,
+    ) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("ParquetFileSink requires pyarrow (install the 'parquet' extra)") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.directory = directory
+        self.roll_rows = roll_rows
+        self.roll_seconds = roll_seconds
+        self._pending: Dict[str, List[Any]] = {}
+        self._pending_rows: Dict[str, int] = {}
+        self._first_pending_at: Optional[float] = None
+        self.files_written: List[str] = []
+
+    def write_batch(self, batch) -> None:
+        self._pending.setdefault(batch.table_name, []).append(self._pa.table(batch.to_columns()))
+        self._pending_rows[batch.table_name] = self._pending_rows.get(batch.table_name, 0) + len(batch)
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+        if max(self._pending_rows.values()) >= self.roll_rows:
+            self.flush()
+
+    def tick(self) -> None:
+        if self._first_pending_at is not None and time.monotonic() - self._first_pending_at >= self.roll_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        for table_name, tables in self._pending.items():
+            directory = os.path.join(self.directory, table_name, f"date={time.strftime('%Y-%m-%d')}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{time.time_ns()}.parquet")
+            table = self._pa.concat_tables(tables, promote_options='default')
+            self._pq.write_table(table, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            self.files_written.append(path)
+            logger.debug("Wrote %d rows to %s", self._pending_rows[table_name], path)
+        self._pending.clear()
+        self._pending_rows.clear()
+        self._first_pending_at = None
+
+
+class CallbackSink(Sink):
+    """Hand every batch to an in-process consumer, e.g. a live signal generator."""
+
+    def __init__(self, callback: Callable[[Any], None], name: str = 'callback') -> None:
+        self.callback = callback
+        self.name = name
+
+    def write_batch(self, batch) -> None:
+        self.callback(batch)
+
+
+class SinkWorker:
+    """Run one sink on its own thread with its own bounded queue.
+
+    When the queue is full new batches are dropped for this sink only, so a slow
+    sink never holds up the database writer or the other sinks.
+    """
+
+    def __init__(self, sink: Sink, queue_size: int = SINK_QUEUE_SIZE) -> None:
+        self.sink = sink
+        self._queue: Queue = Queue(queue_size)
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, batch) -> None:
+        """Queue a batch for the sink without blocking."""
+        try:
+            self._queue.put_nowait((time.time(), batch))
+        except Full:
+            self.rows_dropped += len(batch)
+            logger.warning("Sink %s is falling behind, dropped %d records", self.sink.name, len(batch))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=_IDLE_TICK_SECONDS)
+            except Empty:
+                self._call(self.sink.tick)
+                continue
+            if item is None:
+                break
+            enqueued_at, batch = item
+            if self._call(self.sink.write_batch, batch):
+                self.rows_written += len(batch)
+                self.batches_written += 1
+            self.last_lag = time.time() - enqueued_at
+
+    def _call(self, method, *args) -> bool:
+        try:
+            method(*args)
+            return True
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error in sink {self.sink.name}: {e}", exc_info=True)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and lag of this sink."""
+        with self._queue.mutex:
+            head = self._queue.queue[0] if self._queue.queue else None
+        oldest = head[0] if head is not None else None
+        backlog_age = time.time() - oldest if oldest is not None else 0.0
+        elapsed = time.monotonic() - self._started
+        return {
+            'rows': self.rows_written,
+            'batches': self.batches_written,
+            'rows_per_sec': self.rows_written / elapsed if elapsed else 0.0,
+            'lag_seconds': max(self.last_lag, backlog_age),
+            'queue_depth': self._queue.qsize(),
+            'rows_dropped': self.rows_dropped,
+            'errors': self.errors,
+        }
+
+    def stop(self, timeout: float) -> None:
+        """Write what is queued, then close the sink; gives up after ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            logger.warning("Sink %s queue still full at shutdown", self.sink.name)
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        if self._thread.is_alive():
+            logger.warning("Sink %s did not finish before the shutdown deadline", self.sink.name)
+            return
+        self._call(self.sink.close)
+
+
+def create_sinks(spec: str) -> List[Sink]:
+    """Build the additional sinks named in the EXTRA_SINKS setting."""
+    factories = {'parquet': ParquetFileSink, 'database': DatabaseSink}
+    sinks = []
+    for name in filter(None, (part.strip().lower() for part in spec.split(','))):
+        if name not in factories:
+            raise ValueError(f"Unknown sink: {name}")
+        sinks.append(factories[name]())
+    return sinks
@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger("bybit_collector.spill")
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot spill value of type {type(value).__name__}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def spill_batches(batches: Iterable[Tuple[str, List[Dict[str, Any]]]], directory: str) -> str:
+    """Write ``(table_name, rows)`` batches to a new JSON-lines file and return its path.
+
+    The file is written under a temporary name and renamed once complete, so a
+    reader never picks up a half-written spill.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"spill-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for table_name, rows in batches:
+            f.write(json.dumps({'table': table_name, 'rows': rows}, default=_encode))
+            f.write('\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.warning("Spilled pending batches to %s", path)
+    return path
+
+
+def load_spilled(directory: str) -> Iterator[Tuple[str, List[Tuple[str, List[Dict[str, Any]]]]]]:
+    """Yield ``(path, [(table_name, rows), ...])`` for every complete spill file in ``directory``."""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith('spill-') and name.endswith('.jsonl')):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, encoding='utf-8') as f:
+            batches = [json.loads(line, object_hook=_decode) for line in f if line.strip()]
+        yield path, [(batch['table'], batch['rows']) for batch in batches]
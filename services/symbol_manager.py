@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import SUBSCRIBE_RATE, SYMBOL_REFRESH_INTERVAL, TESTNET
+
+logger = logging.getLogger("bybit_collector.symbol_manager")
+
+# A symbol source returns instrument dicts with at least a "symbol" key and optionally
+# "expected_rate" (messages/second), "tick_size" and "qty_step"
+SymbolSource = Callable[[], List[Dict[str, Any]]]
+
+# Ticker pushes are capped at 10/s per symbol; turnover at or above this is treated as saturated
+_SATURATED_TURNOVER = 100_000_000.0
+_MAX_TICKER_RATE = 10.0
+_MIN_TICKER_RATE = 0.1
+
+
+def _instrument(entry: Any) -> Dict[str, Any]:
+    """Normalise a symbol string or Bybit instrument entry to an instrument dict."""
+    if isinstance(entry, str):
+        return {'symbol': entry.strip()}
+    instrument = {'symbol': entry['symbol']}
+    if 'expected_rate' in entry:
+        instrument['expected_rate'] = float(entry['expected_rate'])
+    tick_size = entry.get('tick_size') or entry.get('priceFilter', {}).get('tickSize')
+    qty_step = entry.get('qty_step') or entry.get('lotSizeFilter', {}).get('qtyStep')
+    if tick_size:
+        instrument['tick_size'] = float(tick_size)
+    if qty_step:
+        instrument['qty_step'] = float(qty_step)
+    return instrument
+
+
+class FileSymbolSource:
+    """Read the symbol universe from a local file.
+
+    Accepts a plain list of symbols (one per line), a JSON list of symbols or
+    instrument dicts, or a saved Bybit ``get_instruments_info`` response.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __call__(self) -> List[Dict[str, Any]]:
+        with open(self.path, encoding='utf-8') as f:
+            content = f.read()
+        try:
+            entries = json.loads(content)
+        except json.JSONDecodeError:
+            entries = [line for line in content.splitlines() if line.strip() and not line.startswith('#')]
+        if isinstance(entries, dict):
+            entries = entries.get('result', entries)['list']
+        return [
+            _instrument(entry)
+            for entry in entries
+            if isinstance(entry, str) or entry.get('status', 'Trading') == 'Trading'
+        ]
+
+
+class BybitSymbolSource:
+    """Load every trading linear instrument from Bybit's REST API.
+
+    The expected ticker rate is estimated from 24h turnover, since busy contracts
+    push updates close to the 10/s cap while illiquid ones rarely change.
+    """
+
+    def __init__(self, testnet: bool = TESTNET) -> None:
+        from pybit.unified_trading import HTTP
+
+        self.session = HTTP(testnet=testnet)
+
+    def __call__(self) -> List[Dict[str, Any]]:
+        instruments = []
+        cursor = None
+        while True:
+            response = self.session.get_instruments_info(category='linear', limit=1000, cursor=cursor)
+            result = response['result']
+            instruments.extend(entry for entry in result['list'] if entry.get('status') == 'Trading')
+            cursor = result.get('nextPageCursor')
+            if not cursor:
+                break
+
+        tickers = self.session.get_tickers(category='linear')['result']['list']
+        turnover = {ticker['symbol']: float(ticker.get('turnover24h') or 0) for ticker in tickers}
+        result = []
+        for entry in instruments:
+            instrument = _instrument(entry)
+            share = turnover.get(instrument['symbol'], 0.0) / _SATURATED_TURNOVER
+            instrument['expected_rate'] = min(_MAX_TICKER_RATE, max(_MIN_TICKER_RATE, share * _MAX_TICKER_RATE))
+            result.append(instrument)
+        return result
+
+
+def fetch_instruments(symbols: List[str], testnet: bool = TESTNET) -> List[Dict[str, Any]]:
+    """Look up the instrument dicts (with tick size and qty step) of ``symbols`` on Bybit's REST API."""
+    from pybit.unified_trading import HTTP
+
+    session = HTTP(testnet=testnet)
+    return [
+        _instrument(entry)
+        for symbol in symbols
+        for entry in session.get_instruments_info(category='linear', symbol=symbol)['result']['list']
+    ]
+
+
+def create_symbol_source(spec: str) -> SymbolSource:
+    """Build a symbol source from the SYMBOL_SOURCE setting."""
+    if spec.lower() == 'bybit':
+        return BybitSymbolSource()
+    return FileSymbolSource(spec)
+
+
+class SymbolManager:
+    """Keep the client's ticker subscriptions in line with a symbol source.
+
+    Each refresh diffs the source against the active subscriptions, then subscribes
+    new symbols and unsubscribes dropped ones at no more than ``subscribe_rate``
+    requests per second (0 leaves them unthrottled). The client spreads new symbols across connections by
+    expected message rate and frees a dropped symbol's buffers after flushing them.
+    """
+
+    def __init__(
+        self,
+        client,
+        source: SymbolSource,
+        refresh_interval: float = SYMBOL_REFRESH_INTERVAL,
+        subscribe_rate: float = SUBSCRIBE_RATE,
+        instruments: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        self.client = client
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.subscribe_rate = subscribe_rate
+        self.instruments: Dict[str, Dict[str, Any]] = instruments if instruments is not None else {}
+        self._next_request = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _throttle(self) -> None:
+        """Sleep until the next subscribe/unsubscribe request is allowed."""
+        if self.subscribe_rate <= 0:
+            return
+        now = time.monotonic()
+        if self._next_request > now:
+            self._stop_event.wait(self._next_request - now)
+        self._next_request = max(now, self._next_request) + 1.0 / self.subscribe_rate
+
+    def refresh(self) -> Tuple[List[str], List[str]]:
+        """Apply the current symbol universe and return the (added, removed) symbols."""
+        instruments = {instrument['symbol']: instrument for instrument in self.source()}
+        active = self.client.active_symbols
+        added = sorted(set(instruments) - active)
+        removed = sorted(active - set(instruments))
+        # Updated in place so consumers holding this dict (e.g. the v2 symbol dictionary) see new entries
+        self.instruments.update(instruments)
+
+        for symbol in removed:
+            if self._stop_event.is_set():
+                break
+            self._throttle()
+            try:
+                self.client.unsubscribe_symbol(symbol)
+            except Exception as e:
+                logger.error(f"Failed to unsubscribe from {symbol}: {e}")
+
+        # Busiest symbols first so they are spread before the connections fill up
+        added.sort(key=lambda symbol: -instruments[symbol].get('expected_rate', 1.0))
+        for symbol in added:
+            if self._stop_event.is_set():
+                break
+            self._throttle()
+            try:
+                self.client.subscribe_symbol(symbol, instruments[symbol].get('expected_rate', 1.0))
+            except Exception as e:
+                logger.error(f"Failed to subscribe to {symbol}: {e}")
+
+        if added or removed:
+            logger.info(f"Symbol universe refreshed: +{len(added)} -{len(removed)} ({len(instruments)} total)")
+        return added, removed
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing symbol universe: {e}", exc_info=True)
+            self._stop_event.wait(self.refresh_interval)
+
+    def start(self) -> None:
+        """Start applying the symbol universe in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="symbol-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing; in-progress subscription changes are abandoned."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
@@ -0,0 +1,196 @@
+import sys
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bybit ticker field -> TickerData column for every numeric column kept in the buffer
+FLOAT_FIELDS = {
+    'price24hPcnt': 'price_24h_pcnt',
+    'lastPrice': 'last_price',
+    'prevPrice24h': 'prev_price_24h',
+    'highPrice24h': 'high_price_24h',
+    'lowPrice24h': 'low_price_24h',
+    'prevPrice1h': 'prev_price_1h',
+    'markPrice': 'mark_price',
+    'indexPrice': 'index_price',
+    'openInterest': 'open_interest',
+    'openInterestValue': 'open_interest_value',
+    'turnover24h': 'turnover_24h',
+    'volume24h': 'volume_24h',
+    'fundingRate': 'funding_rate',
+    'bid1Price': 'bid1_price',
+    'bid1Size': 'bid1_size',
+    'ask1Price': 'ask1_price',
+    'ask1Size': 'ask1_size',
+}
+
+# Pre-listing fields are only present for newly listed contracts, so they are stored sparsely
+PRE_LISTING_FIELDS = {
+    'preOpenPrice': 'pre_open_price',
+    'preQty': 'pre_qty',
+    'curPreListingPhase': 'cur_pre_listing_phase',
+}
+
+# Columns marking a row that stands for a whole conflated interval (None on regular ticks)
+CONFLATION_COLUMNS = ('conflated_count', 'interval_high', 'interval_low')
+
+TICK_DIRECTIONS = ('PlusTick', 'ZeroPlusTick', 'MinusTick', 'ZeroMinusTick')
+_TICK_DIRECTION_CODES = {name: code for code, name in enumerate(TICK_DIRECTIONS)}
+_UNKNOWN_TICK_DIRECTION = -1
+
+
+class TickerBuffer:
+    """Columnar buffer of parsed ticker records.
+
+    Every incoming message is parsed once into typed ``array`` columns; symbols are
+    interned so each row only holds a reference, and tick directions are stored as
+    one-byte codes. A full buffer is handed off as-is and replaced by a new one, so
+    records are never copied between the WebSocket callback and the save thread.
+    """
+
+    table_name = 'ticker_data'
+
+    __slots__ = (
+        'symbols', 'timestamps', 'exchange_ts', 'cross_seq', 'tick_directions', 'next_funding_time',
+        'columns', 'pre_listing', 'conflated', 'enqueued_at',
+    )
+
+    def __init__(self) -> None:
+        self.symbols: List[str] = []
+        self.timestamps = array('d')  # local receive time, epoch seconds
+        self.exchange_ts = array('q')  # Bybit message ``ts``, epoch milliseconds (0 if unknown)
+        self.cross_seq = array('q')  # Bybit message ``cs`` (0 if unknown)
+        self.tick_directions = array('b')
+        self.next_funding_time = array('q')
+        self.columns: Dict[str, array] = {column: array('d') for column in FLOAT_FIELDS.values()}
+        self.pre_listing: Dict[int, Dict[str, Any]] = {}
+        self.conflated: Dict[int, Tuple[int, float, float]] = {}  # row -> (messages, high, low) of its interval
+        self.enqueued_at: Optional[float] = None  # set when the buffer is handed to the save queue
+
+    @classmethod
+    def from_messages(cls, records: List[Dict[str, Any]]) -> 'TickerBuffer':
+        """Build a buffer from raw Bybit ticker dicts carrying a ``timestamp`` key."""
+        buffer = cls()
+        for record in records:
+            timestamp = record['timestamp']
+            buffer.append(record, timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp)
+        return buffer
+
+    @classmethod
+    def merge(cls, buffers: List['TickerBuffer']) -> 'TickerBuffer':
+        """Concatenate several buffers into one, keeping the earliest enqueue time."""
+        merged = cls()
+        for buffer in buffers:
+            offset = len(merged)
+            merged.symbols.extend(buffer.symbols)
+            merged.timestamps.extend(buffer.timestamps)
+            merged.exchange_ts.extend(buffer.exchange_ts)
+            merged.cross_seq.extend(buffer.cross_seq)
+            merged.tick_directions.extend(buffer.tick_directions)
+            merged.next_funding_time.extend(buffer.next_funding_time)
+            for name, column in merged.columns.items():
+                column.extend(buffer.columns[name])
+            merged.pre_listing.update({offset + i: values for i, values in buffer.pre_listing.items()})
+            merged.conflated.update({offset + i: values for i, values in buffer.conflated.items()})
+        enqueue_times = [buffer.enqueued_at for buffer in buffers if buffer.enqueued_at is not None]
+        merged.enqueued_at = min(enqueue_times) if enqueue_times else None
+        return merged
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def append(
+        self,
+        data: Dict[str, Any],
+        timestamp: float,
+        exchange_ts: int = 0,
+        cross_seq: int = 0,
+        conflated: Optional[Tuple[int, float, float]] = None,
+    ) -> None:
+        """Parse a Bybit ticker dict into the columns.
+
+        All fields are converted before any column is touched, so a message with a
+        missing or malformed field raises without leaving a partial row behind.
+        ``conflated`` marks a row summarising several messages as (count, high, low).
+        """
+        values = [float(data[field]) for field in FLOAT_FIELDS]
+        next_funding_time = int(data['nextFundingTime'])
+        tick_direction = _TICK_DIRECTION_CODES.get(data['tickDirection'], _UNKNOWN_TICK_DIRECTION)
+        pre_listing = {column: data[field] for field, column in PRE_LISTING_FIELDS.items() if data.get(field)}
+
+        if pre_listing:
+            self.pre_listing[len(self.symbols)] = pre_listing
+        if conflated is not None:
+            self.conflated[len(self.symbols)] = conflated
+        self.symbols.append(sys.intern(data['symbol']))
+        self.timestamps.append(timestamp)
+        self.exchange_ts.append(exchange_ts)
+        self.cross_seq.append(cross_seq)
+        self.tick_directions.append(tick_direction)
+        self.next_funding_time.append(next_funding_time)
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+
+    def last_value(self, column: str) -> Optional[float]:
+        """Return the most recent value of a float column, or None if the buffer is empty."""
+        values = self.columns[column]
+        return values[-1] if values else None
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the buffer's column storage."""
+        arrays = [
+            self.timestamps, self.exchange_ts, self.cross_seq, self.tick_directions, self.next_funding_time,
+            *self.columns.values(),
+        ]
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays) + sys.getsizeof(self.symbols)
+
+    def to_columns(self) -> Dict[str, Sequence[Any]]:
+        """Return the buffer as ``{column: values}`` with the same values as :meth:`rows`.
+
+        Float columns are the buffer's own arrays, so callers must not modify them.
+        """
+        columns: Dict[str, Sequence[Any]] = {
+            'timestamp': [datetime.fromtimestamp(t) for t in self.timestamps],
+            'exchange_ts': [value or None for value in self.exchange_ts],
+            'receive_ts': [int(t * 1000) for t in self.timestamps],
+            'cross_seq': [value or None for value in self.cross_seq],
+            'symbol': self.symbols,
+            'tick_direction': [
+                TICK_DIRECTIONS[code] if code != _UNKNOWN_TICK_DIRECTION else None for code in self.tick_directions
+            ],
+            'next_funding_time': self.next_funding_time,
+        }
+        columns.update(self.columns)
+        for name in PRE_LISTING_FIELDS.values():
+            columns[name] = [self.pre_listing.get(i, {}).get(name) for i in range(len(self))]
+        for position, name in enumerate(CONFLATION_COLUMNS):
+            columns[name] = [
+                self.conflated[i][position] if i in self.conflated else None for i in range(len(self))
+            ]
+        return columns
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Yield one TickerData column mapping per buffered record."""
+        names = list(self.columns)
+        columns = list(self.columns.values())
+        for i, symbol in enumerate(self.symbols):
+            code = self.tick_directions[i]
+            receive_time = self.timestamps[i]
+            row = {
+                'timestamp': datetime.fromtimestamp(receive_time),
+                'exchange_ts': self.exchange_ts[i] or None,
+                'receive_ts': int(receive_time * 1000),
+                'cross_seq': self.cross_seq[i] or None,
+                'symbol': symbol,
+                'tick_direction': TICK_DIRECTIONS[code] if code != _UNKNOWN_TICK_DIRECTION else None,
+                'next_funding_time': self.next_funding_time[i],
+            }
+            for name, column in zip(names, columns):
+                row[name] = column[i]
+            pre_listing = self.pre_listing.get(i, {})
+            for name in PRE_LISTING_FIELDS.values():
+                row[name] = pre_listing.get(name)
+            conflated = self.conflated.get(i, (None, None, None))
+            for name, value in zip(CONFLATION_COLUMNS, conflated):
+                row[name] = value
+            yield row
@@ -0,0 +1,199 @@
+"""Latest ticker state per symbol in a memory-mapped file, for other local processes.
+
+Layout (native byte order)::
+
+    header      64 bytes: magic, version, capacity, field count, symbol count
+    symbols     capacity x 32-byte NUL padded ASCII names
+    sequence    capacity x uint64 seqlock counters
+    fields      one capacity x float64 array per entry of FIELDS
+
+The writer bumps a slot's sequence to an odd value, writes the fields and bumps it
+back to even. Readers copy the fields and retry while the sequence is odd or has
+changed, so reads are lock-free and never block the writer. Python cannot issue
+memory barriers, so this relies on the store ordering of x86-64.
+
+This module has no dependencies outside the standard library, so strategy
+processes can import ``TickerSnapshotReader`` on its own.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional
+
+MAGIC = b'BYBTSNAP'
+VERSION = 1
+HEADER = struct.Struct('=8sIIII')
+HEADER_SIZE = 64
+SYMBOL_SIZE = 32
+
+FIELDS = (
+    'bid1_price', 'bid1_size', 'ask1_price', 'ask1_size',
+    'last_price', 'mark_price', 'index_price', 'exchange_ts', 'receive_ts',
+)
+# Bybit ticker key for each field that comes straight from the message data
+_SOURCE_KEYS = {
+    'bid1_price': 'bid1Price', 'bid1_size': 'bid1Size', 'ask1_price': 'ask1Price', 'ask1_size': 'ask1Size',
+    'last_price': 'lastPrice', 'mark_price': 'markPrice', 'index_price': 'indexPrice',
+}
+_SYMBOL_COUNT_OFFSET = 8 + 4 + 4 + 4
+
+
+def _layout(capacity: int):
+    symbols_offset = HEADER_SIZE
+    seq_offset = symbols_offset + capacity * SYMBOL_SIZE
+    fields_offset = seq_offset + capacity * 8
+    size = fields_offset + len(FIELDS) * capacity * 8
+    return symbols_offset, seq_offset, fields_offset, size
+
+
+class _Mapping:
+    """Typed views over a snapshot file mapping."""
+
+    def __init__(self, mapped: mmap.mmap, capacity: int) -> None:
+        symbols_offset, seq_offset, fields_offset, size = _layout(capacity)
+        self.mmap = mapped
+        self.capacity = capacity
+        self.view = memoryview(mapped)
+        self.header = self.view[:HEADER_SIZE]
+        self.symbols = self.view[symbols_offset:seq_offset]
+        self.seq = self.view[seq_offset:fields_offset].cast('Q')
+        self.fields = [
+            self.view[fields_offset + i * capacity * 8:fields_offset + (i + 1) * capacity * 8].cast('d')
+            for i in range(len(FIELDS))
+        ]
+
+    def symbol_count(self) -> int:
+        return struct.unpack_from('=I', self.header, _SYMBOL_COUNT_OFFSET)[0]
+
+    def symbol_name(self, slot: int) -> str:
+        raw = bytes(self.symbols[slot * SYMBOL_SIZE:(slot + 1) * SYMBOL_SIZE])
+        return raw.rstrip(b'\0').decode('ascii')
+
+    def close(self) -> None:
+        for view in (*self.fields, self.seq, self.symbols, self.header, self.view):
+            view.release()
+        self.mmap.close()
+
+
+class TickerSnapshotWriter:
+    """Publish each symbol's latest ticker state into a shared memory-mapped file."""
+
+    def __init__(self, path: str, capacity: int = 1024) -> None:
+        size = _layout(capacity)[3]
+        # Build the file under a temporary name and swap it in, so readers still mapping a
+        # previous file keep valid (if stale) memory instead of a truncated one
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            mapped = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(mapped, 0, MAGIC, VERSION, capacity, len(FIELDS), 0)
+        os.replace(tmp_path, path)
+        self.path = path
+        self._mapping = _Mapping(mapped, capacity)
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, symbol: str) -> Optional[int]:
+        with self._lock:
+            slot = self._slots.get(symbol)
+            if slot is not None:
+                return slot
+            slot = len(self._slots)
+            if slot >= self._mapping.capacity:
+                return None
+            encoded = symbol.encode('ascii')[:SYMBOL_SIZE]
+            self._mapping.symbols[slot * SYMBOL_SIZE:slot * SYMBOL_SIZE + len(encoded)] = encoded
+            # Publish the name before the count so readers never see an unnamed slot
+            struct.pack_into('=I', self._mapping.header, _SYMBOL_COUNT_OFFSET, slot + 1)
+            self._slots[symbol] = slot
+            return slot
+
+    def publish(self, data: Dict[str, str], exchange_ts: int, receive_time: float) -> None:
+        """Write the latest state of one symbol from a merged Bybit ticker dict."""
+        slot = self._slots.get(data['symbol'])
+        if slot is None:
+            slot = self._slot(data['symbol'])
+            if slot is None:
+                return
+        values = [float(data[key]) for key in _SOURCE_KEYS.values()]
+        values.append(float(exchange_ts))
+        values.append(receive_time * 1000)
+
+        seq = self._mapping.seq
+        seq[slot] += 1  # odd: write in progress
+        for column, value in zip(self._mapping.fields, values):
+            column[slot] = value
+        seq[slot] += 1  # even: consistent
+
+    def close(self) -> None:
+        self._mapping.close()
+
+
+class TickerSnapshotReader:
+    """Lock-free, zero-copy reader of a snapshot file written by TickerSnapshotWriter."""
+
+    def __init__(self, path: str, max_retries: int = 1000) -> None:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = os.fstat(f.fileno()).st_ino
+        self.path = path
+        magic, version, capacity, field_count, _ = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION or field_count != len(FIELDS):
+            mapped.close()
+            raise ValueError(f"{path} is not a version {VERSION} ticker snapshot")
+        self.max_retries = max_retries
+        self._mapping = _Mapping(mapped, capacity)
+        self._slots: Dict[str, int] = {}
+
+    def _refresh_symbols(self) -> None:
+        for slot in range(len(self._slots), self._mapping.symbol_count()):
+            self._slots[self._mapping.symbol_name(slot)] = slot
+
+    def symbols(self):
+        """Return every symbol currently published."""
+        self._refresh_symbols()
+        return list(self._slots)
+
+    def read(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Return a consistent copy of a symbol's latest fields, or None if never published."""
+        slot = self._slots.get(symbol)
+        if slot is None:
+            self._refresh_symbols()
+            slot = self._slots.get(symbol)
+            if slot is None:
+                return None
+        seq = self._mapping.seq
+        fields = self._mapping.fields
+        for _ in range(self.max_retries):
+            before = seq[slot]
+            if before == 0:
+                return None
+            if before & 1:
+                # The writer was preempted mid-update; let it run instead of spinning
+                time.sleep(0)
+                continue
+            values = [column[slot] for column in fields]
+            if seq[slot] == before:
+                return dict(zip(FIELDS, values))
+            time.sleep(0)
+        raise TimeoutError(f"Snapshot for {symbol} kept changing during {self.max_retries} reads")
+
+    def replaced(self) -> bool:
+        """True once the collector has restarted and published a new file; reopen the reader then."""
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return True
+
+    def age(self, symbol: str) -> Optional[float]:
+        """Seconds since the symbol's snapshot was last received by the collector."""
+        snapshot = self.read(symbol)
+        return time.time() - snapshot['receive_ts'] / 1000 if snapshot else None
+
+    def close(self) -> None:
+        self._mapping.close()
@@ -1,126 +1,524 @@
 import logging
-from datetime import datetime
-from typing import Any, Dict
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from pybit.unified_trading import WebSocket
 
-from config.settings import API_KEY, API_SECRET, SYMBOLS, TESTNET, TICKER_BATCH_SIZE
+from config.settings import (
+    ADAPTIVE_BATCHING,
+    API_KEY,
+    API_SECRET,
+    FEED_WATCHDOG,
+    MAX_SYMBOLS_PER_CONNECTION,
+    METRICS_INTERVAL,
+    PRIVATE_BATCH_MAX_AGE,
+    PRIVATE_BATCH_SIZE,
+    PRIVATE_TOPICS,
+    SHUTDOWN_TIMEOUT,
+    SYMBOLS,
+    TESTNET,
+    TICKER_BATCH_SIZE,
+    TICKER_SNAPSHOT_CAPACITY,
+    TICKER_SNAPSHOT_PATH,
+)
+from models.market_data import FeedGap
+from services.batch_controller import AdaptiveBatchController
+from services.conflation import Conflator
 from services.data_processor import DataProcessor
+from services.feed_watchdog import RECONNECT, FeedWatchdog
+from services.latency import EXCHANGE_TO_RECEIVE
+from services.metrics import MetricsEngine
+from services.private_events import TOPIC_TABLES, EventBatch, parse_private_message
+from services.ticker_buffer import TickerBuffer
+from services.ticker_snapshot import TickerSnapshotWriter
 
 logger = logging.getLogger("bybit_collector.websocket")
 
+# pybit keeps a topic's callback until the exchange acks its unsubscribe and refuses to subscribe it again meanwhile
+UNSUBSCRIBE_ACK_TIMEOUT = 5.0
+UNSUBSCRIBE_ACK_POLL = 0.02
+
 
 class BybitWebSocketClient:
     def __init__(self):
-        self.ticker_data: Dict[str, list[Dict[str, Any]]] = {}
-        self.ws_public = None
+        self.ticker_data: Dict[str, TickerBuffer] = {}
+        self.ws_connections: List[WebSocket] = []  # public linear connections
         self.ws_private = None
-        self.subscriptions: list[str] = []
+        self.private_events: Dict[str, EventBatch] = {}  # table name -> batch being filled
         self.data_processor = DataProcessor()
+        self._accepting = True
+        self._lock = threading.Lock()
+        self._connection_load: List[float] = []  # expected messages/second per connection
+        self._symbol_connection: Dict[str, Tuple[int, float]] = {}  # symbol -> (connection index, expected rate)
+        self._subscribing: Dict[str, int] = {}  # symbol -> connection index, while its subscribe is in flight
+        self._retired_symbols: Set[str] = set()
+        self.snapshot = (
+            TickerSnapshotWriter(TICKER_SNAPSHOT_PATH, TICKER_SNAPSHOT_CAPACITY) if TICKER_SNAPSHOT_PATH else None
+        )
+        # Guards swapping buffers out, since stale buffers are flushed from outside the callback threads
+        self._buffer_lock = threading.Lock()
+        # (symbol or None, batch, time) swapped out under _buffer_lock and queued for saving after releasing it
+        self._ready: List[Tuple[Optional[str], Any, float]] = []
+        self.batch_controller = AdaptiveBatchController() if ADAPTIVE_BATCHING else None
+        self._conflator = Conflator()  # only holds state while the data processor is overloaded
+        self.data_processor.batch_controller = self.batch_controller
+        self.metrics = MetricsEngine() if METRICS_INTERVAL > 0 else None
+        self._last_metrics = time.time()
+        self.watchdog = FeedWatchdog() if FEED_WATCHDOG else None
+
+    @property
+    def active_symbols(self) -> Set[str]:
+        """Symbols currently subscribed on the public connections."""
+        return set(self._symbol_connection)
 
     def connect_public(self):
-        """Connect to Bybit WebSocket API and subscribe to channels."""
+        """Connect to Bybit WebSocket API and subscribe to the configured symbols."""
         try:
-            self.ws_public = WebSocket(
-                testnet=TESTNET,
-                channel_type="linear",
-            )
             for symbol in SYMBOLS:  # Subscribe to all symbols
-                self.ws_public.ticker_stream(symbol, self.handle_ticker)
+                self.subscribe_symbol(symbol)
         except Exception as e:
             logger.exception(f"Failed to connect to WebSocket: {e}")
             raise
 
+    def _connection_for(self, expected_rate):
+        """Pick the least loaded public connection with room left, opening a new one if needed."""
+        counts = Counter(index for index, _ in self._symbol_connection.values())
+        counts.update(self._subscribing.values())
+        candidates = [i for i in range(len(self.ws_connections)) if counts[i] < MAX_SYMBOLS_PER_CONNECTION]
+        if candidates:
+            index = min(candidates, key=lambda i: self._connection_load[i])
+        else:
+            self.ws_connections.append(WebSocket(testnet=TESTNET, channel_type="linear"))
+            self._connection_load.append(0.0)
+            index = len(self.ws_connections) - 1
+            logger.info(f"Opened public connection #{index}")
+        self._connection_load[index] += expected_rate
+        return index
+
+    def subscribe_symbol(self, symbol, expected_rate=1.0):
+        """Subscribe to a symbol's ticker on the connection with the lowest expected message rate.
+
+        The connection is picked under ``_lock``; waiting for a pending unsubscribe
+        ack and the subscribe request itself happen outside it.
+        """
+        with self._lock:
+            if symbol in self._symbol_connection or symbol in self._subscribing:
+                return
+            connections = len(self.ws_connections)
+            index = self._connection_for(expected_rate)
+            opened = index == connections
+            self._subscribing[symbol] = index
+            ws = self.ws_connections[index]
+        try:
+            if not self._await_unsubscribe(ws, symbol):
+                raise TimeoutError(f"no unsubscribe ack for {symbol}")
+            ws.ticker_stream(symbol, self.handle_ticker)
+        except Exception:
+            with self._lock:
+                del self._subscribing[symbol]
+                self._connection_load[index] -= expected_rate
+                unused = self._pop_unused_connection(index) if opened else None
+            if unused is not None:
+                unused.exit()
+                logger.info(f"Closed public connection #{index} opened for {symbol}")
+            raise
+        with self._lock:
+            del self._subscribing[symbol]
+            self._symbol_connection[symbol] = (index, expected_rate)
+            self._retired_symbols.discard(symbol)
+            if self.ws_connections[index] is not ws:
+                # Reconnected meanwhile, without this symbol
+                self.ws_connections[index].ticker_stream(symbol, self.handle_ticker)
+        if self.watchdog is not None:
+            with self._buffer_lock:
+                self.watchdog.watch(symbol, time.time())
+        logger.info(f"Subscribed to {symbol} on connection #{index}")
+
+    def _pop_unused_connection(self, index):
+        """Remove public connection ``index`` if it is the last one and carries no symbols; returns it to close."""
+        if (index != len(self.ws_connections) - 1 or self._connection_symbols(index)
+                or index in self._subscribing.values()):
+            return None
+        self._connection_load.pop()
+        return self.ws_connections.pop()
+
+    @staticmethod
+    def _await_unsubscribe(ws, symbol, timeout=UNSUBSCRIBE_ACK_TIMEOUT):
+        """Wait for the ack of a pending unsubscribe from ``symbol`` on ``ws``, if there is one; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while f"tickers.{symbol}" in ws.callback_directory:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(UNSUBSCRIBE_ACK_POLL)
+        return True
+
+    def unsubscribe_symbol(self, symbol):
+        """Unsubscribe from a symbol, flush its buffered data and free its state."""
+        with self._lock:
+            if symbol not in self._symbol_connection:
+                return
+            index, expected_rate = self._symbol_connection.pop(symbol)
+            self._connection_load[index] -= expected_rate
+            self._retired_symbols.add(symbol)
+            # Quoted so the lookup in pybit's subscription messages matches this topic only
+            self.ws_connections[index].unsubscribe(f'"tickers.{symbol}"')
+
+        with self._buffer_lock:
+            pending = self._conflator.pop(symbol)
+            if pending is not None:
+                self._append_conflated(pending)
+            buffer = self.ticker_data.pop(symbol, None)
+            ready = self._take_ready()
+        self._queue_ready(ready)
+        if buffer is not None and len(buffer):
+            self.data_processor.add_to_save_queue(buffer)
+        self.data_processor.latency.forget(symbol)
+        with self._buffer_lock:
+            if self.metrics is not None:
+                self.metrics.forget(symbol)
+            if self.watchdog is not None:
+                self.watchdog.forget(symbol)
+        if self.batch_controller is not None:
+            self.batch_controller.forget(symbol)
+        logger.info(f"Unsubscribed from {symbol}")
+
     def handle_ticker(self, message):
+        if not self._accepting:
+            return
+        received = time.time()
         try:
-            ticker_data = message['data'].copy()  # Create a copy of incoming data
-            ticker_data['timestamp'] = datetime.now()
-            symbol = ticker_data['symbol']
-            
-            # If this is the first entry, append it
-            if not self.ticker_data.get(symbol):
-                self.ticker_data[symbol] = []
-                self.ticker_data[symbol].append(ticker_data)
+            data = message['data']
+            symbol = data['symbol']
+            if symbol in self._retired_symbols:  # late message after unsubscribing
                 return
+            exchange_ts = int(message.get('ts') or 0)
+            if exchange_ts:
+                self.data_processor.latency.record(symbol, EXCHANGE_TO_RECEIVE, received * 1000 - exchange_ts)
+            if self.snapshot is not None:
+                self.snapshot.publish(data, exchange_ts, received)
+            cross_seq = int(message.get('cs') or 0)
+            with self._buffer_lock:
+                self._observe(symbol, data, received)
+                self._buffer_tick(symbol, data, received, exchange_ts, cross_seq)
+                ready = self._take_ready()
+            self._queue_ready(ready)
 
-            # Get the last entry for the symbol
-            last_data = self.ticker_data[symbol][-1]
-            # Compare all fields except timestamp-related ones
-            fields_to_compare = [
-                # 'symbol', 'tickDirection', 'price24hPcnt', 
-                'lastPrice',
-                # 'prevPrice24h', 'highPrice24h', 'lowPrice24h', 'prevPrice1h',
-                # 'markPrice', 'indexPrice', 'openInterest', 
-                # 'openInterestValue',
-                # 'turnover24h', 'volume24h', 'nextFundingTime', 'fundingRate',
-                # 'bid1Price', 'bid1Size', 'ask1Price', 'ask1Size'
-            ]
-            
-            # Check if any field has changed
-            has_changes = any(
-                ticker_data[field] != last_data[field]
-                for field in fields_to_compare
-            )
-            
-            # Only append if there are changes
-            if has_changes:
-                # print(f'has changes: {ticker_data["lastPrice"]}')
-                self.ticker_data[symbol].append(ticker_data)  # Append the copy
-                
-                # When the internal table reaches the configured batch size, 
-                # queue for saving
-                if len(self.ticker_data[symbol]) >= TICKER_BATCH_SIZE:
-                    data_to_save = self.ticker_data[symbol].copy()
-                    self.ticker_data[symbol] = []
-                    # print(f'save to database: {len(data_to_save)}')
-                    logger.info(f'save to database: {len(data_to_save)}')
-                    self.data_processor.add_to_save_queue(data_to_save) 
-                
-        except KeyError as e:
-            print(f"KeyError in handle_ticker: {e}")
+        except (KeyError, ValueError) as e:
+            logger.warning("Invalid ticker message in handle_ticker: %r", e)
+
+    def _buffer_tick(self, symbol, data, received, exchange_ts, cross_seq):
+        if self._conflate(symbol, data, received, exchange_ts, cross_seq):
+            return
+        buffer = self.ticker_data.get(symbol)
+
+        # If this is the first entry, start a new buffer for the symbol
+        if buffer is None:
+            buffer = self.ticker_data[symbol] = TickerBuffer()
+        # Only append if the last price has changed
+        elif len(buffer) and float(data['lastPrice']) == buffer.last_value('last_price'):
+            return
+
+        buffer.append(data, received, exchange_ts, cross_seq)
+        self._flush_if_full(symbol, buffer, received)
+
+    def _observe(self, symbol, data, received):
+        """Feed every message, conflated or not, to the stall watchdog and the rolling metrics."""
+        if self.watchdog is not None:
+            self.watchdog.observe(symbol, received)
+        if self.metrics is not None:
+            self.metrics.update(symbol, data)
+
+    def _conflate(self, symbol, data, received, exchange_ts, cross_seq):
+        """Fold the message into its conflation interval while overloaded; returns True if it was consumed."""
+        if self.data_processor.overloaded:
+            finished = self._conflator.add(symbol, data, received, exchange_ts, cross_seq)
+            if finished is not None:
+                self._append_conflated(finished)
+            return True
+        if len(self._conflator):
+            # Just left overload mode: write out the intervals still open
+            for pending in self._conflator.drain():
+                self._append_conflated(pending)
+        return False
+
+    def _flush_if_full(self, symbol, buffer, now):
+        """Hand a buffer that reached its batch size (or age) to the save queue, replacing it with a new one."""
+        controller = self.batch_controller
+        if controller is None:
+            full = len(buffer) >= TICKER_BATCH_SIZE
+        else:
+            full = len(buffer) >= controller.threshold(symbol) or now - buffer.timestamps[0] >= controller.max_age
+        if full:
+            self.ticker_data[symbol] = TickerBuffer()
+            self._flush(symbol, buffer, now)
+
+    def _append_conflated(self, row):
+        """Buffer one finished conflation interval as a marked row."""
+        symbol, data, received, exchange_ts, cross_seq, conflated = row
+        buffer = self.ticker_data.get(symbol)
+        if buffer is None:
+            buffer = self.ticker_data[symbol] = TickerBuffer()
+        try:
+            buffer.append(data, received, exchange_ts, cross_seq, conflated)
+        except (KeyError, ValueError) as e:
+            logger.warning("Invalid conflated ticker for %s: %r", symbol, e)
+            return
+        self._flush_if_full(symbol, buffer, received)
+
+    def _flush(self, symbol, batch, now):
+        """Set a swapped out ticker buffer (or, without ``symbol``, another batch) aside for saving."""
+        self._ready.append((symbol, batch, now))
+
+    def _take_ready(self):
+        """Take the batches set aside for saving; called under _buffer_lock."""
+        if not self._ready:
+            return ()
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _queue_ready(self, ready):
+        """Hand batches taken with _take_ready to the save queue; called after releasing _buffer_lock."""
+        for symbol, batch, now in ready:
+            if symbol is None:
+                logger.info('save %s to database: %d', batch.table_name, len(batch))
+            else:
+                logger.info('save to database: %d', len(batch))
+                if self.batch_controller is not None:
+                    self.batch_controller.observe_batch(symbol, len(batch), batch.timestamps[0], now)
+            self.data_processor.add_to_save_queue(batch)
+
+    def flush_stale(self):
+        """Flush buffers whose oldest row has waited longer than the batch freshness bound.
+
+        Quiet symbols may not receive another message for a long time, so this is
+        called periodically rather than relying on handle_ticker alone. It also
+        writes out conflation intervals that no later message has closed,
+        private events older than PRIVATE_BATCH_MAX_AGE and, every
+        METRICS_INTERVAL seconds, a snapshot of the rolling metrics. With the feed
+        watchdog on, it also recovers stalled symbols and saves finished gaps.
+        """
+        now = time.time()
+        if self.watchdog is not None:
+            self._check_feeds(now)
+        with self._buffer_lock:
+            if self.metrics is not None and now - self._last_metrics >= METRICS_INTERVAL:
+                self._save_metrics(now)
+            for table_name, batch in list(self.private_events.items()):
+                if len(batch) and now - batch.timestamps[0] >= PRIVATE_BATCH_MAX_AGE:
+                    self._flush_private(table_name)
+            if len(self._conflator):
+                closed = self._conflator.expired(now) if self.data_processor.overloaded else self._conflator.drain()
+                for row in list(closed):
+                    self._append_conflated(row)
+            if self.batch_controller is not None:
+                for symbol, buffer in list(self.ticker_data.items()):
+                    if len(buffer) and now - buffer.timestamps[0] >= self.batch_controller.max_age:
+                        self.ticker_data[symbol] = TickerBuffer()
+                        self._flush(symbol, buffer, now)
+            ready = self._take_ready()
+        self._queue_ready(ready)
+
+    def _check_feeds(self, now):
+        """Resubscribe or reconnect stalled symbols as the watchdog suggests and queue the ended gaps.
+
+        A connection is reconnected rather than resubscribed when every one of its
+        symbols has stalled, since the connection itself is then the likely culprit.
+        """
+        with self._buffer_lock:
+            actions = self.watchdog.check(now)
+            stalled = set(self.watchdog.stalled())
+            self._save_gaps(self.watchdog.pop_gaps(), now)
+            ready = self._take_ready()
+        self._queue_ready(ready)
+        if not actions:
+            return
+        with self._lock:
+            peers: Dict[int, List[str]] = {}
+            for symbol, (index, _) in self._symbol_connection.items():
+                peers.setdefault(index, []).append(symbol)
+            indexes = {symbol: self._symbol_connection[symbol][0]
+                       for symbol, _ in actions if symbol in self._symbol_connection}
+        reconnect = set()
+        for symbol, action in actions:
+            index = indexes.get(symbol)
+            if index is None:
+                continue
+            if action == RECONNECT or (len(peers[index]) > 1 and stalled.issuperset(peers[index])):
+                reconnect.add(index)
+            else:
+                self._recover(self._resubscribe, symbol)
+        for index in reconnect:
+            if self._recover(self._reconnect, index):
+                with self._buffer_lock:
+                    for symbol in peers[index]:
+                        self.watchdog.acted(symbol, RECONNECT, now)
+
+    @staticmethod
+    def _recover(step, target):
+        try:
+            step(target)
+            return True
+        except Exception as e:
+            logger.error(f"Feed recovery {step.__name__}({target}) failed: {e}")
+            return False
+
+    def _resubscribe(self, symbol):
+        """Unsubscribe and subscribe again to a stalled symbol's ticker on its connection.
+
+        pybit only accepts the new subscription once the exchange has acked the
+        unsubscribe; without an ack the connection is likely dead and the
+        watchdog escalates to a reconnect.
+        """
+        with self._lock:
+            if symbol not in self._symbol_connection:
+                return
+            ws = self.ws_connections[self._symbol_connection[symbol][0]]
+            ws.unsubscribe(f'"tickers.{symbol}"')
+        if not self._await_unsubscribe(ws, symbol):
+            raise TimeoutError(f"no unsubscribe ack for {symbol}")
+        with self._lock:
+            index, _ = self._symbol_connection.get(symbol, (None, 0.0))
+            if index is None or self.ws_connections[index] is not ws:
+                return  # removed or reconnected meanwhile
+            ws.ticker_stream(symbol, self.handle_ticker)
+        logger.warning(f"Resubscribed to stalled {symbol}")
+
+    def _connection_symbols(self, index):
+        return {symbol for symbol, (i, _) in self._symbol_connection.items() if i == index}
+
+    def _reconnect(self, index):
+        """Replace public connection ``index`` with a new one carrying the same symbols.
+
+        The new connection is opened and subscribed outside ``_lock``, then
+        brought in line with symbols added or removed meanwhile and swapped in
+        under it. It is subscribed before the old one is closed; rows both
+        deliver meanwhile are dropped by the ticker_data natural key.
+        """
+        with self._lock:
+            symbols = self._connection_symbols(index)
+        ws = WebSocket(testnet=TESTNET, channel_type="linear")
+        try:
+            for symbol in symbols:
+                ws.ticker_stream(symbol, self.handle_ticker)
+            with self._lock:
+                current = self._connection_symbols(index)
+                for symbol in current - symbols:
+                    ws.ticker_stream(symbol, self.handle_ticker)
+                for symbol in symbols - current:
+                    ws.unsubscribe(f'"tickers.{symbol}"')
+                old, self.ws_connections[index] = self.ws_connections[index], ws
+        except Exception:
+            ws.exit()
+            raise
+        try:
+            old.exit()
+        except Exception as e:
+            logger.error(f"Error closing stalled connection #{index}: {e}")
+        logger.warning(f"Reconnected public connection #{index} ({len(current)} symbols)")
+
+    def _save_gaps(self, gaps, now):
+        if not gaps:
+            return
+        batch = EventBatch(FeedGap.__tablename__)
+        for gap in gaps:
+            batch.append(gap, now)
+        self._flush(None, batch, now)
 
     def connect_private(self):
-        """Connect to Bybit WebSocket API and subscribe to channels."""
+        """Connect the authenticated stream and capture the PRIVATE_TOPICS."""
+        topics = [topic.strip() for topic in PRIVATE_TOPICS if topic.strip()]
+        unknown = [topic for topic in topics if topic not in TOPIC_TABLES]
+        if unknown:
+            raise ValueError(f"Unknown private topics: {', '.join(unknown)}")
+        if not (API_KEY and API_SECRET):
+            raise ValueError("Private streams require BYBIT_API_KEY and BYBIT_API_SECRET")
         try:
-            # Initialize WebSocket client
-            # ws_url = "wss://stream-testnet.bybit.com/v5" if TESTNET else "wss://stream.bybit.com/v5"
-            
-            ws_options = {
-                "api_key": API_KEY,
-                "api_secret": API_SECRET,
-                "channel_type": "linear",
-                "test": TESTNET,
-                "logging_level": logging.DEBUG,
-            }
-            
             self.ws_private = WebSocket(
-                **ws_options,
-                callback=self._handle_message
+                testnet=TESTNET, channel_type="private", api_key=API_KEY, api_secret=API_SECRET
             )
-            
-            # Generate subscription topics
-            # self.subscriptions = self._generate_subscriptions()
-            
-            # Log subscriptions
-            # logger.info(f"Subscribing to: {self.subscriptions}")
-            
-            # Subscribe to topics
-            self.ws_private.subscribe(self.subscriptions)
-            
-            logger.info("Successfully connected to Bybit WebSocket API")
-            
+            for topic in topics:
+                getattr(self.ws_private, f"{topic}_stream")(self.handle_private)
+            logger.info(f"Subscribed to private topics: {', '.join(topics)}")
         except Exception as e:
-            logger.exception(f"Failed to connect to WebSocket: {e}")
+            logger.exception(f"Failed to connect to private WebSocket: {e}")
             raise
-            
-    def disconnect(self):
-        """Disconnect from WebSocket API and cleanup threads."""
-        if self.ws_private:
-            try:
-                self.ws_private.exit()
-                logger.info("Disconnected from Bybit WebSocket API")
-            except Exception as e:
-                logger.error(f"Error disconnecting from WebSocket: {e}")
-        
+
+    def handle_private(self, message):
+        """Batch the events of one private stream message like ticks, one batch per table."""
+        if not self._accepting:
+            return
+        received = time.time()
+        try:
+            table_name, rows = parse_private_message(message, received)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning("Invalid private message in handle_private: %r", e)
+            return
+        if not rows:
+            return
+        with self._buffer_lock:
+            batch = self.private_events.get(table_name)
+            if batch is None:
+                batch = self.private_events[table_name] = EventBatch(table_name)
+            for row in rows:
+                batch.append(row, received)
+                if row['exchange_ts']:
+                    self.data_processor.latency.record(
+                        batch.symbols[-1], EXCHANGE_TO_RECEIVE, row['receive_ts'] - row['exchange_ts']
+                    )
+            if len(batch) >= PRIVATE_BATCH_SIZE:
+                self._flush_private(table_name)
+            ready = self._take_ready()
+        self._queue_ready(ready)
+
+    def _save_metrics(self, now):
+        self._last_metrics = now
+        batch = EventBatch('ticker_metrics')
+        for row in self.metrics.rows(now):
+            batch.append(row, now)
+        if len(batch):
+            self._flush(None, batch, now)
+
+    def _flush_private(self, table_name):
+        self._flush(None, self.private_events.pop(table_name), time.time())
+
+    def disconnect(self, timeout=SHUTDOWN_TIMEOUT):
+        """Stop intake, flush every partial buffer and stop the data processor.
+
+        Returns the data processor's shutdown status.
+        """
+        self._accepting = False
+        for ws in [*self.ws_connections, self.ws_private]:
+            if ws:
+                try:
+                    ws.exit()
+                    logger.info("Disconnected from Bybit WebSocket API")
+                except Exception as e:
+                    logger.error(f"Error disconnecting from WebSocket: {e}")
+
+        self._flush_all()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
         # Signal save thread to stop
-        self.data_processor.stop()
+        return self.data_processor.stop(timeout)
+
+    def _flush_all(self):
+        """Hand every partially filled buffer, and the gaps still open, to the save queue."""
+        with self._buffer_lock:
+            for pending in self._conflator.drain():
+                self._append_conflated(pending)
+            for symbol, buffer in list(self.ticker_data.items()):
+                if len(buffer):
+                    self.ticker_data[symbol] = TickerBuffer()
+                    self._ready.append((None, buffer, 0.0))
+            for table_name, batch in list(self.private_events.items()):
+                if len(batch):
+                    self._flush_private(table_name)
+            if self.watchdog is not None:
+                # Silences still going on are recorded as unrecovered gaps
+                now = time.time()
+                self._save_gaps(self.watchdog.close(now), now)
+            ready = self._take_ready()
+        self._queue_ready(ready)
@@ -0,0 +1,44 @@
+"""Ticker messages and batches shared by the tests."""
+from services.ticker_buffer import TickerBuffer
+
+BASE_RECEIVE_TIME = 1700000000.0  # receive time of the first tick make_buffer appends, epoch seconds
+
+
+def make_ticker(symbol, last_price, tick_direction="PlusTick", **fields):
+    """A complete Bybit linear ticker ``data`` dict with string values as the exchange sends them.
+
+    ``fields`` override or add keys by their Bybit name, e.g. ``fundingRate="0.0002"``.
+    """
+    data = {
+        "symbol": symbol,
+        "tickDirection": tick_direction,
+        "price24hPcnt": "0.01",
+        "lastPrice": last_price,
+        "prevPrice24h": "99",
+        "highPrice24h": "105",
+        "lowPrice24h": "95",
+        "prevPrice1h": "99.5",
+        "markPrice": "100.2",
+        "indexPrice": "100.1",
+        "openInterest": "10",
+        "openInterestValue": "1000",
+        "turnover24h": "100000",
+        "volume24h": "1000",
+        "nextFundingTime": "1700000000000",
+        "fundingRate": "0.0001",
+        "bid1Price": "99.9",
+        "bid1Size": "1",
+        "ask1Price": "100.1",
+        "ask1Size": "2",
+    }
+    data.update(fields)
+    return data
+
+
+def make_buffer(tickers, start=0):
+    """A TickerBuffer of ``tickers`` received a second apart, the i-th (counted from ``start``) with
+    exchange_ts ``1700000000000 + i`` and cross_seq ``i + 1``."""
+    buffer = TickerBuffer()
+    for i, data in enumerate(tickers, start):
+        buffer.append(data, BASE_RECEIVE_TIME + i, exchange_ts=int(BASE_RECEIVE_TIME * 1000) + i, cross_seq=i + 1)
+    return buffer
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("asyncpg")
+
+from services.async_writer import AsyncPostgresWriter, asyncpg_dsn
+from services.private_events import EventBatch
+from tests.helpers import make_buffer, make_ticker
+
+# e.g. postgresql://postgres@127.0.0.1:5432/bybit_test; the tables are created and dropped by the test
+TEST_POSTGRES_DSN = os.getenv("TEST_POSTGRES_DSN", "")
+
+
+def make_batch(table_name, *symbols):
+    batch = EventBatch(table_name)
+    for symbol in symbols:
+        batch.append({'symbol': symbol}, time.time())
+    return batch
+
+
+def test_asyncpg_dsn_drops_sqlalchemy_driver():
+    assert asyncpg_dsn("postgresql+psycopg2://u:p@h/db") == "postgresql://u:p@h/db"
+    assert asyncpg_dsn("postgresql://u:p@h/db") == "postgresql://u:p@h/db"
+
+
+def test_batches_overlap_but_keep_per_symbol_order():
+    writer = AsyncPostgresWriter("postgresql://unused/db")
+    events = []
+
+    async def fake_write(table_name, rows, latest):
+        events.append(('start', table_name))
+        await asyncio.sleep(0.1 if table_name == 'slow' else 0.01)
+        events.append(('end', table_name))
+        return len(rows)
+
+    writer._write = fake_write
+    try:
+        futures = [
+            writer.submit(make_batch('slow', 'BTCUSDT', 'BTCUSDT')),
+            writer.submit(make_batch('other', 'ETHUSDT')),
+            writer.submit(make_batch('next', 'BTCUSDT', 'SOLUSDT')),
+        ]
+        assert [future.result(timeout=5) for future in futures] == [2, 1, 2]
+    finally:
+        writer.close()
+
+    # ETHUSDT does not wait for the slow BTCUSDT batch, the next BTCUSDT batch does
+    assert events.index(('end', 'other')) < events.index(('end', 'slow'))
+    assert events.index(('start', 'next')) > events.index(('end', 'slow'))
+    assert writer._tails == {}
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_DSN, reason="TEST_POSTGRES_DSN is not set")
+def test_writes_tickers_and_events_to_postgres():
+    from sqlalchemy import create_engine, text
+
+    from db.database import Base
+    from models.market_data import Execution, TickerData, TickerLatest
+
+    tables = [TickerData.__table__, TickerLatest.__table__, Execution.__table__]
+    engine = create_engine(TEST_POSTGRES_DSN)
+    Base.metadata.drop_all(engine, tables=tables)
+    Base.metadata.create_all(engine, tables=tables)
+    writer = AsyncPostgresWriter(TEST_POSTGRES_DSN, pool_size=2)
+    try:
+        writer.start()
+        assert writer.write(make_buffer([make_ticker("BTCUSDT", "100"), make_ticker("BTCUSDT", "101")])) == 2
+        # Replays are skipped and never move ticker_latest backwards
+        assert writer.write(make_buffer([make_ticker("BTCUSDT", "100")])) == 0
+
+        executions = EventBatch('executions')
+        executions.append({'exec_id': 'e-1', 'symbol': 'BTCUSDT', 'exchange_ts': 1, 'receive_ts': 2}, time.time())
+        assert writer.write(executions) == 1
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM ticker_data")).scalar() == 2
+            assert conn.execute(text("SELECT last_price FROM ticker_latest WHERE symbol = 'BTCUSDT'")).scalar() == 101
+            assert conn.execute(text("SELECT exec_id FROM executions")).scalar() == 'e-1'
+    finally:
+        writer.close()
+        Base.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
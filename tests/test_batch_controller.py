@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services import batch_controller
+from services.batch_controller import AdaptiveBatchController
+
+
+def make_controller():
+    return AdaptiveBatchController(target_rows=500, max_age=5.0, min_size=10, max_size=2000, initial_size=100)
+
+
+def test_thresholds_follow_arrival_rate_within_limits():
+    controller = make_controller()
+    assert controller.threshold("BTCUSDT") == 100
+
+    # 100 rows/s: five seconds of data would exceed the target, so the target wins
+    controller.observe_batch("BTCUSDT", 100, first_received=0.0, now=1.0)
+    # 4 rows/s: five seconds of data is 20 rows
+    controller.observe_batch("ETHUSDT", 100, first_received=0.0, now=25.0)
+    # Barely trading: clamped to the minimum and left to the age flush
+    controller.observe_batch("DOGEUSDT", 1, first_received=0.0, now=60.0)
+
+    assert controller.thresholds() == {"BTCUSDT": 500, "ETHUSDT": 20, "DOGEUSDT": 10}
+
+
+def test_rate_counts_idle_time_between_flushes():
+    controller = make_controller()
+    controller.observe_batch("ETHUSDT", 20, first_received=0.0, now=5.0)
+    # The next buffer only started at 95s, but the symbol was idle since the last flush
+    controller.observe_batch("ETHUSDT", 20, first_received=95.0, now=100.0)
+
+    assert controller.rate("ETHUSDT") < 4.0
+
+
+def test_busy_writer_grows_busy_symbols_only():
+    controller = make_controller()
+    controller.observe_batch("BTCUSDT", 1000, first_received=0.0, now=1.0)
+    controller.observe_batch("ETHUSDT", 100, first_received=0.0, now=25.0)
+
+    start = controller._window_start
+    controller.observe_commit(9.0, now=start + batch_controller.UTILIZATION_WINDOW)
+
+    assert controller.load_factor == 0.9 / batch_controller.TARGET_UTILIZATION
+    assert controller.threshold("BTCUSDT") == 900
+    assert controller.threshold("ETHUSDT") == 20
+
+    controller.forget("BTCUSDT")
+    assert "BTCUSDT" not in controller.thresholds()
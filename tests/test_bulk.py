@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, UniqueConstraint, create_engine, select
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.orm import Session
+
+from db import bulk
+
+metadata = MetaData()
+items = Table(
+    "items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("symbol", String(20)),
+    Column("seq", Integer),
+    UniqueConstraint("symbol", "seq"),
+)
+
+
+def test_insert_ignore_skips_duplicates_on_sqlite():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    rows = [{"symbol": "BTCUSDT", "seq": i} for i in range(5)]
+
+    with Session(engine) as session:
+        assert bulk.insert_ignore(session, items, rows) == 5
+        assert bulk.insert_ignore(session, items, rows[3:] + [{"symbol": "BTCUSDT", "seq": 9}]) == 1
+        session.commit()
+        assert session.execute(select(items.c.seq)).scalars().all() == [0, 1, 2, 3, 4, 9]
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        (postgresql.dialect(), "ON CONFLICT DO NOTHING RETURNING items.id"),
+        (mysql.dialect(), "INSERT IGNORE INTO items"),
+    ],
+)
+def test_insert_ignore_dialect_syntax(dialect, expected):
+    rows = [{"symbol": "A", "seq": 1}, {"symbol": "B", "seq": 2}]
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = dialect.name
+    session.execute.return_value.rowcount = 1
+    session.execute.return_value.all.return_value = [(1,)]
+
+    assert bulk.insert_ignore(session, items, rows) == 1
+
+    stmt, params = session.execute.call_args[0]
+    assert params is rows  # one executemany call for the whole batch
+    assert expected in str(stmt.compile(dialect=dialect))
+
+
+latest = Table(
+    "latest", metadata,
+    Column("symbol", String(20), primary_key=True),
+    Column("seq", Integer),
+)
+
+
+def test_upsert_keeps_newest_row_on_sqlite():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+
+    with Session(engine) as session:
+        bulk.upsert(session, latest, [{"symbol": "A", "seq": 1}, {"symbol": "B", "seq": 5}], newer_column="seq")
+        bulk.upsert(session, latest, [{"symbol": "A", "seq": 2}, {"symbol": "B", "seq": 4}], newer_column="seq")
+        session.commit()
+        assert session.execute(select(latest).order_by(latest.c.symbol)).all() == [("A", 2), ("B", 5)]
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        (
+            postgresql.dialect(),
+            "ON CONFLICT (symbol) DO UPDATE SET seq = excluded.seq WHERE latest.seq <= excluded.seq",
+        ),
+        (mysql.dialect(), "ON DUPLICATE KEY UPDATE seq = if(VALUES(seq) >= latest.seq, VALUES(seq), latest.seq)"),
+    ],
+)
+def test_upsert_dialect_syntax(dialect, expected):
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = dialect.name
+
+    bulk.upsert(session, latest, [{"symbol": "A", "seq": 1}], newer_column="seq")
+
+    stmt = session.execute.call_args[0][0]
+    assert expected in str(stmt.compile(dialect=dialect))
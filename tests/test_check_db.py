@@ -0,0 +1,188 @@
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import check_db
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture()
+def conn():
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE ticker_data (id INTEGER PRIMARY KEY, timestamp TEXT, symbol TEXT, last_price REAL, "
+        "bid1_price REAL, bid1_size REAL, ask1_price REAL, ask1_size REAL)"
+    )
+    yield connection
+    connection.close()
+
+
+def insert(conn, symbol, price):
+    conn.execute(
+        "INSERT INTO ticker_data (timestamp, symbol, last_price, bid1_price, bid1_size, ask1_price, ask1_size) "
+        "VALUES ('2026-01-01 00:00:00', ?, ?, ?, 1, ?, 1)",
+        (symbol, price, price - 1, price + 1),
+    )
+    conn.commit()
+
+
+def test_follow_prints_backlog_then_only_new_rows(conn):
+    for price in (1, 2, 3):
+        insert(conn, "BTCUSDT", price)
+    insert(conn, "ETHUSDT", 10)
+    arrivals = [[("BTCUSDT", 4), ("ETHUSDT", 11)], [], [], [("BTCUSDT", 5)]]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if not arrivals:
+            raise Stop
+        for symbol, price in arrivals.pop(0):
+            insert(conn, symbol, price)
+
+    rows = []
+    with pytest.raises(Stop):
+        for row in check_db.follow_ticker_data(conn, "BTCUSDT", backlog=2, min_interval=0.1, max_interval=0.3,
+                                               sleep=sleep):
+            rows.append(row)
+
+    assert [row[3] for row in rows] == [2, 3, 4, 5]
+    assert {row[2] for row in rows} == {"BTCUSDT"}
+    # Back off while empty, reset as soon as rows arrive
+    assert sleeps == [0.2, 0.1, 0.2, 0.3, 0.1]
+
+
+def test_follow_symbol_does_not_rescan_other_symbols_rows(conn):
+    insert(conn, "BTCUSDT", 1)
+    statements = []
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 3:
+            raise Stop
+        for price in range(10):
+            insert(conn, "ETHUSDT", price)
+        conn.set_trace_callback(statements.append)
+
+    with pytest.raises(Stop):
+        list(check_db.follow_ticker_data(conn, "BTCUSDT", backlog=1, sleep=sleep))
+
+    # Each poll starts from the newest id the previous one saw, not from the last BTCUSDT row
+    assert [statement.split("WHERE id > ")[1].split()[0]
+            for statement in statements if "AND symbol" in statement] == ["1", "11"]
+
+
+def test_follow_with_overlap_yields_batches_that_commit_after_higher_ids(conn):
+    insert(conn, "BTCUSDT", 1)
+    clock = [0.0]
+    statements = []
+
+    def commit(*ids):
+        conn.executemany("INSERT INTO ticker_data (id, timestamp, symbol, last_price) "
+                         "VALUES (?, '2026-01-01 00:00:00', 'BTCUSDT', ?)", [(row_id, row_id) for row_id in ids])
+        conn.commit()
+
+    # Ids 2 and 3 belong to a batch that commits after the one holding 4 and 5
+    steps = [lambda: commit(4, 5), lambda: commit(2, 3), lambda: clock.append(clock.pop() + 10),
+             lambda: (commit(6), conn.set_trace_callback(statements.append))]
+
+    def sleep(seconds):
+        if not steps:
+            raise Stop
+        clock.append(clock.pop() + 1)
+        steps.pop(0)()
+
+    rows = []
+    with pytest.raises(Stop):
+        for row in check_db.follow_ticker_data(conn, "BTCUSDT", backlog=1, overlap=5, sleep=sleep,
+                                               clock=lambda: clock[0]):
+            rows.append(row)
+
+    assert [row[0] for row in rows] == [1, 4, 5, 2, 3, 6]
+    # Once the overlap has passed, polls start from the settled MAX(id) again
+    assert [statement.split("WHERE id > ")[1].split()[0]
+            for statement in statements if "AND symbol" in statement] == ["5"]
+
+
+def test_follow_without_backlog_starts_at_newest_row(conn, monkeypatch):
+    monkeypatch.setattr(check_db, "FOLLOW_PAGE_SIZE", 2)
+    insert(conn, "BTCUSDT", 1)
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 1:
+            for price in (2, 3, 4):
+                insert(conn, "BTCUSDT", price)
+        else:
+            raise Stop
+
+    rows = []
+    with pytest.raises(Stop):
+        for row in check_db.follow_ticker_data(conn, backlog=0, sleep=sleep):
+            rows.append(row)
+
+    # A full page is followed by another poll without sleeping
+    assert [row[3] for row in rows] == [2, 3, 4]
+    assert len(polls) == 2
+    assert check_db.format_follow_row(rows[0]).split() == ["2", "2026-01-01", "00:00:00", "BTCUSDT",
+                                                           "2.0", "1.0", "1.0", "3.0", "1.0"]
+
+
+def test_print_table_streams_rows_from_the_cursor(conn, capsys):
+    for price in (1, 2, 3):
+        insert(conn, "BTCUSDT", price)
+    insert(conn, "ETHUSDT", 10)
+    cursor = check_db.get_recent_ticker_data(conn, limit=2, symbol="BTCUSDT")
+    pages = []
+    fetchmany = cursor.fetchmany
+
+    class Recording:
+        description = cursor.description
+
+        def fetchmany(self, size):
+            pages.append(fetchmany(size))
+            return pages[-1]
+
+    check_db.print_table(Recording(), fetch_size=1)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [len(page) for page in pages] == [1, 1, 0]
+    assert lines[1].split("|")[1:4] == [" id ", " timestamp           ", " symbol  "]
+    assert [line.split("|")[3].strip() for line in lines[3:-1]] == ["BTCUSDT", "BTCUSDT"]
+    assert lines[0] == lines[-1] and set(lines[0]) == {"+", "-"}
+
+
+def test_recent_shows_every_column_unless_brief(conn):
+    conn.execute("ALTER TABLE ticker_data ADD COLUMN mark_price REAL")
+    insert(conn, "BTCUSDT", 1)
+
+    columns = [column[0] for column in check_db.get_recent_ticker_data(conn).description]
+    brief = [column[0] for column in check_db.get_recent_ticker_data(conn, brief=True).description]
+    assert columns == list(check_db.FOLLOW_COLUMNS) + ["mark_price"]
+    assert brief == list(check_db.FOLLOW_COLUMNS)
+
+
+def test_symbol_is_passed_as_a_parameter(conn):
+    insert(conn, "BTCUSDT", 1)
+
+    assert check_db.get_ticker_stats(conn, "BTCUSDT").fetchall()[0][:2] == ("BTCUSDT", 1)
+    assert check_db.get_ticker_stats(conn, "X' OR '1'='1").fetchall() == []
+
+
+def test_import_does_not_load_heavy_modules():
+    heavy = "pandas", "tabulate", "psycopg2", "mysql", "sqlalchemy"
+    code = f"import sys, utils.check_db; print(sorted(set({heavy!r}) & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import insert_ignore
+from services import cold_fields, compact_schema
+from tests.helpers import make_buffer, make_ticker
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite://")
+    cold_fields.TickerData.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def make_rows(funding_rates, symbol="BTCUSDT", start=0):
+    tickers = (make_ticker(symbol, f"{100 + i}", fundingRate=rate) for i, rate in enumerate(funding_rates, start))
+    return list(make_buffer(tickers, start).rows())
+
+
+def cold_row_count(session):
+    return session.scalar(select(func.count()).select_from(cold_fields.TickerColdFields.__table__))
+
+
+def test_cold_values_are_written_only_when_they_change(session_factory):
+    splitter = cold_fields.ColdFieldSplitter()
+    rows = make_rows(["0.0001", "0.0001", "0.0002", "0.0002"])
+
+    with session_factory() as session:
+        hot = splitter.split(session, rows[:2])
+        hot += splitter.split(session, rows[2:])
+        insert_ignore(session, cold_fields.TickerData.__table__, hot)
+        session.commit()
+
+        assert cold_row_count(session) == 2
+        assert all(row[name] is None for row in hot for name in cold_fields.COLD_COLUMNS)
+        assert hot[0]["last_price"] == 100.0
+
+        wide = session.execute(cold_fields.with_cold_fields().order_by("receive_ts")).mappings().all()
+    assert [row["funding_rate"] for row in wide] == [0.0001, 0.0001, 0.0002, 0.0002]
+    for original, rebuilt in zip(rows, wide):
+        for name in ("next_funding_time", "prev_price_24h", "high_price_24h", "cur_pre_listing_phase"):
+            assert rebuilt[name] == original[name]
+
+    # A new splitter picks up the stored state instead of writing it again
+    with session_factory() as session:
+        cold_fields.ColdFieldSplitter().split(session, make_rows(["0.0002"], start=10))
+        assert cold_row_count(session) == 2
+
+
+def test_reset_reloads_state_after_a_rollback(session_factory):
+    splitter = cold_fields.ColdFieldSplitter()
+    with session_factory() as session:
+        splitter.split(session, make_rows(["0.0001"]))
+        session.rollback()
+        splitter.reset()
+        splitter.split(session, make_rows(["0.0001"], start=1))
+        session.commit()
+        assert cold_row_count(session) == 1
+
+
+def test_wide_record_is_rebuilt_for_compact_rows(session_factory):
+    splitter = cold_fields.ColdFieldSplitter()
+    encoder = compact_schema.CompactTickerEncoder(compact_schema.SymbolDictionary(session_factory), scaled=False)
+    rows = make_rows(["0.0001", "0.0003"])
+
+    with session_factory() as session:
+        encoder.insert(session, splitter.split(session, rows))
+        session.commit()
+        wide = session.execute(
+            cold_fields.with_cold_fields(compact_schema.wide_query(scaled=False)).order_by("receive_ts")
+        ).mappings().all()
+
+    assert [(row["symbol"], row["funding_rate"]) for row in wide] == [("BTCUSDT", 0.0001), ("BTCUSDT", 0.0003)]
+    assert wide[0]["prev_price_1h"] == 99.5
@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import insert_ignore
+from services import compact_schema
+from tests.helpers import make_buffer, make_ticker
+from utils import migrate_v2
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite://")
+    compact_schema.Symbol.metadata.create_all(engine)
+    migrate_v2.TickerData.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def make_rows(n, symbols=("BTCUSDT", "ETHUSDT")):
+    tickers = (make_ticker(symbols[i % len(symbols)], f"{100 + i}.5", bid1Size="1.25") for i in range(n))
+    return list(make_buffer(tickers).rows())
+
+
+def test_encode_uses_symbol_ids_and_compact_types(session_factory):
+    symbols = compact_schema.SymbolDictionary(session_factory)
+    encoder = compact_schema.CompactTickerEncoder(symbols, scaled=False)
+
+    btc, eth = encoder.encode(make_rows(2))
+
+    assert btc["symbol_id"] != eth["symbol_id"]
+    assert btc["tick_direction"] == 0
+    assert btc["receive_ts"] == 1700000000000
+    assert btc["last_price"] == 100.5
+    assert "symbol" not in btc and "timestamp" not in btc
+    # A second dictionary over the same database reuses the existing ids
+    assert compact_schema.SymbolDictionary(session_factory).resolve(["BTCUSDT"])["BTCUSDT"][0] == btc["symbol_id"]
+
+
+def test_scaled_prices_round_trip_through_wide_query(session_factory):
+    instruments = {"BTCUSDT": {"tick_size": 0.5, "qty_step": 0.25}}
+    encoder = compact_schema.CompactTickerEncoder(
+        compact_schema.SymbolDictionary(session_factory, instruments), scaled=True
+    )
+    rows = make_rows(1, symbols=("BTCUSDT",))
+
+    [encoded] = encoder.encode(rows)
+    assert encoded["last_price"] == 201
+    assert encoded["bid1_size"] == 5
+    assert encoded["mark_price"] == rows[0]["mark_price"]
+
+    with session_factory() as session:
+        encoder.insert(session, rows)
+        session.commit()
+        wide = session.execute(compact_schema.wide_query(scaled=True)).one()._mapping
+    assert wide["symbol"] == "BTCUSDT"
+    assert wide["last_price"] == 100.5
+    assert wide["bid1_size"] == 1.25
+
+
+def test_missing_prices_and_sizes_are_encoded_as_null(session_factory):
+    instruments = {"BTCUSDT": {"tick_size": 0.5, "qty_step": 0.25}}
+    encoder = compact_schema.CompactTickerEncoder(
+        compact_schema.SymbolDictionary(session_factory, instruments), scaled=True
+    )
+    [row] = make_rows(1, symbols=("BTCUSDT",))
+    del row["bid1_price"], row["bid1_size"]
+
+    [encoded] = encoder.encode([row])
+    assert encoded["bid1_price"] is None and encoded["bid1_size"] is None
+    assert encoded["ask1_size"] == 8
+
+
+def test_scaled_rows_need_a_known_tick_size_and_qty_step(session_factory):
+    fetched = []
+
+    def fetch(names):
+        fetched.append(names)
+        return [{"symbol": "ETHUSDT", "tick_size": 0.01, "qty_step": 0.01}]
+
+    symbols = compact_schema.SymbolDictionary(session_factory, {"BTCUSDT": {"tick_size": 0.5}}, fetch=fetch)
+    encoder = compact_schema.CompactTickerEncoder(symbols, scaled=True)
+
+    # BTCUSDT lacks a qty step and is not known to the exchange either, ETHUSDT is looked up
+    encoded = encoder.encode(make_rows(4))
+    eth_id = symbols.resolve(["ETHUSDT"])["ETHUSDT"][0]
+    assert [row["symbol_id"] for row in encoded] == [eth_id, eth_id]
+    assert encoder.encode(make_rows(2)) and fetched == [["BTCUSDT", "ETHUSDT"]]
+    with session_factory() as session:
+        stored = {symbol.name: symbol.tick_size for symbol in session.execute(select(compact_schema.Symbol)).scalars()}
+    assert stored == {"ETHUSDT": 0.01}
+    with pytest.raises(ValueError, match="BTCUSDT"):
+        compact_schema.CompactTickerEncoder(symbols, scaled=True, strict=True).encode(make_rows(2))
+
+    # Unscaled rows are stored either way, keeping only the scales that are known
+    assert len(compact_schema.CompactTickerEncoder(symbols, scaled=False).encode(make_rows(2))) == 2
+    assert symbols.resolve(["BTCUSDT"])["BTCUSDT"][1:] == (0.5, None)
+
+
+def test_backfill_copies_in_chunks_and_resumes(session_factory):
+    with session_factory() as session:
+        insert_ignore(session, migrate_v2.TickerData.__table__, make_rows(25))
+        session.commit()
+    encoder = compact_schema.CompactTickerEncoder(compact_schema.SymbolDictionary(session_factory), scaled=False)
+
+    assert migrate_v2.backfill(session_factory, chunk_size=10, pause=0, max_chunks=2, encoder=encoder) == 20
+    assert migrate_v2.backfill(session_factory, chunk_size=10, pause=0, encoder=encoder) == 5
+    assert migrate_v2.backfill(session_factory, chunk_size=10, pause=0, encoder=encoder) == 0
+
+    with session_factory() as session:
+        v2 = compact_schema.TickerDataV2.__table__
+        assert session.execute(select(func.count()).select_from(v2)).scalar() == 25
+        assert migrate_v2.bytes_per_row(session, v2) > 0
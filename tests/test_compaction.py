@@ -0,0 +1,139 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import insert_ignore
+from services import compaction
+from services.ticker_buffer import TickerBuffer
+from tests.helpers import make_ticker
+
+NOW = datetime(2026, 1, 31, 12, 0)
+TICKS = compaction.TickerData.__table__
+BARS_1S = compaction.TickerBar1s.__table__
+BARS_1M = compaction.TickerBar1m.__table__
+CHECKPOINTS = compaction.CompactionCheckpoint.__table__
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'compaction.db'}")
+    compaction.TickerData.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def insert_ticks(session_factory, symbol, start, count, step=timedelta(milliseconds=300), seq=0):
+    buffer = TickerBuffer()
+    for i in range(count):
+        # Every tenth row summarises a conflated interval of five messages
+        conflated = (5, 200.0 + i, 50.0) if i % 10 == 9 else None
+        buffer.append(make_ticker(symbol, str(100 + i % 7)), (start + i * step).timestamp(),
+                      cross_seq=seq + i + 1, conflated=conflated)
+    with session_factory() as session:
+        insert_ignore(session, TICKS, list(buffer.rows()))
+        session.commit()
+
+
+def expected_bars(session_factory, symbol, start, end, width):
+    """Bars computed in one go from the raw ticks, for comparing with the chunked compaction."""
+    with session_factory() as session:
+        rows = session.execute(
+            select(*(TICKS.c[name] for name in compaction._TICK_COLUMNS))
+            .where(TICKS.c.symbol == symbol, TICKS.c.timestamp >= start, TICKS.c.timestamp < end)
+            .order_by(TICKS.c.timestamp, TICKS.c.id)
+        ).all()
+    bars = {}
+    for row in rows:
+        compaction.fold(bars, compaction._tick_bar(row), width)
+    return list(bars.values())
+
+
+def stored(session_factory, table, symbol):
+    with session_factory() as session:
+        return [dict(row._mapping) for row in session.execute(
+            select(table).where(table.c.symbol == symbol).order_by(table.c.timestamp)
+        )]
+
+
+def count(session_factory, table):
+    with session_factory() as session:
+        return session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_compacts_old_ticks_into_second_bars_and_deletes_them(session_factory):
+    old = NOW - timedelta(days=2, hours=1)
+    insert_ticks(session_factory, "BTCUSDT", old, 200)
+    insert_ticks(session_factory, "ETHUSDT", old, 50)
+    insert_ticks(session_factory, "BTCUSDT", NOW - timedelta(hours=1), 20, seq=1000)
+    expected = expected_bars(session_factory, "BTCUSDT", old, NOW - timedelta(days=1), timedelta(seconds=1))
+    compactor = compaction.Compactor(seconds_after_days=1, minutes_after_days=0, session_factory=session_factory,
+                                     chunk_size=7, pause=0)
+
+    assert compactor.compact(now=NOW) == 250
+    # Bars split across chunks are merged back into one
+    assert stored(session_factory, BARS_1S, "BTCUSDT") == expected
+    assert sum(bar['tick_count'] for bar in expected) == 200 + 20 * 4
+    assert count(session_factory, TICKS) == 20
+    with session_factory() as session:
+        checkpoints = session.execute(select(CHECKPOINTS.c.symbol, CHECKPOINTS.c.source_rows,
+                                             CHECKPOINTS.c.completed)).all()
+    assert sorted(checkpoints) == [("BTCUSDT", 200, True), ("ETHUSDT", 50, True)]
+    assert compactor.compact(now=NOW) == 0
+
+
+def test_interrupted_pass_resumes_from_its_checkpoint(session_factory):
+    old = NOW - timedelta(days=3)
+    insert_ticks(session_factory, "BTCUSDT", old, 100)
+    expected = expected_bars(session_factory, "BTCUSDT", old, NOW, timedelta(seconds=1))
+
+    interrupted = compaction.Compactor(seconds_after_days=1, minutes_after_days=0, session_factory=session_factory,
+                                       chunk_size=30, pause=0)
+    interrupted.writer_busy = lambda: interrupted._stop_event.set()  # stop after the first chunk
+    assert interrupted.compact(now=NOW) == 30
+    with session_factory() as session:
+        checkpoint = session.get(compaction.CompactionCheckpoint, ("1s", "BTCUSDT", old.date()))
+        assert (checkpoint.source_rows, checkpoint.completed) == (30, False)
+
+    resumed = compaction.Compactor(seconds_after_days=1, minutes_after_days=0, session_factory=session_factory,
+                                   chunk_size=30, pause=0)
+    assert resumed.compact(now=NOW) == 70
+    assert stored(session_factory, BARS_1S, "BTCUSDT") == expected
+    with session_factory() as session:
+        checkpoint = session.get(compaction.CompactionCheckpoint, ("1s", "BTCUSDT", old.date()))
+        assert (checkpoint.source_rows, checkpoint.completed) == (100, True)
+
+
+def test_history_uses_the_finest_tier_reaching_the_start(session_factory):
+    oldest, older, recent = NOW - timedelta(days=5), NOW - timedelta(days=2), NOW - timedelta(hours=1)
+    insert_ticks(session_factory, "BTCUSDT", oldest, 400, step=timedelta(seconds=1))
+    insert_ticks(session_factory, "BTCUSDT", older, 100, seq=1000)
+    insert_ticks(session_factory, "BTCUSDT", recent, 100, seq=2000)
+    minute_bars = expected_bars(session_factory, "BTCUSDT", oldest, NOW, timedelta(minutes=1))
+    second_bars = expected_bars(session_factory, "BTCUSDT", older, NOW, timedelta(seconds=1))
+    older_bars = expected_bars(session_factory, "BTCUSDT", older, recent, timedelta(seconds=1))
+    compactor = compaction.Compactor(seconds_after_days=1, minutes_after_days=3, session_factory=session_factory,
+                                     chunk_size=64, pause=0)
+
+    # 500 ticks into 1s bars, then the 400 one-second bars of the oldest day into 1m bars
+    assert compactor.compact(now=NOW) == 500 + 400
+    assert count(session_factory, BARS_1M) == 7  # 400 seconds
+    assert count(session_factory, BARS_1S) == len(older_bars)
+    assert count(session_factory, TICKS) == 100
+
+    with session_factory() as session:
+        tier, rows = compaction.history(session, "BTCUSDT", recent, NOW)
+        assert (tier, len(rows)) == ("tick", 100)
+        tier, bars = compaction.history(session, "BTCUSDT", older, NOW)
+        assert (tier, bars) == ("1s", second_bars)
+        # The whole range is covered: minute bars, then seconds and ticks rolled up into minutes
+        tier, bars = compaction.history(session, "BTCUSDT", oldest, NOW)
+        assert (tier, bars) == ("1m", minute_bars)
+        assert compaction.history(session, "ETHUSDT", oldest, NOW) == ("tick", [])
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.conflation import Conflator
+from services.ticker_buffer import TickerBuffer
+from tests.helpers import make_ticker
+
+
+def test_interval_keeps_last_value_with_high_low_and_count():
+    conflator = Conflator(interval=1.0)
+    assert conflator.add("BTCUSDT", make_ticker("BTCUSDT", "100"), 10.0, 1, 1) is None
+    assert conflator.add("BTCUSDT", make_ticker("BTCUSDT", "103"), 10.4, 2, 2) is None
+    assert conflator.add("BTCUSDT", make_ticker("BTCUSDT", "99"), 10.9, 3, 3) is None
+
+    symbol, data, received, exchange_ts, cross_seq, conflated = conflator.add(
+        "BTCUSDT", make_ticker("BTCUSDT", "101"), 11.0, 4, 4
+    )
+    assert (symbol, data["lastPrice"], received, exchange_ts, cross_seq) == ("BTCUSDT", "99", 10.9, 3, 3)
+    assert conflated == (3, 103.0, 99.0)
+    assert len(conflator) == 1
+
+
+def test_expired_and_drained_intervals_are_emitted():
+    conflator = Conflator(interval=1.0)
+    conflator.add("BTCUSDT", make_ticker("BTCUSDT", "100"), 10.0, 0, 0)
+    conflator.add("ETHUSDT", make_ticker("ETHUSDT", "3000"), 10.5, 0, 0)
+
+    assert [row[0] for row in conflator.expired(11.2)] == ["BTCUSDT"]
+    assert [row[0] for row in conflator.drain()] == ["ETHUSDT"]
+    assert len(conflator) == 0
+
+
+def test_conflated_rows_are_marked_in_the_buffer():
+    buffer = TickerBuffer()
+    buffer.append(make_ticker("BTCUSDT", "100"), 10.0)
+    buffer.append(make_ticker("BTCUSDT", "101"), 11.0, conflated=(5, 102.0, 99.5))
+
+    merged = TickerBuffer.merge([buffer, buffer])
+    rows = list(merged.rows())
+    assert [row["conflated_count"] for row in rows] == [None, 5, None, 5]
+    assert rows[3]["interval_high"] == 102.0 and rows[3]["interval_low"] == 99.5
+    assert merged.to_columns()["conflated_count"] == [None, 5, None, 5]
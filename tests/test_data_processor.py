@@ -105,3 +105,337 @@ def test_add_to_save_queue_and_persistence(processor):
         symbols = {r.symbol for r in records}
         assert {'BTCUSDT', 'ETHUSDT'} == symbols
 
+
+def test_commit_records_exchange_timestamp_and_latency(processor):
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+    from services.ticker_buffer import TickerBuffer
+
+    sample = make_sample_data()[0]
+    buffer = TickerBuffer()
+    buffer.append(sample, sample['timestamp'].timestamp(), exchange_ts=1700000000123, cross_seq=7)
+    processor.add_to_save_queue(buffer)
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        record = session.query(TickerData).one()
+        assert record.exchange_ts == 1700000000123
+        assert record.cross_seq == 7
+
+    stages = processor.latency.snapshot('BTCUSDT')['BTCUSDT']
+    assert stages['receive_to_enqueue']['count'] == 1
+    assert stages['enqueue_to_commit']['count'] == 1
+
+
+def make_buffer(record):
+    from services.ticker_buffer import TickerBuffer
+
+    return TickerBuffer.from_messages([record])
+
+
+def test_stop_commits_pending_batches_in_one_transaction(processor, monkeypatch):
+    import services.data_processor as data_processor
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+
+    saved = []
+    original_save = processor._save_to_database
+    monkeypatch.setattr(processor, "_save_to_database", lambda batch: (saved.append(len(batch)), original_save(batch)))
+
+    # Hold the save thread so both batches are still queued at shutdown
+    processor._save_queue.put(None)
+    processor._save_thread.join()
+    for record in make_sample_data():
+        processor.add_to_save_queue(make_buffer(record))
+
+    assert processor.stop(timeout=5) == data_processor.SHUTDOWN_FLUSHED
+    assert saved == [2]
+    with SessionLocal() as session:
+        assert session.query(TickerData).count() == 2
+
+
+def test_stop_spills_when_commit_misses_deadline(processor, monkeypatch, tmp_path):
+    import threading
+
+    import services.data_processor as data_processor
+    from services.spill import load_spilled
+
+    release = threading.Event()
+    monkeypatch.setattr(data_processor, "SPILL_DIR", str(tmp_path / "spill"))
+    monkeypatch.setattr(processor, "_save_to_database", lambda batch: release.wait(5))
+
+    processor._save_queue.put(None)
+    processor._save_thread.join()
+    processor.add_to_save_queue(make_buffer(make_sample_data()[0]))
+
+    try:
+        assert processor.stop(timeout=0.2) == data_processor.SHUTDOWN_SPILLED
+    finally:
+        release.set()
+
+    [(path, batches)] = list(load_spilled(str(tmp_path / "spill")))
+    [(table_name, rows)] = batches
+    assert table_name == "ticker_data"
+    assert rows[0]["symbol"] == "BTCUSDT"
+
+
+def test_batches_spilled_at_the_deadline_are_never_committed(processor, monkeypatch, tmp_path):
+    import threading
+
+    import services.data_processor as data_processor
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+    from services.spill import load_spilled
+
+    release = threading.Event()
+    inserting = threading.Semaphore(0)
+    original_insert = processor._insert_batch
+
+    def slow_insert(db, batch, rows):
+        inserting.release()
+        release.wait(5)
+        return original_insert(db, batch, rows)
+
+    monkeypatch.setattr(data_processor, "SPILL_DIR", str(tmp_path / "spill"))
+    monkeypatch.setattr(processor, "_insert_batch", slow_insert)
+    first, second = make_sample_data()
+    # One batch is stuck in the save thread, the other still queued
+    processor.add_to_save_queue(make_buffer(first))
+    assert inserting.acquire(timeout=5)
+    processor.add_to_save_queue(make_buffer(second))
+
+    assert processor.stop(timeout=0.2) == data_processor.SHUTDOWN_SPILLED
+    release.set()
+    processor._save_thread.join(5)
+
+    [(path, batches)] = list(load_spilled(str(tmp_path / "spill")))
+    assert sorted(row["symbol"] for _, rows in batches for row in rows) == ["BTCUSDT", "ETHUSDT"]
+    with SessionLocal() as session:
+        assert session.query(TickerData).count() == 0
+
+
+def test_final_commit_runs_on_a_daemon_thread_and_is_rolled_back_when_late(processor, monkeypatch, tmp_path):
+    import threading
+
+    import services.data_processor as data_processor
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+    from services.spill import load_spilled
+
+    release = threading.Event()
+    original_insert = processor._insert_batch
+    monkeypatch.setattr(data_processor, "SPILL_DIR", str(tmp_path / "spill"))
+    monkeypatch.setattr(processor, "_insert_batch", lambda *args: (release.wait(5), original_insert(*args))[1])
+
+    processor._save_queue.put(None)
+    processor._save_thread.join()
+    processor.add_to_save_queue(make_buffer(make_sample_data()[0]))
+
+    assert processor.stop(timeout=0.2) == data_processor.SHUTDOWN_SPILLED
+    [final] = [thread for thread in threading.enumerate() if thread.name == "final-commit"]
+    assert final.daemon
+    release.set()
+    final.join(5)
+
+    assert len(list(load_spilled(str(tmp_path / "spill")))) == 1
+    with SessionLocal() as session:
+        assert session.query(TickerData).count() == 0
+
+
+def test_spilled_batches_are_replayed_on_start(processor, monkeypatch, tmp_path):
+    import os
+
+    import services.data_processor as data_processor
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+    from services.spill import spill_batches
+
+    spill_dir = str(tmp_path / "spill")
+    rows = list(make_buffer(make_sample_data()[1]).rows())
+    path = spill_batches([("ticker_data", rows)], spill_dir)
+    monkeypatch.setattr(data_processor, "SPILL_DIR", spill_dir)
+
+    processor._replay_spilled()
+
+    assert not os.path.exists(path)
+    with SessionLocal() as session:
+        record = session.query(TickerData).one()
+        assert record.symbol == "ETHUSDT"
+        assert record.timestamp == rows[0]["timestamp"]
+
+
+def test_replayed_batch_is_not_duplicated(processor):
+    from db.database import SessionLocal
+    from models.market_data import TickerData
+    from services.ticker_buffer import TickerBuffer
+
+    sample = make_sample_data()[0]
+    for _ in range(2):
+        buffer = TickerBuffer()
+        buffer.append(sample, sample['timestamp'].timestamp(), exchange_ts=1700000000123, cross_seq=7)
+        processor.add_to_save_queue(buffer)
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        assert session.query(TickerData).count() == 1
+    assert processor.duplicates_skipped == 1
+
+
+def test_batches_fan_out_to_additional_sinks(processor):
+    from services.sinks import CallbackSink
+
+    received = []
+    processor.add_sink(CallbackSink(received.append, name="signals"))
+    batch = make_buffer(make_sample_data()[0])
+    processor.add_to_save_queue(batch)
+    processor._save_queue.join()
+
+    processor.stop(timeout=2)
+    assert received == [batch]
+    assert processor.sink_stats()["signals"]["rows"] == 1
+
+
+def test_latest_table_keeps_newest_row_per_symbol(processor):
+    from db.database import SessionLocal
+    from models.market_data import TickerLatest
+    from services.ticker_buffer import TickerBuffer
+
+    btc, eth = make_sample_data()
+    buffer = TickerBuffer()
+    received = btc['timestamp'].timestamp()
+    buffer.append(btc, received)
+    buffer.append(dict(btc, lastPrice=45100), received + 1)
+    buffer.append(eth, received)
+    processor.add_to_save_queue(buffer)
+
+    # A late batch must not move the latest row backwards
+    processor.add_to_save_queue(make_buffer(dict(btc, lastPrice=44000, timestamp=btc['timestamp'])))
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        latest = {row.symbol: row.last_price for row in session.query(TickerLatest)}
+    assert latest == {'BTCUSDT': 45100, 'ETHUSDT': 3000}
+
+
+def test_v2_schema_writes_compact_rows(processor):
+    from sqlalchemy import select
+
+    from db.database import SessionLocal, get_db
+    from services import compact_schema
+
+    processor._encoder = compact_schema.CompactTickerEncoder(
+        compact_schema.SymbolDictionary(lambda: next(get_db())), scaled=False
+    )
+    processor.add_to_save_queue(make_sample_data())
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        rows = session.execute(compact_schema.wide_query(scaled=False)).all()
+        assert sorted(row.symbol for row in rows) == ['BTCUSDT', 'ETHUSDT']
+        assert session.execute(select(compact_schema.TickerDataV2.tick_direction)).scalars().all() == [0, 1]
+
+
+def test_overload_mode_follows_queue_depth(processor, monkeypatch):
+    import services.data_processor as data_processor
+
+    monkeypatch.setattr(data_processor, "OVERLOAD_QUEUE_DEPTH", 2)
+    monkeypatch.setattr(data_processor, "OVERLOAD_RESUME_DEPTH", 0)
+
+    # Hold the save thread so batches pile up
+    processor._save_queue.put(None)
+    processor._save_thread.join()
+    processor.add_to_save_queue(make_buffer(make_sample_data()[0]))
+    assert not processor.overloaded
+    processor.add_to_save_queue(make_buffer(make_sample_data()[1]))
+    assert processor.overloaded and processor.overload_episodes == 1
+
+    processor._drain_save_queue()
+    processor._check_overload()
+    assert not processor.overloaded
+
+
+def test_overload_mode_follows_commit_latency(processor, monkeypatch):
+    import services.data_processor as data_processor
+
+    monkeypatch.setattr(data_processor, "OVERLOAD_LATENCY_MS", 1000)
+    processor._last_commit_latency_ms = 1500
+    processor._check_overload()
+    assert processor.overloaded
+
+    processor._last_commit_latency_ms = 5
+    processor._check_overload()
+    assert not processor.overloaded
+
+
+def make_execution_batch(*exec_ids):
+    from services.private_events import EventBatch, parse_private_message
+
+    batch = EventBatch("executions")
+    _, rows = parse_private_message({
+        "topic": "execution",
+        "creationTime": 1700000000400,
+        "data": [
+            {"category": "linear", "symbol": "BTCUSDT", "execId": exec_id, "orderId": "o-1", "side": "Buy",
+             "execPrice": "45000", "execQty": "0.01", "isMaker": True, "execTime": "1700000000390"}
+            for exec_id in exec_ids
+        ],
+    }, 1700000000.5)
+    for row in rows:
+        batch.append(row, 1700000000.5)
+    return batch
+
+
+def test_private_event_batches_are_saved_without_duplicates(processor):
+    from db.database import SessionLocal
+    from models.market_data import Execution, TickerLatest
+
+    processor.add_to_save_queue(make_execution_batch("e-1", "e-2"))
+    processor.add_to_save_queue(make_execution_batch("e-2", "e-3"))
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        assert [e.exec_id for e in session.query(Execution).order_by(Execution.id)] == ["e-1", "e-2", "e-3"]
+        assert session.query(Execution).filter_by(exec_id="e-1").one().is_maker is True
+        assert session.query(TickerLatest).count() == 0
+    assert processor.duplicates_skipped == 1
+
+
+def test_stop_commits_pending_batches_per_table(processor, monkeypatch):
+    import services.data_processor as data_processor
+    from db.database import SessionLocal
+    from models.market_data import Execution, TickerData
+
+    saved = []
+    original_save = processor._save_to_database
+    monkeypatch.setattr(
+        processor, "_save_to_database", lambda batch: (saved.append(batch.table_name), original_save(batch))
+    )
+
+    processor._save_queue.put(None)
+    processor._save_thread.join()
+    processor.add_to_save_queue(make_buffer(make_sample_data()[0]))
+    processor.add_to_save_queue(make_execution_batch("e-1"))
+    processor.add_to_save_queue(make_buffer(make_sample_data()[1]))
+    processor.add_to_save_queue(make_execution_batch("e-2"))
+
+    assert processor.stop(timeout=5) == data_processor.SHUTDOWN_FLUSHED
+    assert saved == ["ticker_data", "executions"]
+    with SessionLocal() as session:
+        assert session.query(TickerData).count() == 2
+        assert session.query(Execution).count() == 2
+
+
+def test_cold_split_keeps_full_values_in_latest_table(processor):
+    from db.database import SessionLocal
+    from models.market_data import TickerColdFields, TickerData, TickerLatest
+    from services.cold_fields import ColdFieldSplitter
+
+    processor._cold_splitter = ColdFieldSplitter()
+    for record in make_sample_data():
+        processor.add_to_save_queue(make_buffer(record))
+    processor._save_queue.join()
+
+    with SessionLocal() as session:
+        assert {row.funding_rate for row in session.query(TickerData)} == {None}
+        assert session.query(TickerColdFields).count() == 2
+        assert session.query(TickerLatest).filter_by(symbol="BTCUSDT").one().funding_rate == 0.0001
@@ -60,7 +60,8 @@ def test_get_db_connection_returns_mock(monkeypatch, set_env, reload_db_connect,
 
     dummy = object()
     module_name, func_name = attr_path.split(".", 1)
-    module = getattr(db_connect, module_name)
+    # Drivers are imported on first use, so patch the (stubbed) modules themselves
+    module = sys.modules[module_name]
     for part in func_name.split(".")[:-1]:
         module = getattr(module, part)
     monkeypatch.setattr(module, func_name.split(".")[-1], lambda *a, **k: dummy, raising=False)
@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import insert_ignore
+from models.market_data import FeedGap, TickerLatest
+from services.feed_watchdog import RECONNECT, RESUBSCRIBE, FeedWatchdog, gap_windows, without_gaps
+
+
+def feed(watchdog, symbol, start, interval, count):
+    """``count`` messages ``interval`` seconds apart from ``start``; returns the time of the last one."""
+    for i in range(count):
+        watchdog.observe(symbol, start + i * interval)
+    return start + (count - 1) * interval
+
+
+def test_timeout_is_learned_per_symbol_and_clamped():
+    watchdog = FeedWatchdog(factor=20, min_timeout=5, max_timeout=300)
+    for symbol in ("FAST", "SLOW", "NEW"):
+        watchdog.watch(symbol, 0)
+    feed(watchdog, "FAST", 0, 0.1, 100)
+    feed(watchdog, "SLOW", 0, 10, 30)
+    feed(watchdog, "NEW", 0, 0.1, 5)
+
+    # 20 x 0.1s is below the minimum, 20 x 10s is used as is, a symbol still warming up waits the maximum
+    assert watchdog.check(9.9 + 4.9) == []
+    assert watchdog.check(9.9 + 5.1) == [("FAST", RESUBSCRIBE)]
+    watchdog.forget("FAST")
+    assert watchdog.check(0.4 + 299) == []
+    assert watchdog.check(0.4 + 301) == [("NEW", RESUBSCRIBE)]
+    watchdog.forget("NEW")
+    assert watchdog.check(290 + 199) == []
+    assert watchdog.check(290 + 201) == [("SLOW", RESUBSCRIBE)]
+
+
+def test_stall_escalates_and_ends_in_a_gap_row():
+    watchdog = FeedWatchdog(factor=20, min_timeout=5, max_timeout=300)
+    watchdog.watch("BTCUSDT", 100)
+    last = feed(watchdog, "BTCUSDT", 100, 0.5, 50)
+
+    assert watchdog.check(last + 4) == []
+    assert watchdog.check(last + 11) == [("BTCUSDT", RESUBSCRIBE)]
+    assert watchdog.check(last + 15) == []  # waits another timeout before escalating
+    assert watchdog.check(last + 22) == [("BTCUSDT", RECONNECT)]
+    assert watchdog.stalled() == ["BTCUSDT"]
+    assert watchdog.pop_gaps() == []
+
+    watchdog.observe("BTCUSDT", last + 25)
+    [gap] = watchdog.pop_gaps()
+    assert gap == {
+        'symbol': "BTCUSDT", 'start_ts': int(last * 1000), 'end_ts': int((last + 25) * 1000),
+        'expected_interval_ms': pytest.approx(500), 'timeout_ms': pytest.approx(10000),
+        'action': RECONNECT, 'recovered': True,
+    }
+    assert watchdog.stalled() == []
+
+
+def test_short_silences_between_checks_and_open_stalls_at_close_are_recorded():
+    watchdog = FeedWatchdog(factor=20, min_timeout=5, max_timeout=300)
+    watchdog.watch("BTCUSDT", 0)
+    watchdog.watch("ETHUSDT", 0)
+    last = feed(watchdog, "BTCUSDT", 0, 0.5, 50)
+    feed(watchdog, "ETHUSDT", 0, 0.5, 50)
+
+    # Silent past its timeout and back before any check ran
+    watchdog.observe("BTCUSDT", last + 12)
+    assert [(gap['action'], gap['recovered']) for gap in watchdog.pop_gaps()] == [('none', True)]
+
+    watchdog.check(last + 30)
+    watchdog.forget("BTCUSDT")
+    [gap] = watchdog.close(last + 40)
+    assert (gap['symbol'], gap['action'], gap['recovered']) == ("ETHUSDT", RESUBSCRIBE, False)
+
+
+def test_without_gaps_drops_rows_inside_recorded_gaps(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gaps.db'}")
+    FeedGap.metadata.create_all(engine, tables=[FeedGap.__table__, TickerLatest.__table__])
+    session_factory = sessionmaker(bind=engine)
+    gap = {'start_ts': 1000, 'end_ts': 5000, 'expected_interval_ms': 100.0, 'timeout_ms': 2000.0,
+           'action': RESUBSCRIBE, 'recovered': True}
+    ticks = TickerLatest.__table__
+    with session_factory() as session:
+        insert_ignore(session, FeedGap.__table__, [{'symbol': symbol, **gap} for symbol in ("BTCUSDT", "ETHUSDT")])
+        insert_ignore(session, ticks, [
+            {'symbol': symbol, 'last_price': 1.0, 'receive_ts': receive_ts}
+            for symbol, receive_ts in (("BTCUSDT", 3000), ("ETHUSDT", 900), ("SOLUSDT", 3000))
+        ])
+        session.commit()
+
+        def kept(margin_ms=0):
+            query = without_gaps(select(ticks.c.symbol), ticks.c.symbol, ticks.c.receive_ts, margin_ms)
+            return sorted(session.execute(query).scalars())
+
+        # Gaps only hide rows of their own symbol
+        assert kept() == ["ETHUSDT", "SOLUSDT"]
+        assert kept(margin_ms=200) == ["SOLUSDT"]
+        assert gap_windows(session, "BTCUSDT") == [("BTCUSDT", 1000, 5000)]
+        assert gap_windows(session, start_ms=6000) == []
+    engine.dispose()
@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, create_mock_engine, inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from models.market_data import RECENT_COLUMNS, TickerData, ticker_indexes
+from utils import check_db, indexes
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'indexes.db'}")
+    yield engine
+    engine.dispose()
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return [index['name'] for index in indexes.list_indexes(conn, 'ticker_data')]
+
+
+def test_legacy_layout_is_upgraded_and_its_indexes_dropped(engine):
+    TickerData.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_ticker_data_symbol_timestamp"))
+        conn.execute(text("CREATE INDEX ix_ticker_data_symbol ON ticker_data (symbol)"))
+
+    assert indexes.apply_indexes(engine, 'ticker_data') == ['ix_ticker_data_symbol_timestamp']
+    assert indexes.apply_indexes(engine, 'ticker_data') == []
+    with engine.connect() as conn:
+        report = {index['name']: index for index in indexes.list_indexes(conn, 'ticker_data')}
+        declared = [index.name for index in indexes.declared_indexes(engine, 'ticker_data')]
+        unused = indexes.unused_indexes(list(report.values()), declared)
+    assert report['ix_ticker_data_symbol_timestamp']['columns'] == ['symbol', 'timestamp']
+    assert report['ix_ticker_data_symbol_timestamp']['size'] > 0
+    # The natural key is unique and stays, even though nothing declares its auto-created index by name
+    # The old timestamp index is declared again, so existing databases keep it
+    assert unused == [('ix_ticker_data_symbol', 'not declared')]
+
+    for name, _ in unused:
+        indexes.drop_index(engine, 'ticker_data', name)
+    assert sorted(index['name'] for index in inspect(engine).get_indexes('ticker_data')) == [
+        'ix_ticker_data_exchange_ts', 'ix_ticker_data_symbol_timestamp', 'ix_ticker_data_timestamp'
+    ]
+
+
+def test_unused_indexes_keeps_declared_and_scanned_ones_and_flags_prefixes():
+    def index(name, *columns, scans=None, unique=False):
+        return {'name': name, 'method': 'btree', 'columns': list(columns), 'unique': unique, 'size': 0, 'scans': scans}
+
+    report = [
+        index('ix_old_symbol', 'symbol', scans=12),
+        index('ix_old_timestamp', 'timestamp', scans=0),
+        index('ix_custom', 'receive_ts', scans=3),
+        index('ix_symbol_timestamp', 'symbol', 'timestamp', scans=0),
+        index('uq_natural_key', 'symbol', 'exchange_ts', 'cross_seq', unique=True),
+    ]
+    assert indexes.unused_indexes(report, ['ix_symbol_timestamp']) == [
+        ('ix_old_symbol', 'redundant'), ('ix_old_timestamp', 'not declared, never scanned'),
+    ]
+
+
+def test_benchmark_covers_every_layout_and_cleans_up(engine):
+    results = indexes.benchmark(engine, rows=2500)
+
+    assert [result['layout'] for result in results] == [
+        'single-column', 'composite', 'composite+timestamp', 'composite+recent'
+    ]
+    for result in results:
+        assert result['inserts_per_second'] > 0 and result['index_bytes'] > 0
+        assert set(result) >= {'symbol range', 'time range', 'recent', 'recent symbol', 'prune chunk'}
+    assert not inspect(engine).has_table(indexes.BENCHMARK_TABLE)
+    # ix_ticker_data_recent covers exactly what check_db --recent selects
+    assert RECENT_COLUMNS == check_db.FOLLOW_COLUMNS
+
+
+@pytest.mark.parametrize("url", ["postgresql://", "sqlite://"])
+def test_brin_is_added_next_to_the_btree_timestamp_index(url):
+    table = Table('t', MetaData(), Column('symbol', String(20)), Column('timestamp', DateTime),
+                  *ticker_indexes('ix_t', brin=True, recent=False))
+    statements = []
+    table.create(create_mock_engine(url, lambda statement, *args, **kwargs: statements.append(statement)),
+                 checkfirst=False)
+
+    created = sorted(statement.element.name for statement in statements if isinstance(statement, CreateIndex))
+    expected = ['ix_t_symbol_timestamp', 'ix_t_timestamp', 'ix_t_timestamp_brin']
+    assert created == (expected if url.startswith('postgresql') else expected[:2])
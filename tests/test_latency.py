@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services import latency
+from services.latency import ENQUEUE_TO_COMMIT, EXCHANGE_TO_RECEIVE, LatencyHistogram, LatencyTracker
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    hist = LatencyHistogram(window=60)
+    hist.record(3, count=90)
+    hist.record(700, count=10)
+
+    stats = hist.snapshot()
+    assert stats['count'] == 100
+    assert stats['p50'] == 5
+    assert stats['p99'] == 1000
+    assert stats['max'] == 700
+
+
+def test_histogram_rolls_old_windows_off(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(latency.time, "monotonic", lambda: now[0])
+
+    hist = LatencyHistogram(window=10)
+    hist.record(50)
+    now[0] += 15
+    assert hist.snapshot()['count'] == 1  # still in the previous window
+    now[0] += 25
+    assert hist.snapshot()['count'] == 0
+
+
+def test_tracker_reports_per_symbol_and_stage():
+    tracker = LatencyTracker()
+    tracker.record("BTCUSDT", EXCHANGE_TO_RECEIVE, 12)
+    tracker.record("ETHUSDT", ENQUEUE_TO_COMMIT, 150, count=5)
+
+    snapshot = tracker.snapshot()
+    assert set(snapshot) == {"BTCUSDT", "ETHUSDT"}
+    assert snapshot["BTCUSDT"][EXCHANGE_TO_RECEIVE]['count'] == 1
+    assert snapshot["ETHUSDT"][ENQUEUE_TO_COMMIT]['p50'] == 200
+    assert tracker.snapshot("BTCUSDT").keys() == {"BTCUSDT"}
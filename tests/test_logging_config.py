@@ -2,10 +2,11 @@ import importlib
 import logging
 import sys
 import types
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 
-def test_setup_logging_adds_handlers(monkeypatch):
+def load_logging_config(monkeypatch):
     # Ensure project root is on sys.path for module imports
     monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1]))
 
@@ -14,6 +15,11 @@ def test_setup_logging_adds_handlers(monkeypatch):
 
     import utils.logging_config as logging_config
     importlib.reload(logging_config)
+    return logging_config
+
+
+def test_setup_logging_adds_handlers(monkeypatch, tmp_path):
+    logging_config = load_logging_config(monkeypatch)
 
     # Remove existing handlers so basicConfig attaches ours
     root_logger = logging.getLogger()
@@ -21,13 +27,90 @@ def test_setup_logging_adds_handlers(monkeypatch):
     root_logger.handlers.clear()
 
     monkeypatch.setattr(logging_config, "LOG_LEVEL", "DEBUG")
+    monkeypatch.setattr(logging_config, "LOG_FILE", str(tmp_path / "collector.log"))
 
     logger = logging_config.setup_logging()
 
     try:
         assert logger.level == logging.DEBUG
         handler_types = {type(h) for h in root_logger.handlers}
-        assert logging.FileHandler in handler_types
-        assert logging.StreamHandler in handler_types
+        assert handler_types == {logging_config.NonBlockingQueueHandler}
+        listener_types = {type(h) for h in logging_config._listener.handlers}
+        assert RotatingFileHandler in listener_types
+        assert logging.StreamHandler in listener_types
+
+        logger.info("written by the listener thread")
+        logging_config.stop_logging()
+        assert "written by the listener thread" in (tmp_path / "collector.log").read_text()
+    finally:
+        logging_config.stop_logging()
+        for name in logging_config.RATE_LIMITED_LOGGERS:
+            logging.getLogger(name).filters.clear()
+        root_logger.handlers[:] = old_handlers
+
+
+def test_setup_logging_again_replaces_the_writer_and_limits_only_hot_loggers(monkeypatch, tmp_path):
+    logging_config = load_logging_config(monkeypatch)
+    root_logger = logging.getLogger()
+    old_handlers = root_logger.handlers[:]
+    monkeypatch.setattr(logging_config, "LOG_RATE_LIMIT", 1)
+
+    try:
+        monkeypatch.setattr(logging_config, "LOG_FILE", str(tmp_path / "first.log"))
+        logging_config.setup_logging()
+        monkeypatch.setattr(logging_config, "LOG_FILE", str(tmp_path / "second.log"))
+        logger = logging_config.setup_logging()
+
+        assert len(root_logger.handlers) == 1
+        for _ in range(3):
+            logger.info("not rate limited")
+            logging.getLogger("bybit_collector.websocket").info("rate limited")
+        logging_config.stop_logging()
+        written = (tmp_path / "second.log").read_text()
+        assert written.count("not rate limited") == 3
+        assert written.count("- rate limited") == 1
+        assert "rate limited" not in (tmp_path / "first.log").read_text()
+        assert len(logging.getLogger("bybit_collector.websocket").filters) == 1
     finally:
+        logging_config.stop_logging()
+        for name in logging_config.RATE_LIMITED_LOGGERS:
+            logging.getLogger(name).filters.clear()
         root_logger.handlers[:] = old_handlers
+
+
+def make_record(msg, *args, level=logging.INFO):
+    return logging.LogRecord("bybit_collector.test", level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_filter_suppresses_repeats_and_reports_count(monkeypatch):
+    logging_config = load_logging_config(monkeypatch)
+    now = [0.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+
+    rate_filter = logging_config.RateLimitFilter(limit=2, interval=10)
+    results = [rate_filter.filter(make_record("Adding %d records", i)) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    assert rate_filter.filter(make_record("Adding %d records", 1, level=logging.ERROR))
+
+    now[0] = 11.0
+    record = make_record("Adding %d records", 7)
+    assert rate_filter.filter(record)
+    assert record.getMessage() == "Adding 7 records (3 similar messages suppressed)"
+
+
+def test_queue_handler_drops_when_full(monkeypatch):
+    logging_config = load_logging_config(monkeypatch)
+    from queue import Queue
+
+    handler = logging_config.NonBlockingQueueHandler(Queue(1))
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+    assert handler.dropped == 1
+
+
+def test_json_formatter_outputs_one_object(monkeypatch):
+    import json
+
+    logging_config = load_logging_config(monkeypatch)
+    line = logging_config.JsonFormatter().format(make_record("price %s", "100"))
+    assert json.loads(line)["message"] == "price 100"
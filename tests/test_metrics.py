@@ -0,0 +1,89 @@
+import math
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.metrics import MetricsEngine
+
+
+def make_ticks(count, seed=7):
+    rng = random.Random(seed)
+    mid, open_interest = 100.0, 5000.0
+    ticks = []
+    for _ in range(count):
+        mid *= math.exp(rng.gauss(0, 0.001))
+        half_spread = rng.uniform(0.01, 0.05)
+        open_interest += rng.uniform(-10, 10)
+        ticks.append({
+            "bid1Price": str(mid - half_spread), "ask1Price": str(mid + half_spread),
+            "markPrice": str(mid * (1 + rng.uniform(-1e-4, 1e-4))), "indexPrice": str(mid),
+            "openInterest": str(open_interest),
+        })
+    return ticks
+
+
+def expected(ticks, window):
+    bid = np.array([float(t["bid1Price"]) for t in ticks])
+    ask = np.array([float(t["ask1Price"]) for t in ticks])
+    mid = (bid + ask) / 2
+    returns = np.concatenate([[0.0], np.diff(np.log(mid))])
+    basis = np.array([(float(t["markPrice"]) - float(t["indexPrice"])) / float(t["indexPrice"]) for t in ticks])
+    open_interest = np.array([float(t["openInterest"]) for t in ticks])
+    last = slice(-window, None)
+    return {
+        "ticks": min(window, len(ticks)),
+        "spread_bps": ((ask - bid) / mid * 1e4)[last].mean(),
+        "mid_volatility": returns[last].std(ddof=1),
+        "basis_bps": basis[last].mean() * 1e4,
+        "open_interest_change": open_interest[-1] - open_interest[last][0],
+    }
+
+
+@pytest.mark.parametrize("count", [3, 40, 250])
+def test_rolling_metrics_match_full_recomputation(count):
+    engine = MetricsEngine(windows=[10, 50])
+    ticks = make_ticks(count)
+    for tick in ticks:
+        engine.update("BTCUSDT", tick)
+
+    for metrics in engine.snapshot("BTCUSDT"):
+        reference = expected(ticks, metrics["window_ticks"])
+        for name, value in reference.items():
+            assert metrics[name] == pytest.approx(value, rel=1e-6, abs=1e-9), name
+
+
+def test_symbols_are_independent_and_forgettable():
+    engine = MetricsEngine(windows=[5])
+    for tick in make_ticks(8, seed=1):
+        engine.update("BTCUSDT", tick)
+    engine.update("ETHUSDT", make_ticks(1, seed=2)[0])
+
+    [eth] = engine.snapshot("ETHUSDT")
+    assert eth["ticks"] == 1 and eth["mid_volatility"] == 0.0
+    assert engine.snapshot("BTCUSDT")[0]["ticks"] == 5
+
+    rows = engine.rows(1700000000.0)
+    assert {(row["symbol"], row["window_ticks"]) for row in rows} == {("BTCUSDT", 5), ("ETHUSDT", 5)}
+    engine.forget("ETHUSDT")
+    assert engine.snapshot("ETHUSDT") == [] and len(engine) == 1
+
+
+def test_ticks_with_missing_or_empty_fields_are_skipped():
+    engine = MetricsEngine(windows=(2,))
+    tick = make_ticks(1)[0]
+
+    assert not engine.update("BTCUSDT", {**tick, "bid1Price": ""})
+    assert not engine.update("BTCUSDT", {key: value for key, value in tick.items() if key != "openInterest"})
+    assert engine.snapshot("BTCUSDT") == []
+    assert engine.update("BTCUSDT", tick)
+    assert engine.snapshot("BTCUSDT")[0]["ticks"] == 1
+
+
+def test_windows_must_hold_two_ticks():
+    with pytest.raises(ValueError):
+        MetricsEngine(windows=[1, 10])
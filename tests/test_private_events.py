@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.private_events import EventBatch, parse_private_message
+
+RECEIVED = 1700000000.5
+
+
+def execution_message(*exec_ids):
+    return {
+        "topic": "execution",
+        "creationTime": 1700000000400,
+        "data": [
+            {
+                "category": "linear", "symbol": "BTCUSDT", "execId": exec_id, "orderId": "o-1", "orderLinkId": "",
+                "side": "Buy", "execType": "Trade", "execPrice": "45000.5", "execQty": "0.01", "execValue": "450.005",
+                "execFee": "0.27", "feeRate": "0.0006", "orderPrice": "45001", "orderQty": "0.02", "closedSize": "0",
+                "isMaker": False, "execTime": "1700000000390", "seq": 4688002127,
+            }
+            for exec_id in exec_ids
+        ],
+    }
+
+
+def test_parse_execution_message_converts_fields_and_stamps_times():
+    table_name, rows = parse_private_message(execution_message("e-1", "e-2"), RECEIVED)
+
+    assert table_name == "executions"
+    assert [row["exec_id"] for row in rows] == ["e-1", "e-2"]
+    row = rows[0]
+    assert row["exec_price"] == 45000.5
+    assert row["exec_time"] == 1700000000390
+    assert row["is_maker"] is False
+    assert row["order_link_id"] is None
+    assert (row["exchange_ts"], row["receive_ts"]) == (1700000000400, 1700000000500)
+
+
+def test_parse_wallet_message_stores_one_row_per_coin():
+    message = {
+        "topic": "wallet",
+        "creationTime": 1700000000400,
+        "data": [{
+            "accountType": "UNIFIED", "totalEquity": "1200.5", "totalAvailableBalance": "1000",
+            "coin": [
+                {"coin": "USDT", "equity": "1000", "walletBalance": "1000", "availableToWithdraw": "900",
+                 "unrealisedPnl": "0", "cumRealisedPnl": "-5"},
+                {"coin": "BTC", "equity": "0.004", "walletBalance": "0.004", "availableToWithdraw": "",
+                 "unrealisedPnl": "0", "cumRealisedPnl": "0"},
+            ],
+        }],
+    }
+
+    table_name, rows = parse_private_message(message, RECEIVED)
+
+    assert table_name == "wallet_updates"
+    assert [(row["coin"], row["wallet_balance"]) for row in rows] == [("USDT", 1000.0), ("BTC", 0.004)]
+    assert rows[1]["available_to_withdraw"] is None
+    assert {row["total_equity"] for row in rows} == {1200.5}
+
+
+def test_parse_rejects_unknown_topic_and_bad_numbers():
+    with pytest.raises(KeyError):
+        parse_private_message({"topic": "greeks", "data": []}, RECEIVED)
+    message = execution_message("e-1")
+    message["data"][0]["execPrice"] = "n/a"
+    with pytest.raises(ValueError):
+        parse_private_message(message, RECEIVED)
+
+
+def test_event_batches_merge_and_expose_columns():
+    first, second = EventBatch("executions"), EventBatch("executions")
+    for batch, exec_id in ((first, "e-1"), (second, "e-2")):
+        _, rows = parse_private_message(execution_message(exec_id), RECEIVED)
+        batch.append(rows[0], RECEIVED)
+    first.enqueued_at, second.enqueued_at = 20.0, 10.0
+
+    merged = EventBatch.merge([first, second])
+
+    assert len(merged) == 2
+    assert merged.symbols == ["BTCUSDT", "BTCUSDT"]
+    assert merged.enqueued_at == 10.0
+    assert merged.to_columns()["exec_id"] == ["e-1", "e-2"]
@@ -0,0 +1,82 @@
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.profiling import Profiler, format_cpu_report, sample_stacks
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def busy_function(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_sees_other_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_function, args=(stop,), name="busy")
+    thread.start()
+    try:
+        stacks, samples = sample_stacks(0.2, interval=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert samples > 0
+    busy = [stack for stack in stacks if stack[0] == "busy"]
+    assert any(frame[1] == "busy_function" for stack in busy for frame in stack[1:])
+    report = format_cpu_report(stacks, samples, 0.2)
+    assert "busy_function" in report
+    assert "## Collapsed stacks" in report
+
+
+def test_profiles_write_timestamped_reports(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), default_seconds=0.05)
+
+    assert profiler.start_cpu()
+    assert not profiler.start_cpu()  # one CPU profile at a time
+    assert profiler.start_memory()
+    assert wait_for(lambda: len(profiler.reports) == 2)
+
+    names = sorted(Path(path).name for path in profiler.reports)
+    assert names[0].startswith("cpu-") and names[1].startswith("memory-")
+    memory_report = Path(sorted(profiler.reports)[-1]).read_text()
+    assert "## By module" in memory_report
+
+
+def test_endpoint_starts_profiles(tmp_path):
+    profiler = Profiler(directory=str(tmp_path))
+    port = profiler.start_server(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/profile/cpu?seconds=0.05") as response:
+            assert response.status == 202
+        assert wait_for(lambda: len(profiler.reports) == 1)
+    finally:
+        profiler.stop()
+
+
+def test_signal_while_holding_the_lock_does_not_deadlock(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), default_seconds=0.05)
+    previous = {signum: signal.getsignal(signum) for signum in (signal.SIGUSR1, signal.SIGUSR2)}
+    profiler.install_signal_handlers()
+    try:
+        with profiler._lock:
+            # The handler runs right here on the main thread, which already holds the lock
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.05)
+        assert wait_for(lambda: len(profiler.reports) == 1)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        profiler.stop()
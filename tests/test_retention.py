@@ -0,0 +1,105 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import insert_ignore
+from services import retention
+from services.ticker_buffer import TickerBuffer
+from tests.helpers import make_ticker
+
+NOW = datetime(2026, 1, 31, 12, 0)
+
+
+class FileSize:
+    def __init__(self, path):
+        self.path = path
+
+    def size_bytes(self):
+        return float(os.path.getsize(self.path))
+
+
+@pytest.fixture()
+def database(tmp_path):
+    path = tmp_path / "retention.db"
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def incremental_vacuum(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    retention.TickerData.metadata.create_all(engine)
+    retention.TickerDataV2.metadata.create_all(engine)
+    yield sessionmaker(bind=engine), str(path)
+    engine.dispose()
+
+
+def insert_ticks(session_factory, start, count, step=timedelta(minutes=1)):
+    buffer = TickerBuffer()
+    for i in range(count):
+        received = (start + i * step).timestamp()
+        buffer.append(make_ticker("BTCUSDT", str(100 + i), preOpenPrice="x" * 40), received, cross_seq=i + 1)
+    with session_factory() as session:
+        insert_ignore(session, retention.TickerData.__table__, list(buffer.rows()))
+        session.commit()
+
+
+def count(session_factory, table):
+    with session_factory() as session:
+        return session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_prune_deletes_only_expired_rows_in_chunks(database):
+    session_factory, path = database
+    insert_ticks(session_factory, NOW - timedelta(days=3), 2000)
+    insert_ticks(session_factory, NOW - timedelta(hours=1), 10)
+    pruner = retention.RetentionPruner(
+        retention_days=1, session_factory=session_factory, size_checker=FileSize(path), chunk_size=300, pause=0,
+    )
+
+    assert pruner.prune(now=NOW) == 2000
+    assert count(session_factory, retention.TickerData.__table__) == 10
+    assert pruner.bytes_reclaimed > 0  # incremental_vacuum shrank the file
+    assert pruner.prune(now=NOW) == 0
+
+
+def test_prune_finds_expired_v2_rows_by_receive_time(database):
+    session_factory, _ = database
+    old = int((NOW - timedelta(days=2)).timestamp() * 1000)
+    new = int((NOW - timedelta(hours=1)).timestamp() * 1000)
+    rows = [{"symbol_id": 1, "receive_ts": old + i, "cross_seq": i} for i in range(20)]
+    rows += [{"symbol_id": 1, "receive_ts": new + i, "cross_seq": 100 + i} for i in range(5)]
+    # Backfilled history lands after newer rows in id order
+    rows += [{"symbol_id": 2, "receive_ts": old + i, "cross_seq": 200 + i} for i in range(5)]
+    with session_factory() as session:
+        session.execute(retention.TickerDataV2.__table__.insert(), rows)
+        session.commit()
+
+    pruner = retention.RetentionPruner(retention_days=1, session_factory=session_factory, chunk_size=10, pause=0)
+    assert pruner.prune(now=NOW) == 25
+    assert count(session_factory, retention.TickerDataV2.__table__) == 5
+
+
+def test_prune_waits_while_writer_is_overloaded(database):
+    session_factory, _ = database
+    insert_ticks(session_factory, NOW - timedelta(days=3), 20)
+    checks = []
+
+    def overloaded():
+        checks.append(1)
+        return len(checks) < 3
+
+    pruner = retention.RetentionPruner(
+        retention_days=1, session_factory=session_factory, writer_overloaded=overloaded, chunk_size=10, pause=0,
+    )
+    pruner._stop_event.wait = lambda timeout: False  # do not actually sleep
+    assert pruner.prune(now=NOW) == 20
+    assert len(checks) >= 3
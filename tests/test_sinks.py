@@ -0,0 +1,91 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from services.sinks import CallbackSink, ParquetFileSink, Sink, SinkWorker, create_sinks
+from tests.helpers import make_buffer, make_ticker
+
+
+def make_batch(n=3):
+    return make_buffer(make_ticker("BTCUSDT", str(100 + i)) for i in range(n))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_callback_sink_worker_delivers_and_reports_stats():
+    received = []
+    worker = SinkWorker(CallbackSink(received.append, name="signals"))
+    batch = make_batch()
+
+    worker.put(batch)
+    assert wait_for(lambda: worker.rows_written == 3)
+    worker.stop(timeout=2)
+
+    assert received == [batch]
+    stats = worker.stats()
+    assert stats["batches"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["rows_dropped"] == 0
+
+
+def test_sink_must_implement_write_batch():
+    class Incomplete(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_slow_sink_drops_instead_of_blocking():
+    release = threading.Event()
+
+    class SlowSink(Sink):
+        name = "slow"
+
+        def write_batch(self, batch):
+            release.wait(5)
+
+    worker = SinkWorker(SlowSink(), queue_size=1)
+    worker.put(make_batch())  # taken by the worker, which then blocks
+    assert wait_for(lambda: worker._queue.qsize() == 0)
+    worker.put(make_batch())  # fills the queue
+    started = time.monotonic()
+    worker.put(make_batch(2))  # dropped
+    assert time.monotonic() - started < 0.5
+    assert worker.rows_dropped == 2
+
+    release.set()
+    worker.stop(timeout=2)
+
+
+def test_parquet_sink_rolls_files_by_rows(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = ParquetFileSink(str(tmp_path), roll_rows=5, roll_seconds=3600)
+
+    sink.write_batch(make_batch(3))
+    assert sink.files_written == []
+    sink.write_batch(make_batch(3))
+    assert len(sink.files_written) == 1
+
+    table = pq.read_table(sink.files_written[0])
+    assert table.num_rows == 6
+    assert table.column("last_price").to_pylist()[:3] == [100.0, 101.0, 102.0]
+    assert table.column("exchange_ts").to_pylist()[0] == 1700000000000
+    assert "/ticker_data/date=" in sink.files_written[0]
+
+
+def test_create_sinks_rejects_unknown_names():
+    assert create_sinks("") == []
+    with pytest.raises(ValueError):
+        create_sinks("kafka")
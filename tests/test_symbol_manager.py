@@ -0,0 +1,86 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.symbol_manager import FileSymbolSource, SymbolManager
+
+
+class FakeClient:
+    def __init__(self, symbols):
+        self.active_symbols = set(symbols)
+        self.calls = []
+
+    def subscribe_symbol(self, symbol, expected_rate=1.0):
+        self.calls.append(("subscribe", symbol, expected_rate))
+        self.active_symbols.add(symbol)
+
+    def unsubscribe_symbol(self, symbol):
+        self.calls.append(("unsubscribe", symbol))
+        self.active_symbols.discard(symbol)
+
+
+def test_file_source_reads_bybit_instruments_response(tmp_path):
+    path = tmp_path / "instruments.json"
+    path.write_text(json.dumps({"result": {"list": [
+        {"symbol": "BTCUSDT", "status": "Trading", "priceFilter": {"tickSize": "0.10"},
+         "lotSizeFilter": {"qtyStep": "0.001"}},
+        {"symbol": "OLDUSDT", "status": "Closed"},
+    ]}}))
+
+    assert FileSymbolSource(str(path))() == [{"symbol": "BTCUSDT", "tick_size": 0.1, "qty_step": 0.001}]
+
+
+def test_file_source_reads_plain_symbol_list(tmp_path):
+    path = tmp_path / "symbols.txt"
+    path.write_text("# universe\nBTCUSDT\nETHUSDT\n")
+
+    assert [i["symbol"] for i in FileSymbolSource(str(path))()] == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_refresh_diffs_universe_busiest_first():
+    client = FakeClient({"BTCUSDT", "OLDUSDT"})
+    source = lambda: [  # noqa: E731
+        {"symbol": "BTCUSDT"},
+        {"symbol": "NEWUSDT", "expected_rate": 0.5},
+        {"symbol": "HOTUSDT", "expected_rate": 9},
+    ]
+    manager = SymbolManager(client, source, subscribe_rate=1000)
+
+    added, removed = manager.refresh()
+
+    assert added == ["HOTUSDT", "NEWUSDT"]
+    assert removed == ["OLDUSDT"]
+    assert client.calls == [
+        ("unsubscribe", "OLDUSDT"),
+        ("subscribe", "HOTUSDT", 9),
+        ("subscribe", "NEWUSDT", 0.5),
+    ]
+    assert manager.refresh() == ([], [])
+
+
+def test_throttle_spaces_requests(monkeypatch):
+    import services.symbol_manager as symbol_manager
+
+    now = [100.0]
+    waits = []
+    monkeypatch.setattr(symbol_manager.time, "monotonic", lambda: now[0])
+    manager = SymbolManager(FakeClient([]), lambda: [], subscribe_rate=2)
+    monkeypatch.setattr(manager._stop_event, "wait", lambda seconds: waits.append(seconds))
+
+    manager._throttle()
+    manager._throttle()
+
+    assert waits == [0.5]
+
+
+def test_zero_subscribe_rate_is_unthrottled(monkeypatch):
+    manager = SymbolManager(FakeClient([]), lambda: [], subscribe_rate=0)
+    waits = []
+    monkeypatch.setattr(manager._stop_event, "wait", lambda seconds: waits.append(seconds))
+
+    manager._throttle()
+    manager._throttle()
+
+    assert waits == []
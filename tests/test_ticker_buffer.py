@@ -0,0 +1,48 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.ticker_buffer import TickerBuffer
+from tests.helpers import make_ticker
+
+
+def test_append_parses_into_typed_columns():
+    buffer = TickerBuffer()
+    buffer.append(make_ticker("BTCUSDT", "100.5"), 1700000000.0)
+    buffer.append(make_ticker("BTCUSDT", "101", tick_direction="MinusTick", preOpenPrice="1.5"), 1700000001.0)
+
+    assert len(buffer) == 2
+    assert buffer.columns["last_price"].typecode == "d"
+    assert buffer.last_value("last_price") == 101.0
+    assert buffer.symbols[0] is buffer.symbols[1]
+
+    rows = list(buffer.rows())
+    assert rows[0]["tick_direction"] == "PlusTick"
+    assert rows[1]["tick_direction"] == "MinusTick"
+    assert rows[0]["next_funding_time"] == 1700000000000
+    assert rows[0]["pre_open_price"] is None
+    assert rows[1]["pre_open_price"] == "1.5"
+    assert rows[1]["timestamp"] == datetime.fromtimestamp(1700000001.0)
+
+
+def test_append_rejects_incomplete_message_without_partial_row():
+    buffer = TickerBuffer()
+    message = make_ticker("BTCUSDT", "100")
+    del message["ask1Size"]
+
+    try:
+        buffer.append(message, 1700000000.0)
+    except KeyError:
+        pass
+
+    assert len(buffer) == 0
+    assert all(len(column) == 0 for column in buffer.columns.values())
+
+
+def test_from_messages_accepts_datetime_timestamps():
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    buffer = TickerBuffer.from_messages([dict(make_ticker("ETHUSDT", "3000"), timestamp=now)])
+
+    assert [row["timestamp"] for row in buffer.rows()] == [now]
@@ -0,0 +1,84 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.ticker_snapshot import TickerSnapshotReader, TickerSnapshotWriter
+from tests.helpers import make_ticker
+
+
+def test_reader_sees_latest_published_state(tmp_path):
+    path = str(tmp_path / "tickers")
+    writer = TickerSnapshotWriter(path, capacity=4)
+    reader = TickerSnapshotReader(path)
+
+    assert reader.read("BTCUSDT") is None
+    writer.publish(make_ticker("BTCUSDT", "100"), 1700000000123, 1700000000.5)
+    writer.publish(make_ticker("ETHUSDT", "3000"), 1700000000124, 1700000000.6)
+    writer.publish(make_ticker("BTCUSDT", "101", bid1Price="100.9"), 1700000000125, 1700000000.7)
+
+    snapshot = reader.read("BTCUSDT")
+    assert snapshot["last_price"] == 101.0
+    assert snapshot["bid1_price"] == 100.9
+    assert snapshot["ask1_size"] == 2.0
+    assert snapshot["exchange_ts"] == 1700000000125
+    assert reader.read("ETHUSDT")["last_price"] == 3000.0
+    assert sorted(reader.symbols()) == ["BTCUSDT", "ETHUSDT"]
+
+    reader.close()
+    writer.close()
+
+
+def test_writer_ignores_symbols_beyond_capacity(tmp_path):
+    path = str(tmp_path / "tickers")
+    writer = TickerSnapshotWriter(path, capacity=1)
+    writer.publish(make_ticker("BTCUSDT", "100"), 0, 0.0)
+    writer.publish(make_ticker("ETHUSDT", "3000"), 0, 0.0)
+
+    reader = TickerSnapshotReader(path)
+    assert reader.symbols() == ["BTCUSDT"]
+    assert reader.read("ETHUSDT") is None
+
+
+def test_reads_are_consistent_while_writing(tmp_path):
+    path = str(tmp_path / "tickers")
+    writer = TickerSnapshotWriter(path, capacity=2)
+    writer.publish(make_ticker("BTCUSDT", "0", bid1Price="0"), 0, 0.0)
+    reader = TickerSnapshotReader(path)
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            writer.publish(make_ticker("BTCUSDT", str(i), bid1Price=str(i)), i, 0.0)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        for _ in range(2000):
+            snapshot = reader.read("BTCUSDT")
+            assert snapshot["last_price"] == snapshot["bid1_price"] == snapshot["exchange_ts"]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_reader_detects_restarted_writer(tmp_path):
+    path = str(tmp_path / "tickers")
+    TickerSnapshotWriter(path, capacity=1)
+    reader = TickerSnapshotReader(path)
+    assert not reader.replaced()
+
+    TickerSnapshotWriter(path, capacity=1)
+    assert reader.replaced()
+
+
+def test_reader_rejects_foreign_files(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        TickerSnapshotReader(str(path))
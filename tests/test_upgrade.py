@@ -0,0 +1,95 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import Column, MetaData, Table, create_engine, inspect, select
+from sqlalchemy.orm import Session
+
+from db.bulk import insert_ignore
+from db.upgrade import ADDED_COLUMNS, upgrade_schema
+from models.market_data import TickerData
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'upgrade.db'}")
+    yield engine
+    engine.dispose()
+
+
+def create_legacy_ticker_data(engine):
+    """ticker_data as older versions created it, without any of the added columns."""
+    added = ADDED_COLUMNS['ticker_data']
+    Table(
+        'ticker_data', MetaData(),
+        *(Column(column.name, column.type, primary_key=column.primary_key)
+          for column in TickerData.__table__.columns if column.name not in added),
+    ).create(engine)
+
+
+def test_added_columns_are_created_once_and_writes_succeed(engine):
+    create_legacy_ticker_data(engine)
+
+    assert upgrade_schema(engine) == [f"ticker_data.{name}" for name in ADDED_COLUMNS['ticker_data']] + [
+        'ticker_data.uq_ticker_data_natural_key'
+    ]
+    assert upgrade_schema(engine) == []
+    assert {column['name'] for column in inspect(engine).get_columns('ticker_data')} == set(
+        TickerData.__table__.c.keys()
+    )
+    with Session(engine) as session:
+        row = {'timestamp': datetime(2026, 1, 1), 'symbol': 'BTCUSDT', 'last_price': 100.0,
+               **{name: 1 for name in ADDED_COLUMNS['ticker_data']}}
+        assert insert_ignore(session, TickerData.__table__, [row]) == 1
+        session.commit()
+        assert session.execute(select(TickerData.__table__.c.exchange_ts)).scalar() == 1
+
+
+def test_conflated_rows_can_be_written_after_the_upgrade(engine):
+    create_legacy_ticker_data(engine)
+    upgrade_schema(engine)
+
+    table = TickerData.__table__
+    with Session(engine) as session:
+        row = {'timestamp': datetime(2026, 1, 1), 'symbol': 'BTCUSDT', 'last_price': 101.0,
+               'conflated_count': 7, 'interval_high': 102.0, 'interval_low': 99.5}
+        assert insert_ignore(session, table, [row]) == 1
+        session.commit()
+        assert session.execute(
+            select(table.c.conflated_count, table.c.interval_high, table.c.interval_low)
+        ).one() == (7, 102.0, 99.5)
+
+
+def test_natural_key_is_added_after_removing_duplicates(engine):
+    create_legacy_ticker_data(engine)
+    table = TickerData.__table__
+    with engine.begin() as conn:
+        # Columns a previous run already added, without the constraint
+        for name in ADDED_COLUMNS['ticker_data']:
+            conn.exec_driver_sql(f"ALTER TABLE ticker_data ADD COLUMN {name} BIGINT")
+        conn.execute(table.insert(), [
+            {'id': 1, 'symbol': 'BTCUSDT', 'exchange_ts': 1000, 'cross_seq': 5},
+            {'id': 2, 'symbol': 'BTCUSDT', 'exchange_ts': 1000, 'cross_seq': 5},  # replayed
+            {'id': 3, 'symbol': 'ETHUSDT', 'exchange_ts': 1000, 'cross_seq': 5},
+            {'id': 4, 'symbol': 'BTCUSDT', 'exchange_ts': 1000, 'cross_seq': 5},  # replayed
+            # Rows from before the exchange timestamps were stored have no key
+            {'id': 5, 'symbol': 'BTCUSDT', 'exchange_ts': None, 'cross_seq': None},
+            {'id': 6, 'symbol': 'BTCUSDT', 'exchange_ts': None, 'cross_seq': None},
+        ])
+
+    assert upgrade_schema(engine) == ['ticker_data.uq_ticker_data_natural_key']
+    assert upgrade_schema(engine) == []
+    with Session(engine) as session:
+        assert session.execute(select(table.c.id).order_by(table.c.id)).scalars().all() == [1, 3, 5, 6]
+        # Replays are now skipped by insert_ignore
+        assert insert_ignore(session, table, [{'symbol': 'BTCUSDT', 'exchange_ts': 1000, 'cross_seq': 5}]) == 0
+
+
+def test_missing_tables_are_left_to_create_all(engine):
+    assert upgrade_schema(engine) == []
+    assert not inspect(engine).has_table('ticker_data')
@@ -1,12 +1,22 @@
 import importlib
+import json
 import sys
+import threading
+import time
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import pytest
 
+from tests.helpers import make_ticker
+
+try:  # the real client, taken before the ws_client fixture stubs pybit out
+    from pybit.unified_trading import WebSocket as PybitWebSocket
+except ImportError:
+    PybitWebSocket = None
+
 
 @pytest.fixture()
 def ws_client(monkeypatch):
@@ -40,18 +50,38 @@ def ws_client(monkeypatch):
     importlib.reload(websocket_client)
 
     mock_processor = MagicMock()
+    mock_processor.overloaded = False
     monkeypatch.setattr(websocket_client, "DataProcessor", lambda: mock_processor)
 
     client = websocket_client.BybitWebSocketClient()
     return client, mock_processor
 
 
+def acking_websocket(ack_delay):
+    """pybit's own WebSocket with the network replaced by a socket that acks unsubscribes after ``ack_delay``."""
+    if PybitWebSocket is None:
+        pytest.skip("pybit is not installed")
+
+    class AckingWebSocket(PybitWebSocket):
+        def _connect(self, url):
+            self.ws = MagicMock()
+            self.ws.send.side_effect = self._send
+
+        def _send(self, raw):
+            message = json.loads(raw)
+            if message["op"] == "unsubscribe":
+                ack = {"op": "unsubscribe", "req_id": message["req_id"], "success": True}
+                threading.Timer(ack_delay, self._process_unsubscription_message, [ack]).start()
+
+    return AckingWebSocket
+
+
 def test_handle_ticker_batches_and_queues(ws_client):
     client, mock_processor = ws_client
 
-    msg1 = {"data": {"symbol": "BTCUSDT", "lastPrice": "100"}}
-    msg_same = {"data": {"symbol": "BTCUSDT", "lastPrice": "100"}}
-    msg_change = {"data": {"symbol": "BTCUSDT", "lastPrice": "101"}}
+    msg1 = {"data": make_ticker("BTCUSDT", "100")}
+    msg_same = {"data": make_ticker("BTCUSDT", "100")}
+    msg_change = {"data": make_ticker("BTCUSDT", "101")}
 
     client.handle_ticker(msg1)
     assert len(client.ticker_data["BTCUSDT"]) == 1
@@ -62,10 +92,386 @@ def test_handle_ticker_batches_and_queues(ws_client):
     assert mock_processor.add_to_save_queue.call_count == 0
 
     client.handle_ticker(msg_change)
-    assert client.ticker_data["BTCUSDT"] == []
+    assert len(client.ticker_data["BTCUSDT"]) == 0
     assert mock_processor.add_to_save_queue.call_count == 1
 
     queued = mock_processor.add_to_save_queue.call_args[0][0]
     assert len(queued) == 2
-    assert [d["lastPrice"] for d in queued] == ["100", "101"]
-    assert all(d["symbol"] == "BTCUSDT" for d in queued)
+    assert list(queued.columns["last_price"]) == [100.0, 101.0]
+    assert queued is not client.ticker_data["BTCUSDT"]
+    assert all(row["symbol"] == "BTCUSDT" for row in queued.rows())
+
+
+def test_full_buffers_are_queued_after_releasing_the_buffer_lock(ws_client):
+    client, mock_processor = ws_client
+    held = []
+    mock_processor.add_to_save_queue.side_effect = lambda batch: held.append(client._buffer_lock.locked())
+
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "100")})
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "101")})
+    client.handle_ticker({"data": make_ticker("ETHUSDT", "10")})
+    client.disconnect()
+
+    assert held == [False, False]
+
+
+def test_handle_ticker_skips_malformed_message(ws_client):
+    client, mock_processor = ws_client
+
+    data = make_ticker("BTCUSDT", "100")
+    del data["markPrice"]
+    client.handle_ticker({"data": data})
+
+    assert len(client.ticker_data["BTCUSDT"]) == 0
+    assert mock_processor.add_to_save_queue.call_count == 0
+
+
+def test_handle_ticker_keeps_exchange_timestamps(ws_client):
+    client, mock_processor = ws_client
+
+    client.handle_ticker({"ts": 1700000000123, "cs": 42, "data": make_ticker("BTCUSDT", "100")})
+
+    buffer = client.ticker_data["BTCUSDT"]
+    assert list(buffer.exchange_ts) == [1700000000123]
+    assert list(buffer.cross_seq) == [42]
+    stage, value = mock_processor.latency.record.call_args[0][1:3]
+    assert stage == "exchange_to_receive"
+    row = next(buffer.rows())
+    assert row["exchange_ts"] == 1700000000123
+    assert row["receive_ts"] > 0
+
+
+def test_disconnect_flushes_partial_buffers_and_stops_intake(ws_client):
+    client, mock_processor = ws_client
+    client.ws_connections = [MagicMock()]
+    mock_processor.stop.return_value = "flushed"
+
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "100")})
+    assert client.disconnect(timeout=1) == "flushed"
+
+    client.ws_connections[0].exit.assert_called_once()
+    queued = mock_processor.add_to_save_queue.call_args[0][0]
+    assert len(queued) == 1
+    mock_processor.stop.assert_called_once_with(1)
+
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "101")})
+    assert len(client.ticker_data["BTCUSDT"]) == 0
+
+
+def test_subscribe_spreads_symbols_by_expected_rate(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    monkeypatch.setattr(websocket_client, "MAX_SYMBOLS_PER_CONNECTION", 2)
+    monkeypatch.setattr(websocket_client, "WebSocket", lambda **kwargs: MagicMock())
+
+    client.subscribe_symbol("BTCUSDT", expected_rate=10)
+    client.subscribe_symbol("ETHUSDT", expected_rate=8)
+    client.subscribe_symbol("SOLUSDT", expected_rate=1)
+
+    assert len(client.ws_connections) == 2
+    assert client.active_symbols == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    # SOLUSDT joins ETHUSDT on the lighter of the two connections
+    client.ws_connections[1].ticker_stream.assert_any_call("SOLUSDT", client.handle_ticker)
+
+
+def test_unsubscribe_flushes_and_frees_symbol_state(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, mock_processor = ws_client
+    monkeypatch.setattr(websocket_client, "WebSocket", lambda **kwargs: MagicMock())
+    client.subscribe_symbol("BTCUSDT")
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "100")})
+
+    client.unsubscribe_symbol("BTCUSDT")
+
+    assert "BTCUSDT" not in client.ticker_data
+    assert len(mock_processor.add_to_save_queue.call_args[0][0]) == 1
+    mock_processor.latency.forget.assert_called_once_with("BTCUSDT")
+    client.ws_connections[0].unsubscribe.assert_called_once_with('"tickers.BTCUSDT"')
+
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "101")})
+    assert "BTCUSDT" not in client.ticker_data
+
+
+def test_symbol_can_be_added_again_before_the_unsubscribe_ack(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    monkeypatch.setattr(websocket_client, "WebSocket", acking_websocket(ack_delay=0.1))
+
+    client.subscribe_symbol("BTCUSDT")
+    client.unsubscribe_symbol("BTCUSDT")
+    client.subscribe_symbol("BTCUSDT")
+
+    [ws] = client.ws_connections
+    time.sleep(0.2)
+    # The old ack came in before subscribing again, so it did not remove the new callback
+    assert ws.callback_directory == {"tickers.BTCUSDT": client.handle_ticker}
+    assert client.active_symbols == {"BTCUSDT"}
+
+
+def test_lock_is_free_while_a_subscribe_waits_for_the_unsubscribe_ack(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    monkeypatch.setattr(websocket_client, "WebSocket", acking_websocket(ack_delay=0.5))
+    client.subscribe_symbol("BTCUSDT")
+    client.subscribe_symbol("ETHUSDT")
+    client.unsubscribe_symbol("BTCUSDT")
+
+    resubscribe = threading.Thread(target=client.subscribe_symbol, args=("BTCUSDT",))
+    resubscribe.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    client.unsubscribe_symbol("ETHUSDT")
+    assert time.monotonic() - started < 0.2 and resubscribe.is_alive()
+    resubscribe.join()
+
+    assert client.active_symbols == {"BTCUSDT"}
+
+
+def test_failed_subscribe_closes_the_connection_it_opened(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    ws = MagicMock()
+    ws.ticker_stream.side_effect = RuntimeError("subscribe failed")
+    monkeypatch.setattr(websocket_client, "WebSocket", MagicMock(return_value=ws))
+
+    with pytest.raises(RuntimeError):
+        client.subscribe_symbol("BTCUSDT")
+
+    ws.exit.assert_called_once()
+    assert client.ws_connections == [] and client._connection_load == []
+    assert client.active_symbols == set()
+
+
+def test_handle_ticker_publishes_snapshot_even_without_price_change(ws_client, tmp_path):
+    from services.ticker_snapshot import TickerSnapshotReader, TickerSnapshotWriter
+
+    client, _ = ws_client
+    client.snapshot = TickerSnapshotWriter(str(tmp_path / "tickers"), capacity=4)
+    reader = TickerSnapshotReader(str(tmp_path / "tickers"))
+
+    client.handle_ticker({"ts": 1, "data": make_ticker("BTCUSDT", "100")})
+    data = make_ticker("BTCUSDT", "100")
+    data["bid1Price"] = "99.95"
+    client.handle_ticker({"ts": 2, "data": data})
+
+    assert len(client.ticker_data["BTCUSDT"]) == 1
+    snapshot = reader.read("BTCUSDT")
+    assert snapshot["bid1_price"] == 99.95
+    assert snapshot["exchange_ts"] == 2
+
+
+def test_adaptive_batching_flushes_by_threshold_and_age(ws_client):
+    from services.batch_controller import AdaptiveBatchController
+
+    client, mock_processor = ws_client
+    client.batch_controller = AdaptiveBatchController(target_rows=3, max_age=60, min_size=1, initial_size=3)
+
+    for price in ("100", "101", "102"):
+        client.handle_ticker({"data": make_ticker("BTCUSDT", price)})
+    assert len(mock_processor.add_to_save_queue.call_args[0][0]) == 3
+    assert "BTCUSDT" in client.batch_controller.thresholds()
+
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "103")})
+    client.flush_stale()
+    assert mock_processor.add_to_save_queue.call_count == 1
+
+    client.batch_controller.max_age = 0
+    client.flush_stale()
+    assert mock_processor.add_to_save_queue.call_count == 2
+    assert len(client.ticker_data["BTCUSDT"]) == 0
+
+
+def test_overload_conflates_ticks_and_resumes_full_capture(ws_client):
+    client, mock_processor = ws_client
+    client._conflator.interval = 60
+    mock_processor.overloaded = True
+
+    for price in ("100", "105", "98", "101"):
+        client.handle_ticker({"data": make_ticker("BTCUSDT", price)})
+    assert len(client.ticker_data.get("BTCUSDT", [])) == 0
+
+    # Leaving overload writes the open interval as one marked row before the next tick
+    mock_processor.overloaded = False
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "102")})
+
+    queued = mock_processor.add_to_save_queue.call_args[0][0]
+    conflated, regular = queued.rows()
+    assert conflated["last_price"] == 101.0
+    assert (conflated["conflated_count"], conflated["interval_high"], conflated["interval_low"]) == (4, 105.0, 98.0)
+    assert regular["last_price"] == 102.0 and regular["conflated_count"] is None
+
+
+def test_unsubscribe_queues_the_batch_its_conflated_row_fills(ws_client):
+    client, mock_processor = ws_client
+    client._conflator.interval = 60
+    client.subscribe_symbol("BTCUSDT")
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "100")})
+    mock_processor.overloaded = True
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "101")})
+
+    client.unsubscribe_symbol("BTCUSDT")
+
+    [queued] = [call.args[0] for call in mock_processor.add_to_save_queue.call_args_list]
+    assert [row["last_price"] for row in queued.rows()] == [100.0, 101.0]
+    assert client._ready == []
+
+
+def make_order_message(*statuses):
+    return {
+        "topic": "order",
+        "creationTime": 1700000000400,
+        "data": [
+            {"category": "linear", "symbol": "BTCUSDT", "orderId": "o-1", "side": "Buy", "orderType": "Limit",
+             "orderStatus": status, "price": "45000", "qty": "0.02", "cumExecQty": "0.01",
+             "updatedTime": str(1700000000300 + i)}
+            for i, status in enumerate(statuses)
+        ],
+    }
+
+
+def test_handle_private_batches_events_per_table(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, mock_processor = ws_client
+    monkeypatch.setattr(websocket_client, "PRIVATE_BATCH_SIZE", 3)
+
+    client.handle_private(make_order_message("New", "PartiallyFilled"))
+    client.handle_private({"topic": "order", "data": "not a list"})
+    mock_processor.add_to_save_queue.assert_not_called()
+
+    client.handle_private(make_order_message("Filled"))
+    batch = mock_processor.add_to_save_queue.call_args[0][0]
+    assert batch.table_name == "order_updates"
+    assert [row["order_status"] for row in batch.rows()] == ["New", "PartiallyFilled", "Filled"]
+    mock_processor.latency.record.assert_called_with("BTCUSDT", websocket_client.EXCHANGE_TO_RECEIVE, ANY)
+
+    # Partial batches are saved once they are PRIVATE_BATCH_MAX_AGE old, and at shutdown
+    client.handle_private(make_order_message("Cancelled"))
+    monkeypatch.setattr(websocket_client, "PRIVATE_BATCH_MAX_AGE", 0)
+    client.flush_stale()
+    assert mock_processor.add_to_save_queue.call_count == 2
+    client.handle_private(make_order_message("New"))
+    client.disconnect()
+    assert mock_processor.add_to_save_queue.call_args[0][0].table_name == "order_updates"
+
+
+def test_connect_private_subscribes_configured_topics(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    monkeypatch.setattr(websocket_client, "PRIVATE_TOPICS", ["order", "execution"])
+    monkeypatch.setattr(websocket_client, "API_KEY", "")
+    with pytest.raises(ValueError):
+        client.connect_private()
+
+    monkeypatch.setattr(websocket_client, "API_KEY", "key")
+    monkeypatch.setattr(websocket_client, "API_SECRET", "secret")
+    client.connect_private()
+    client.ws_private.order_stream.assert_called_once_with(client.handle_private)
+    client.ws_private.execution_stream.assert_called_once_with(client.handle_private)
+    client.ws_private.wallet_stream.assert_not_called()
+
+
+def test_metrics_snapshots_are_saved_at_the_configured_cadence(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+    from services.metrics import MetricsEngine
+
+    client, mock_processor = ws_client
+    monkeypatch.setattr(websocket_client, "METRICS_INTERVAL", 60)
+    client.metrics = MetricsEngine(windows=[2, 10])
+
+    # Every message feeds the metrics, including ones dropped as unchanged
+    for price in ("100", "100", "101"):
+        client.handle_ticker({"data": make_ticker("BTCUSDT", price)})
+    assert client.metrics.snapshot("BTCUSDT")[1]["ticks"] == 3
+    queued = mock_processor.add_to_save_queue.call_count
+
+    client.flush_stale()
+    assert mock_processor.add_to_save_queue.call_count == queued
+
+    client._last_metrics -= 60
+    client.flush_stale()
+    batch = mock_processor.add_to_save_queue.call_args[0][0]
+    assert batch.table_name == "ticker_metrics"
+    assert [row["window_ticks"] for row in batch.rows()] == [2, 10]
+
+
+def test_watchdog_resubscribes_then_reconnects_a_stalled_symbol(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+    from services.feed_watchdog import FeedWatchdog
+
+    client, mock_processor = ws_client
+    monkeypatch.setattr(websocket_client, "WebSocket", lambda **kwargs: MagicMock())
+    client.watchdog = FeedWatchdog(min_timeout=1, max_timeout=10)
+    client.subscribe_symbol("BTCUSDT")
+    client.subscribe_symbol("ETHUSDT")
+    first = client.ws_connections[0]
+    client.handle_ticker({"data": make_ticker("ETHUSDT", "100")})
+    now = time.time()
+
+    # ETHUSDT is silent past its timeout while BTCUSDT keeps going
+    monkeypatch.setattr(websocket_client.time, "time", lambda: now + 11)
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "100")})
+    client.flush_stale()
+    first.unsubscribe.assert_called_once_with('"tickers.ETHUSDT"')
+    assert first.ticker_stream.call_args_list[-1] == (("ETHUSDT", client.handle_ticker),)
+
+    # Still silent one timeout later: the connection is replaced with both symbols on it
+    monkeypatch.setattr(websocket_client.time, "time", lambda: now + 22)
+    client.handle_ticker({"data": make_ticker("BTCUSDT", "101")})
+    client.flush_stale()
+    first.exit.assert_called_once()
+    second = client.ws_connections[0]
+    assert second is not first
+    assert sorted(call[0][0] for call in second.ticker_stream.call_args_list) == ["BTCUSDT", "ETHUSDT"]
+
+    # The feed resumes and its gap is saved with the last recovery step taken
+    monkeypatch.setattr(websocket_client.time, "time", lambda: now + 23)
+    client.handle_ticker({"data": make_ticker("ETHUSDT", "101")})
+    client.flush_stale()
+    batch = mock_processor.add_to_save_queue.call_args[0][0]
+    assert batch.table_name == "feed_gaps"
+    [gap] = batch.rows()
+    assert (gap["symbol"], gap["action"], gap["recovered"]) == ("ETHUSDT", "reconnect", True)
+    assert gap["end_ts"] - gap["start_ts"] == pytest.approx(23000, abs=1000)
+
+
+def test_stalled_symbol_is_resubscribed_once_pybit_has_the_unsubscribe_ack(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    monkeypatch.setattr(websocket_client, "WebSocket", acking_websocket(ack_delay=0.1))
+    client.subscribe_symbol("BTCUSDT")
+    [ws] = client.ws_connections
+
+    client._resubscribe("BTCUSDT")
+
+    assert ws.callback_directory == {"tickers.BTCUSDT": client.handle_ticker}
+    assert [json.loads(message)["args"] for message in ws.subscriptions.values()] == [["tickers.BTCUSDT"]]
+
+
+def test_reconnect_opens_the_new_connection_outside_the_lock(ws_client, monkeypatch):
+    import services.websocket_client as websocket_client
+
+    client, _ = ws_client
+    locked = []
+
+    def connect(**kwargs):
+        locked.append(client._lock.locked())
+        if len(locked) == 2:
+            # A symbol added while the replacement connects lands on it as well
+            client._symbol_connection["SOLUSDT"] = (0, 1.0)
+        return MagicMock()
+
+    monkeypatch.setattr(websocket_client, "WebSocket", connect)
+    client.subscribe_symbol("BTCUSDT")
+    client._reconnect(0)
+
+    assert locked == [True, False]
+    streamed = client.ws_connections[0].ticker_stream.call_args_list
+    assert sorted(call[0][0] for call in streamed) == ["BTCUSDT", "SOLUSDT"]
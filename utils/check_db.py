@@ -1,15 +1,39 @@
 import argparse
+import sqlite3
+import time
+from collections import deque
 
-import pandas as pd
-from tabulate import tabulate
+from config.settings import DB_WRITER
 
 from .db_connect import get_db_connection
 
+# Rows fetched from the cursor at a time while printing a result
+FETCH_SIZE = 500
+# Columns printed by --follow and --recent --brief; ix_ticker_data_recent (TICKER_RECENT_INDEX) covers them
+FOLLOW_COLUMNS = ('id', 'timestamp', 'symbol', 'last_price', 'bid1_price', 'bid1_size', 'ask1_price', 'ask1_size')
+# Rows fetched per poll; a full page is followed by another poll straight away
+FOLLOW_PAGE_SIZE = 1000
+# Poll interval bounds in seconds; the interval doubles after each empty poll
+FOLLOW_MIN_INTERVAL = 0.2
+FOLLOW_MAX_INTERVAL = 2.0
+# Seconds --follow keeps re-reading ids for rows that commit late. The asyncpg writer commits several batches at
+# once, so a batch can become visible after rows with higher ids; the other writers commit in id order
+FOLLOW_OVERLAP = 10.0 if DB_WRITER == 'asyncpg' else 0.0
+
+
+def _placeholder(conn):
+    return '?' if isinstance(conn, sqlite3.Connection) else '%s'
+
+
+def _symbol_filter(conn, symbol):
+    """WHERE clause and parameters restricting a query to one symbol, or nothing."""
+    return (f" WHERE symbol = {_placeholder(conn)}", (symbol,)) if symbol else ("", ())
+
 
 def get_table_names(conn):
     """Get list of all tables in the database."""
     cursor = conn.cursor()
-    if conn.__class__.__name__ == 'SQLiteConnection':
+    if isinstance(conn, sqlite3.Connection):
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     else:
         cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public';")
@@ -17,11 +41,10 @@ def get_table_names(conn):
 
 
 def get_table_info(conn, table_name):
-    """Get column information for a specific table."""
+    """Run the column information query for a specific table and return the cursor."""
     cursor = conn.cursor()
-    if conn.__class__.__name__ == 'SQLiteConnection':
-        cursor.execute(f"PRAGMA table_info({table_name});")
-        return cursor.fetchall()
+    if isinstance(conn, sqlite3.Connection):
+        cursor.execute('SELECT cid, name, type, "notnull", dflt_value, pk FROM pragma_table_info(?)', (table_name,))
     else:
         cursor.execute("""
             SELECT 
@@ -35,12 +58,14 @@ def get_table_info(conn, table_name):
             WHERE table_name = %s
             ORDER BY ordinal_position;
         """, (table_name,))
-        return cursor.fetchall()
+    return cursor
 
 
 def get_ticker_stats(conn, symbol=None):
-    """Get statistics for ticker data."""
-    query = """
+    """Run the ticker statistics query and return the cursor."""
+    where, params = _symbol_filter(conn, symbol)
+    cursor = conn.cursor()
+    cursor.execute(f"""
     SELECT 
         symbol,
         COUNT(*) as record_count,
@@ -49,25 +74,160 @@ def get_ticker_stats(conn, symbol=None):
         AVG(last_price) as avg_price,
         MAX(last_price) as max_price,
         MIN(last_price) as min_price
-    FROM ticker_data
+    FROM ticker_data{where}
+    GROUP BY symbol
+    """, params)
+    return cursor
+
+
+def get_recent_ticker_data(conn, limit=10, symbol=None, brief=False):
+    """Run the recent ticker data query and return the cursor; ``brief`` selects only FOLLOW_COLUMNS."""
+    where, params = _symbol_filter(conn, symbol)
+    columns = ', '.join(FOLLOW_COLUMNS) if brief else '*'
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT {columns} FROM ticker_data{where} ORDER BY timestamp DESC LIMIT {_placeholder(conn)}",
+        (*params, int(limit)),
+    )
+    return cursor
+
+
+def get_latest_ticker_data(conn, symbol=None):
+    """Run the newest-ticker-per-symbol query and return the cursor."""
+    where, params = _symbol_filter(conn, symbol)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM ticker_latest{where} ORDER BY symbol", params)
+    return cursor
+
+
+def _cell(value):
+    return '' if value is None else str(value)
+
+
+def _table_line(cells, widths, numeric):
+    return '| ' + ' | '.join(
+        cell.rjust(width) if right else cell.ljust(width) for cell, width, right in zip(cells, widths, numeric)
+    ) + ' |'
+
+
+def print_table(cursor, fetch_size=FETCH_SIZE):
+    """Print a cursor's result as a psql-style table, fetching ``fetch_size`` rows at a time.
+
+    Column widths come from the header and the first page, as in psql with
+    FETCH_COUNT, so printing starts before the whole result has been read; a
+    longer value further down widens only its own line.
     """
-    if symbol:
-        query += f" WHERE symbol = '{symbol}'"
-    query += " GROUP BY symbol"
-    
-    return pd.read_sql_query(query, conn)
+    headers = [column[0] for column in cursor.description]
+    rows = cursor.fetchmany(fetch_size)
+    widths = [max([len(header)] + [len(_cell(row[i])) for row in rows]) for i, header in enumerate(headers)]
+    numeric = [
+        any(row[i] is not None for row in rows)
+        and all(row[i] is None or isinstance(row[i], (int, float)) for row in rows)
+        for i in range(len(headers))
+    ]
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    print(border)
+    print(_table_line(headers, widths, [False] * len(headers)))
+    print('|' + '+'.join('-' * (width + 2) for width in widths) + '|')
+    while rows:
+        for row in rows:
+            print(_table_line([_cell(value) for value in row], widths, numeric))
+        rows = cursor.fetchmany(fetch_size)
+    print(border)
+
+
+def _rows_between(conn, cursor, query, params, low, high):
+    """Rows with ids in (low, high], fetched FOLLOW_PAGE_SIZE at a time."""
+    while True:
+        cursor.execute(query, (low, high, *params))
+        rows = cursor.fetchall()
+        conn.rollback()  # end the read transaction so later polls see new commits
+        yield from rows
+        if len(rows) < FOLLOW_PAGE_SIZE:
+            return
+        low = rows[-1][0]
 
 
-def get_recent_ticker_data(conn, limit=10, symbol=None):
-    """Get recent ticker data."""
-    query = """
-    SELECT * FROM ticker_data
+def follow_ticker_data(
+    conn,
+    symbol=None,
+    backlog=10,
+    min_interval=FOLLOW_MIN_INTERVAL,
+    max_interval=FOLLOW_MAX_INTERVAL,
+    overlap=FOLLOW_OVERLAP,
+    sleep=time.sleep,
+    clock=time.monotonic,
+):
+    """Yield the last ``backlog`` ticker rows, then every new row as it is inserted.
+
+    Each poll reads the current MAX(id) and fetches only rows between the
+    previous poll's and it through the primary key, on the one connection passed
+    in, so rows of other symbols are scanned once at most. With ``overlap``
+    seconds, polls start from the MAX(id) of the poll that long ago instead and
+    skip the ids already yielded, so a row that commits within ``overlap``
+    seconds of taking its id is still yielded. The poll interval starts at
+    ``min_interval`` and doubles while nothing arrives, up to ``max_interval``.
     """
-    if symbol:
-        query += f" WHERE symbol = '{symbol}'"
-    query += f" ORDER BY timestamp DESC LIMIT {limit}"
-    
-    return pd.read_sql_query(query, conn)
+    columns = ', '.join(FOLLOW_COLUMNS)
+    mark = _placeholder(conn)
+    where, params = (f" AND symbol = {mark}", (symbol,)) if symbol else ("", ())
+    cursor = conn.cursor()
+
+    cursor.execute(
+        f"SELECT {columns} FROM ticker_data WHERE id > {mark}{where} ORDER BY id DESC LIMIT {int(backlog)}",
+        (0, *params),
+    )
+    rows = cursor.fetchall()[::-1]
+    conn.rollback()
+    yield from rows
+    settled = rows[-1][0] if rows else None
+    if settled is None:
+        cursor.execute("SELECT MAX(id) FROM ticker_data")
+        settled = cursor.fetchone()[0] or 0
+        conn.rollback()
+
+    query = (
+        f"SELECT {columns} FROM ticker_data WHERE id > {mark} AND id <= {mark}{where} "
+        f"ORDER BY id LIMIT {FOLLOW_PAGE_SIZE}"
+    )
+    marks = deque()  # (time, MAX(id)) of the polls less than ``overlap`` seconds ago
+    seen = set()  # ids above ``settled`` already yielded
+    interval = min_interval
+    while True:
+        now = clock()
+        cursor.execute("SELECT MAX(id) FROM ticker_data")
+        newest = cursor.fetchone()[0] or 0
+        found = False
+        # Other symbols' rows are passed as well, so the next poll does not scan them again
+        for row in _rows_between(conn, cursor, query, params, settled, newest):
+            if row[0] not in seen:
+                found = True
+                if overlap:
+                    seen.add(row[0])
+                yield row
+        marks.append((now, newest))
+        while marks and marks[0][0] <= now - overlap:
+            settled = max(settled, marks.popleft()[1])
+        seen = {row_id for row_id in seen if row_id > settled}
+        interval = min_interval if found else min(interval * 2, max_interval)
+        sleep(interval)
+
+
+def format_follow_row(row):
+    """One fixed-width line for a row from follow_ticker_data."""
+    row_id, timestamp, symbol, *prices = row
+    values = ' '.join(f"{'' if value is None else value:>14}" for value in prices)
+    return f"{row_id:>10} {str(timestamp)[:23]:<23} {symbol:<12} {values}"
+
+
+def print_follow(conn, symbol=None, backlog=10):
+    """Print ticker rows as they arrive until interrupted."""
+    print(format_follow_row(FOLLOW_COLUMNS))
+    try:
+        for row in follow_ticker_data(conn, symbol, backlog):
+            print(format_follow_row(row), flush=True)
+    except KeyboardInterrupt:
+        pass
 
 
 def main():
@@ -77,6 +237,13 @@ def main():
     parser.add_argument('--recent', type=int, default=10, help='Show recent ticker data (default: 10)')
     parser.add_argument('--symbol', type=str, help='Filter by symbol (e.g., BTCUSDT)')
     parser.add_argument('--stats', action='store_true', help='Show ticker statistics')
+    parser.add_argument('--latest', action='store_true', help='Show the newest ticker of every symbol')
+    parser.add_argument(
+        '--follow', action='store_true', help='Print the last --recent rows, then new rows as they arrive'
+    )
+    parser.add_argument(
+        '--brief', action='store_true', help='Show only the id, time, symbol and price columns of --recent rows'
+    )
     
     args = parser.parse_args()
     
@@ -90,19 +257,23 @@ def main():
                 print(f"- {table}")
                 
         elif args.table_info:
-            info = get_table_info(conn, args.table_info)
             print(f"\nTable structure for {args.table_info}:")
-            print(tabulate(info, headers=['cid', 'name', 'type', 'notnull', 'dflt_value', 'pk']))
+            print_table(get_table_info(conn, args.table_info))
             
         elif args.stats:
-            stats = get_ticker_stats(conn, args.symbol)
             print("\nTicker Statistics:")
-            print(tabulate(stats, headers='keys', tablefmt='psql', showindex=False))
+            print_table(get_ticker_stats(conn, args.symbol))
             
+        elif args.follow:
+            print_follow(conn, args.symbol, args.recent)
+
+        elif args.latest:
+            print("\nLatest Ticker Data:")
+            print_table(get_latest_ticker_data(conn, args.symbol))
+
         else:
-            data = get_recent_ticker_data(conn, args.recent, args.symbol)
             print("\nRecent Ticker Data:")
-            print(tabulate(data, headers='keys', tablefmt='psql', showindex=False))
+            print_table(get_recent_ticker_data(conn, args.recent, args.symbol, args.brief))
             
     except Exception as e:
         print(f"Error: {e}")
@@ -1,20 +1,20 @@
 import sqlite3
 
-import mysql.connector
-import psycopg2
-
 from config.settings import DATABASE_URL, DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_TYPE, DB_USER
 
 
 def get_db_connection():
     """
     Get a database connection based on DB_TYPE.
-    Returns a connection object.
+    Returns a connection object. The PostgreSQL and MySQL drivers are only
+    imported when needed, so short-lived tools start quickly.
     """
     if DB_TYPE == "sqlite":
         db_path = DATABASE_URL.replace('sqlite:///', '')
         return sqlite3.connect(db_path)
     elif DB_TYPE == "postgresql":
+        import psycopg2
+
         return psycopg2.connect(
             host=DB_HOST,
             port=DB_PORT,
@@ -23,6 +23,8 @@ def get_db_connection():
             password=DB_PASSWORD
         )
     elif DB_TYPE == "mysql":
+        import mysql.connector
+
         return mysql.connector.connect(
             host=DB_HOST,
             port=DB_PORT,
@@ -0,0 +1,318 @@
+"""Report, create and drop the indexes of the ticker tables.
+
+The report lists every index of a table with its size and, on PostgreSQL, how
+often it was scanned since the statistics were last reset. --apply creates the
+indexes the models declare (including the TICKER_BRIN_INDEX / TICKER_RECENT_INDEX ones)
+that an existing database is missing; create_all only covers new tables.
+--drop-unused lists the indexes nothing needs and drops them with --yes.
+--benchmark compares insert and query speed of the ticker_data index layouts on
+a scratch table.
+
+    python -m utils.indexes [--table ticker_data]
+    python -m utils.indexes --apply
+    python -m utils.indexes --drop-unused [--yes]
+    python -m utils.indexes --benchmark [--rows 200000]
+"""
+import argparse
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column,
+    Index,
+    MetaData,
+    Table,
+    UniqueConstraint,
+    create_mock_engine,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.schema import CreateIndex
+
+from db.database import Base, engine
+from models.market_data import RECENT_COLUMNS, TickerData, ticker_indexes
+
+logger = logging.getLogger("bybit_collector.indexes")
+
+BENCHMARK_TABLE = 'index_benchmark'
+# ticker_data index layouts compared by --benchmark; all share the primary key, natural key and exchange_ts index
+LAYOUTS = ('single-column', 'composite', 'composite+timestamp', 'composite+brin', 'composite+recent')
+BENCHMARK_SYMBOLS = 50
+BENCHMARK_BATCH_SIZE = 1000
+BENCHMARK_STEP = timedelta(milliseconds=10)  # between consecutive benchmark rows, across all symbols
+
+
+def list_indexes(conn, table_name: str) -> List[Dict[str, Any]]:
+    """Every index of a table: name, method, key columns, unique, size in bytes and scans (None if unknown)."""
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        rows = conn.execute(text("""
+            SELECT c.relname AS name, am.amname AS method, i.indisunique AS is_unique,
+                   ARRAY(
+                       SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+                       JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                       WHERE k.n <= i.indnkeyatts ORDER BY k.n
+                   ) AS columns,
+                   pg_relation_size(i.indexrelid) AS size, s.idx_scan AS scans
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = c.relam
+            JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+            WHERE i.indrelid = CAST(:table AS regclass)
+            ORDER BY c.relname
+        """), {'table': table_name})
+        return [
+            {'name': row.name, 'method': row.method, 'columns': list(row.columns), 'unique': row.is_unique,
+             'size': row.size, 'scans': row.scans}
+            for row in rows
+        ]
+    if dialect == 'sqlite':
+        indexes = []
+        for name, unique in conn.execute(
+            text('SELECT name, "unique" FROM pragma_index_list(:table) ORDER BY name'), {'table': table_name}
+        ).all():
+            columns = conn.execute(
+                text("SELECT name FROM pragma_index_info(:index) ORDER BY seqno"), {'index': name}
+            ).scalars().all()
+            size = conn.execute(text("SELECT SUM(pgsize) FROM dbstat WHERE name = :index"), {'index': name}).scalar()
+            indexes.append({'name': name, 'method': 'btree', 'columns': columns, 'unique': bool(unique),
+                            'size': size, 'scans': None})
+        return indexes
+    return [
+        {'name': index['name'], 'method': 'btree', 'columns': index['column_names'], 'unique': index['unique'],
+         'size': None, 'scans': None}
+        for index in inspect(conn).get_indexes(table_name)
+    ]
+
+
+def declared_indexes(bind, table_name: str) -> List[Index]:
+    """The indexes the models declare for a table on this database's dialect."""
+    statements = []
+    mock = create_mock_engine(bind.engine.url, lambda statement, *args, **kwargs: statements.append(statement))
+    Base.metadata.create_all(mock, tables=[Base.metadata.tables[table_name]], checkfirst=False)
+    return [statement.element for statement in statements if isinstance(statement, CreateIndex)]
+
+
+def apply_indexes(engine, table_name: str) -> List[str]:
+    """Create the declared indexes a table is missing and return their names.
+
+    PostgreSQL builds them CONCURRENTLY, so the collector keeps writing meanwhile.
+    """
+    with engine.connect() as conn:
+        existing = {index['name'] for index in list_indexes(conn, table_name)}
+    created = []
+    for index in declared_indexes(engine, table_name):
+        if index.name in existing:
+            continue
+        statement = str(CreateIndex(index).compile(dialect=engine.dialect))
+        if engine.dialect.name == 'postgresql':
+            statement = statement.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+        logger.info(f"Creating {index.name} on {table_name}")
+        started = time.monotonic()
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(statement))
+        logger.info(f"Created {index.name} in {time.monotonic() - started:.1f}s")
+        created.append(index.name)
+    return created
+
+
+def _redundant(index: Dict[str, Any], indexes: List[Dict[str, Any]]) -> bool:
+    """Whether another B-tree index starts with the same columns (an identical one with an earlier name counts)."""
+    columns = index['columns']
+    return index['method'] == 'btree' and any(
+        other is not index and other['method'] == 'btree' and other['columns'][:len(columns)] == columns
+        and (len(other['columns']) > len(columns) or other['name'] < index['name'])
+        for other in indexes
+    )
+
+
+def unused_indexes(indexes: List[Dict[str, Any]], declared: List[str]) -> List[Tuple[str, str]]:
+    """``(name, reason)`` of the indexes that can be dropped.
+
+    Unique indexes back constraints and are always kept. Other indexes go when
+    another index starts with the same columns, or when the models no longer
+    declare them (the single-column indexes of older versions, switched off
+    optional indexes) and they were never scanned. Only PostgreSQL counts scans;
+    elsewhere an undeclared index counts as unused.
+    """
+    unused = [
+        (index['name'], 'not declared, never scanned' if index['scans'] == 0 else 'not declared')
+        for index in indexes if not index['unique'] and index['name'] not in declared and not index['scans']
+    ]
+    # Only indexes that stay can make another one redundant
+    kept = [index for index in indexes if index['name'] not in dict(unused)]
+    unused += [(index['name'], 'redundant') for index in kept if not index['unique'] and _redundant(index, kept)]
+    return sorted(unused)
+
+
+def drop_index(engine, table_name: str, name: str) -> None:
+    quote = engine.dialect.identifier_preparer.quote
+    if engine.dialect.name == 'postgresql':
+        statement = f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"
+    elif engine.dialect.name == 'mysql':
+        statement = f"DROP INDEX {quote(name)} ON {quote(table_name)}"
+    else:
+        statement = f"DROP INDEX IF EXISTS {quote(name)}"
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text(statement))
+    logger.info(f"Dropped {name} from {table_name}")
+
+
+def _benchmark_table(layout: str) -> Table:
+    """A scratch table with ticker_data's columns and the indexes of ``layout``."""
+    prefix = f'ix_{BENCHMARK_TABLE}'
+    if layout == 'single-column':
+        indexes = [Index(f'{prefix}_timestamp', 'timestamp'), Index(f'{prefix}_symbol', 'symbol')]
+    elif layout == 'composite':
+        indexes = [Index(f'{prefix}_symbol_timestamp', 'symbol', 'timestamp')]
+    else:
+        indexes = ticker_indexes(prefix, brin=layout == 'composite+brin', recent=layout == 'composite+recent')
+    return Table(
+        BENCHMARK_TABLE, MetaData(),
+        *(Column(column.name, column.type, primary_key=column.primary_key) for column in TickerData.__table__.columns),
+        UniqueConstraint('symbol', 'exchange_ts', 'cross_seq', name=f'uq_{BENCHMARK_TABLE}_natural_key'),
+        Index(f'{prefix}_exchange_ts', 'exchange_ts'),
+        *indexes,
+    )
+
+
+def _benchmark_rows(start: datetime, first: int, count: int) -> List[Dict[str, Any]]:
+    rows = []
+    for i in range(first, first + count):
+        price = 100 + (i * 7 % 1000) / 10
+        rows.append({
+            'timestamp': start + i * BENCHMARK_STEP, 'exchange_ts': i * 10, 'receive_ts': i * 10 + 5, 'cross_seq': i,
+            'symbol': f'SYM{i % BENCHMARK_SYMBOLS:03d}', 'tick_direction': 'PlusTick', 'last_price': price,
+            'mark_price': price, 'index_price': price, 'open_interest': 1e6, 'turnover_24h': 1e9, 'volume_24h': 1e7,
+            'bid1_price': price - 0.1, 'bid1_size': 1.5, 'ask1_price': price + 0.1, 'ask1_size': 2.5,
+        })
+    return rows
+
+
+def _benchmark_queries(table: Table, start: datetime, rows: int) -> Dict[str, Any]:
+    c = table.c
+    middle = start + rows // 2 * BENCHMARK_STEP
+    recent = [c[column] for column in RECENT_COLUMNS]
+    return {
+        'symbol range': select(table).where(c.symbol == 'SYM007', c.timestamp >= middle,
+                                            c.timestamp < middle + timedelta(minutes=1)),
+        'time range': select(func.count()).where(c.timestamp >= middle, c.timestamp < middle + timedelta(minutes=1)),
+        'recent': select(*recent).order_by(c.timestamp.desc()).limit(10),
+        'recent symbol': select(*recent).where(c.symbol == 'SYM007').order_by(c.timestamp.desc()).limit(10),
+        'prune chunk': select(c.id).where(c.timestamp < start + rows // 10 * BENCHMARK_STEP).limit(1000),
+    }
+
+
+def _analyze(engine, table_name: str) -> None:
+    statement = {'postgresql': 'VACUUM ANALYZE', 'mysql': 'ANALYZE TABLE'}.get(engine.dialect.name, 'ANALYZE')
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text(f"{statement} {engine.dialect.identifier_preparer.quote(table_name)}"))
+
+
+def benchmark_layout(engine, layout: str, rows: int, repeat: int = 20) -> Dict[str, Any]:
+    """Insert ``rows`` synthetic ticks into a scratch table with ``layout``'s indexes, then time the read queries.
+
+    Returns inserts per second, total index bytes and the median milliseconds of each query.
+    """
+    table = _benchmark_table(layout)
+    start = datetime(2026, 1, 1)
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    try:
+        started = time.perf_counter()
+        for first in range(0, rows, BENCHMARK_BATCH_SIZE):
+            with engine.begin() as conn:
+                conn.execute(insert(table), _benchmark_rows(start, first, min(BENCHMARK_BATCH_SIZE, rows - first)))
+        result = {'layout': layout, 'inserts_per_second': rows / (time.perf_counter() - started)}
+        _analyze(engine, table.name)
+        with engine.connect() as conn:
+            result['index_bytes'] = sum(index['size'] or 0 for index in list_indexes(conn, table.name))
+            for name, query in _benchmark_queries(table, start, rows).items():
+                timings = []
+                for _ in range(repeat):
+                    began = time.perf_counter()
+                    conn.execute(query).all()
+                    timings.append(time.perf_counter() - began)
+                result[name] = statistics.median(timings) * 1000
+        return result
+    finally:
+        table.drop(engine, checkfirst=True)
+
+
+def benchmark(engine, rows: int, layouts: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Run benchmark_layout for every layout this database supports (BRIN is PostgreSQL only)."""
+    layouts = layouts or [
+        layout for layout in LAYOUTS if layout != 'composite+brin' or engine.dialect.name == 'postgresql'
+    ]
+    return [benchmark_layout(engine, layout, rows) for layout in layouts]
+
+
+def _print_rows(headers: List[str], rows: List[List[Any]]) -> None:
+    cells = [headers] + [['' if value is None else str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for row in cells:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def _size(size: Optional[int]) -> Optional[str]:
+    return None if size is None else f"{size / 1024:.0f} kB" if size < 1024 ** 2 else f"{size / 1024 ** 2:.1f} MB"
+
+
+def print_report(indexes: List[Dict[str, Any]]) -> None:
+    _print_rows(
+        ['index', 'method', 'columns', 'unique', 'size', 'scans'],
+        [[index['name'], index['method'], ', '.join(index['columns']), 'yes' if index['unique'] else '',
+          _size(index['size']), index['scans']] for index in indexes],
+    )
+
+
+def print_benchmark(results: List[Dict[str, Any]]) -> None:
+    queries = [name for name in results[0] if name not in ('layout', 'inserts_per_second', 'index_bytes')]
+    _print_rows(
+        ['layout', 'inserts/s', 'indexes'] + [f'{name} ms' for name in queries],
+        [[result['layout'], f"{result['inserts_per_second']:.0f}", _size(result['index_bytes'])]
+         + [f"{result[name]:.2f}" for name in queries] for result in results],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report and manage the indexes of the ticker tables')
+    parser.add_argument('--table', default=TickerData.__tablename__, help='Table to report on or manage')
+    parser.add_argument('--apply', action='store_true', help='Create declared indexes the table is missing')
+    parser.add_argument('--drop-unused', action='store_true', help='List indexes nothing needs (drop them with --yes)')
+    parser.add_argument('--yes', action='store_true', help='Drop the indexes --drop-unused lists')
+    parser.add_argument('--benchmark', action='store_true', help='Compare ticker_data index layouts')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows inserted per benchmarked layout')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.benchmark:
+        print_benchmark(benchmark(engine, args.rows))
+        return
+    Base.metadata.create_all(bind=engine)
+    if args.apply:
+        created = apply_indexes(engine, args.table)
+        print(f"Created {', '.join(created)}" if created else "No declared index is missing")
+    if args.drop_unused:
+        with engine.connect() as conn:
+            unused = unused_indexes(list_indexes(conn, args.table),
+                                    [index.name for index in declared_indexes(engine, args.table)])
+        for name, reason in unused:
+            if args.yes:
+                drop_index(engine, args.table, name)
+            print(f"{'Dropped' if args.yes else 'Would drop'} {name} ({reason})")
+        if not unused:
+            print("No unused indexes")
+        return
+    with engine.connect() as conn:
+        print_report(list_indexes(conn, args.table))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,134 @@
+import json
 import logging
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import Full, Queue
 
-from config.settings import LOG_LEVEL
+from config.settings import (
+    LOG_BACKUP_COUNT,
+    LOG_FILE,
+    LOG_JSON,
+    LOG_LEVEL,
+    LOG_MAX_BYTES,
+    LOG_QUEUE_SIZE,
+    LOG_RATE_INTERVAL,
+    LOG_RATE_LIMIT,
+)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Loggers that log per message or per batch; only their records are rate limited
+RATE_LIMITED_LOGGERS = ("bybit_collector.websocket", "bybit_collector.processor")
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most ``limit`` records per message template every ``interval`` seconds.
+
+    Records are keyed by logger, level and the unformatted message, so hot paths should
+    log with ``%``-style arguments rather than f-strings. The first record let through
+    after a suppressed stretch reports how many similar records were dropped. ERROR and
+    above are never limited.
+    """
+
+    def __init__(self, limit: int, interval: float) -> None:
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, 0)
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, queue) -> None:
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
 
 
 def setup_logging():
+    """Route every record through a queue to a background writer; safe to call again to reconfigure."""
+    global _listener
     log_level = getattr(logging, LOG_LEVEL.upper(), logging.INFO)
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler("bybit_collector.log")
-        ]
-    )
-    
+    formatter = JsonFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT)
+
+    # Console and file output happen on the listener's background thread
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue = Queue(LOG_QUEUE_SIZE)
+    _listener = QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    # Only merge the arguments into the message; the listener's handlers apply the real format
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    rate_filter = RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_INTERVAL)
+    for name in RATE_LIMITED_LOGGERS:
+        hot_logger = logging.getLogger(name)
+        hot_logger.filters = [f for f in hot_logger.filters if not isinstance(f, RateLimitFilter)]
+        hot_logger.addFilter(rate_filter)
+
+    # Configure root logger, replacing the queue handler of an earlier call
+    logging.basicConfig(level=log_level, handlers=[queue_handler], force=True)
+
     # Create logger for the application
     logger = logging.getLogger("bybit_collector")
     logger.setLevel(log_level)
-    
-    return logger
\ No newline at end of file
+
+    return logger
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,122 @@
+"""Backfill ticker_data into the compact ticker_data_v2 schema.
+
+The backfill runs online: rows are copied in id order, one committed chunk at a
+time with a pause in between, and the last copied id is checkpointed, so the tool
+can be stopped and rerun at any point. Switch the collector to TICKER_SCHEMA=v2
+first, then run this until it reports that nothing is left to copy.
+
+    python -m utils.migrate_v2 [--chunk-size 10000] [--pause 0.1]
+    python -m utils.migrate_v2 --measure
+"""
+import argparse
+import logging
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, text
+
+from db.bulk import upsert
+from db.database import Base, SessionLocal, engine
+from models.market_data import MigrationCheckpoint, TickerData, TickerDataV2
+from services.compact_schema import CompactTickerEncoder, SymbolDictionary
+from services.symbol_manager import fetch_instruments
+
+logger = logging.getLogger("bybit_collector.migrate_v2")
+
+MIGRATION_NAME = 'ticker_data_v2'
+
+
+def backfill(
+    session_factory: Callable = SessionLocal,
+    chunk_size: int = 10000,
+    pause: float = 0.1,
+    max_chunks: Optional[int] = None,
+    encoder: Optional[CompactTickerEncoder] = None,
+) -> int:
+    """Copy ticker_data rows not yet migrated into ticker_data_v2 and return how many were read."""
+    encoder = encoder or CompactTickerEncoder(SymbolDictionary(session_factory, fetch=fetch_instruments), strict=True)
+    source = TickerData.__table__
+    copied = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        session = session_factory()
+        try:
+            checkpoint = session.get(MigrationCheckpoint, MIGRATION_NAME)
+            last_id = checkpoint.last_id if checkpoint else 0
+            rows = [
+                dict(row._mapping)
+                for row in session.execute(
+                    select(source).where(source.c.id > last_id).order_by(source.c.id).limit(chunk_size)
+                )
+            ]
+            if not rows:
+                break
+            inserted = encoder.insert(session, rows)
+            upsert(session, MigrationCheckpoint.__table__, [{'name': MIGRATION_NAME, 'last_id': rows[-1]['id']}])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        copied += len(rows)
+        chunks += 1
+        logger.info("Migrated ids %d-%d: %d rows, %d new", rows[0]['id'], rows[-1]['id'], len(rows), inserted)
+        # Give the collector's writer room between chunks
+        time.sleep(pause)
+    return copied
+
+
+def table_bytes(session, table_name: str) -> Optional[int]:
+    """Bytes used by a table and its indexes, or None if the dialect is not supported."""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        query = """
+            SELECT SUM(pgsize) FROM dbstat
+            WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = :table)
+        """
+    elif dialect == 'postgresql':
+        query = "SELECT pg_total_relation_size(CAST(:table AS regclass))"
+    elif dialect == 'mysql':
+        query = """
+            SELECT data_length + index_length FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = :table
+        """
+    else:
+        return None
+    size = session.execute(text(query), {'table': table_name}).scalar()
+    return int(size) if size is not None else None
+
+
+def bytes_per_row(session, table) -> Optional[float]:
+    """Average on-disk bytes per row of a table, including its indexes."""
+    rows = session.execute(select(func.count()).select_from(table)).scalar()
+    size = table_bytes(session, table.name)
+    if not rows or size is None:
+        return None
+    return size / rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill ticker_data into the compact v2 schema')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows copied per transaction')
+    parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between chunks')
+    parser.add_argument('--max-chunks', type=int, help='Stop after this many chunks')
+    parser.add_argument('--measure', action='store_true', help='Report bytes per row of both schemas')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    Base.metadata.create_all(bind=engine)
+    if args.measure:
+        with SessionLocal() as session:
+            for table in (TickerData.__table__, TickerDataV2.__table__):
+                size = bytes_per_row(session, table)
+                print(f"{table.name}: {f'{size:.1f} bytes/row' if size is not None else 'n/a'}")
+        return
+
+    copied = backfill(chunk_size=args.chunk_size, pause=args.pause, max_chunks=args.max_chunks)
+    print(f"Migrated {copied} rows" if copied else "Nothing left to migrate")
+
+
+if __name__ == "__main__":
+    main()
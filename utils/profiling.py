@@ -0,0 +1,244 @@
+"""On-demand CPU and memory profiling of the running collector.
+
+Nothing is installed until a profile is requested, so the cost while idle is one
+signal handler and, if enabled, an idle HTTP listener thread.
+
+- SIGUSR1 (or ``GET /profile/cpu?seconds=N``) samples the stacks of every thread
+  for N seconds and writes the hottest functions plus collapsed stacks that can
+  be fed to flamegraph tools.
+- SIGUSR2 (or ``GET /profile/memory?seconds=N``) traces allocations for N seconds
+  and writes the growth between the two tracemalloc snapshots, by module and by line.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import SimpleQueue
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from config.settings import PROFILE_DIR, PROFILE_INTERVAL, PROFILE_SECONDS
+
+logger = logging.getLogger("bybit_collector.profiling")
+
+# Number of entries in each section of a report
+TOP_ENTRIES = 30
+
+Frame = Tuple[str, str, int]  # (filename, function name, first line)
+
+
+def _module_name(filename: str) -> str:
+    """Best-effort dotted module name for a source file."""
+    for path in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(path + os.sep):
+            module = os.path.splitext(filename[len(path) + 1:])[0].replace(os.sep, '.')
+            return module[:-len('.__init__')] if module.endswith('.__init__') else module
+    return filename
+
+
+def _describe(frame: Frame) -> str:
+    filename, name, line = frame
+    return f"{_module_name(filename)}:{name}:{line}"
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_INTERVAL) -> Tuple[Counter, int]:
+    """Sample every other thread's stack for ``seconds`` and return (stack counts, number of samples).
+
+    Stacks are root-first tuples whose first entry is the thread name.
+    """
+    own = threading.get_ident()
+    stacks: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks[tuple(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+
+def format_cpu_report(stacks: Counter, samples: int, seconds: float) -> str:
+    """Hottest functions by own and inclusive samples, followed by collapsed stacks."""
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack[1:]
+        if frames:
+            own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    lines = [f"# {samples} samples over {seconds:.1f}s; counts are per thread, idle threads included", ""]
+    for title, counter in (("Own samples", own), ("Inclusive samples", inclusive)):
+        lines.append(f"## {title}")
+        for frame, count in counter.most_common(TOP_ENTRIES):
+            lines.append(f"{count:8d} {100.0 * count / max(samples, 1):6.1f}%  {_describe(frame)}")
+        lines.append("")
+    lines.append("## Collapsed stacks")
+    for stack, count in stacks.most_common():
+        lines.append(";".join([stack[0], *(_describe(frame) for frame in stack[1:])]) + f" {count}")
+    return "\n".join(lines) + "\n"
+
+
+def format_memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, seconds: float) -> str:
+    """Allocation growth between two snapshots, by module and by line."""
+    by_module: Dict[str, list] = {}
+    for stat in after.compare_to(before, 'filename'):
+        totals = by_module.setdefault(_module_name(stat.traceback[0].filename), [0, 0])
+        totals[0] += stat.size_diff
+        totals[1] += stat.count_diff
+    current = sum(stat.size for stat in after.statistics('filename'))
+
+    lines = [f"# Allocation growth over {seconds:.1f}s; {current / 1024:.1f} KiB traced at the end", ""]
+    lines.append("## By module")
+    for module, (size, count) in sorted(by_module.items(), key=lambda item: -abs(item[1][0]))[:TOP_ENTRIES]:
+        lines.append(f"{size / 1024:+12.1f} KiB {count:+9d} blocks  {module}")
+    lines.append("")
+    lines.append("## By line")
+    for stat in after.compare_to(before, 'lineno')[:TOP_ENTRIES]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size_diff / 1024:+12.1f} KiB {stat.count_diff:+9d} blocks  "
+            f"{_module_name(frame.filename)}:{frame.lineno}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """Run CPU and memory profiles in the background and write timestamped reports."""
+
+    def __init__(self, directory: str = PROFILE_DIR, default_seconds: float = PROFILE_SECONDS) -> None:
+        self.directory = directory
+        self.default_seconds = default_seconds
+        self.reports = []
+        self._running = set()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        # Profiles requested by signal handlers; SimpleQueue.put is safe to call from them, unlike taking _lock
+        self._signalled: SimpleQueue = SimpleQueue()
+        self._signal_thread: Optional[threading.Thread] = None
+
+    def _start(self, kind: str, target, seconds: Optional[float]) -> bool:
+        seconds = self.default_seconds if seconds is None else seconds
+        with self._lock:
+            if kind in self._running:
+                logger.warning(f"A {kind} profile is already running")
+                return False
+            self._running.add(kind)
+        thread = threading.Thread(target=self._run, args=(kind, target, seconds), name=f"profile-{kind}", daemon=True)
+        thread.start()
+        return True
+
+    def _run(self, kind: str, target, seconds: float) -> None:
+        try:
+            logger.info(f"Starting {seconds:.0f}s {kind} profile")
+            report = target(seconds)
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(report)
+            self.reports.append(path)
+            logger.info(f"Wrote {kind} profile to {path}")
+        except Exception as e:
+            logger.error(f"Error running {kind} profile: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._running.discard(kind)
+
+    def start_cpu(self, seconds: Optional[float] = None) -> bool:
+        """Sample all threads for ``seconds``; returns False if a CPU profile is already running."""
+        def run(duration):
+            stacks, samples = sample_stacks(duration)
+            return format_cpu_report(stacks, samples, duration)
+
+        return self._start('cpu', run, seconds)
+
+    def start_memory(self, seconds: Optional[float] = None) -> bool:
+        """Trace allocations for ``seconds``; returns False if a memory profile is already running."""
+        def run(duration):
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start()
+            try:
+                before = tracemalloc.take_snapshot()
+                time.sleep(duration)
+                after = tracemalloc.take_snapshot()
+            finally:
+                if not was_tracing:
+                    tracemalloc.stop()
+            return format_memory_report(before, after, duration)
+
+        return self._start('memory', run, seconds)
+
+    def install_signal_handlers(self) -> None:
+        """SIGUSR1 starts a CPU profile and SIGUSR2 a memory profile (main thread only).
+
+        The handlers only queue the request; a worker thread starts the profile, so a
+        signal arriving while the main thread holds ``_lock`` cannot deadlock it.
+        """
+        if self._signal_thread is None:
+            self._signal_thread = threading.Thread(target=self._serve_signals, name="profile-signals", daemon=True)
+            self._signal_thread.start()
+        signal.signal(signal.SIGUSR1, lambda sig, frame: self._signalled.put(self.start_cpu))
+        signal.signal(signal.SIGUSR2, lambda sig, frame: self._signalled.put(self.start_memory))
+
+    def _serve_signals(self) -> None:
+        while True:
+            start = self._signalled.get()
+            if start is None:
+                return
+            start()
+
+    def start_server(self, port: int, host: str = '127.0.0.1') -> int:
+        """Serve ``/profile/cpu`` and ``/profile/memory`` on a local port; returns the bound port."""
+        profiler = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                starters = {'/profile/cpu': profiler.start_cpu, '/profile/memory': profiler.start_memory}
+                if url.path not in starters:
+                    self.send_error(404)
+                    return
+                try:
+                    seconds = float(parse_qs(url.query).get('seconds', [profiler.default_seconds])[0])
+                except ValueError:
+                    self.send_error(400, "seconds must be a number")
+                    return
+                started = starters[url.path](seconds)
+                self.send_response(202 if started else 409)
+                self.end_headers()
+                self.wfile.write(b"started\n" if started else b"already running\n")
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="profile-server", daemon=True).start()
+        bound = self._server.server_address[1]
+        logger.info(f"Profiling endpoint listening on {host}:{bound}")
+        return bound
+
+    def stop(self) -> None:
+        if self._signal_thread is not None:
+            self._signalled.put(None)
+            self._signal_thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None